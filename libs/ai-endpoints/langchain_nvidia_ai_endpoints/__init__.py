@@ -39,9 +39,46 @@ embedding_output = embed_model.embed_query("Exploring AI capabilities.")
 ```
 """  # noqa: E501
 
-from langchain_nvidia_ai_endpoints._statics import Model, register_model
-from langchain_nvidia_ai_endpoints.chat_models import ChatNVIDIA
-from langchain_nvidia_ai_endpoints.embeddings import NVIDIAEmbeddings
-from langchain_nvidia_ai_endpoints.reranking import NVIDIARerank
-
-__all__ = ["ChatNVIDIA", "NVIDIAEmbeddings", "NVIDIARerank", "register_model", "Model"]
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from langchain_nvidia_ai_endpoints._models_cache import (
+        invalidate_available_models,
+    )
+    from langchain_nvidia_ai_endpoints._statics import Model, register_model
+    from langchain_nvidia_ai_endpoints.chat_models import ChatNVIDIA
+    from langchain_nvidia_ai_endpoints.embeddings import NVIDIAEmbeddings
+    from langchain_nvidia_ai_endpoints.reranking import NVIDIARerank
+
+# the public names are imported from their modules on first access, so that
+# e.g. using only NVIDIAEmbeddings does not pay for importing ChatNVIDIA
+_MODULES = {
+    "ChatNVIDIA": "chat_models",
+    "NVIDIAEmbeddings": "embeddings",
+    "NVIDIARerank": "reranking",
+    "register_model": "_statics",
+    "Model": "_statics",
+    "invalidate_available_models": "_models_cache",
+}
+
+__all__ = [
+    "ChatNVIDIA",
+    "NVIDIAEmbeddings",
+    "NVIDIARerank",
+    "register_model",
+    "Model",
+    "invalidate_available_models",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if (module := _MODULES.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,112 @@
+"""Adaptive concurrency limit of an endpoint, driven by latency and errors."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from langchain_nvidia_ai_endpoints._scheduler import Scheduler
+
+
+class AdaptiveLimit:
+    """
+    Adjusts the concurrency limit of a scheduler between 1 and `max_limit`.
+
+    Additive increase, multiplicative decrease: every successful request
+    completed while the limit was in use grows it by 1/limit, i.e. about one
+    slot per round trip. The limit shrinks by `backoff` on overload signals
+    (429/5xx responses, connection failures), and by the gentler
+    `latency_backoff` when the smoothed latency exceeds `tolerance` times the
+    lowest latency observed, the sign that requests queue up on the server.
+    Decreases happen at most once per smoothed latency, so that a burst of
+    failures from the same window counts once.
+
+    The lowest latency slowly drifts up, so that a baseline measured under
+    unusually light load does not pin the limit down forever.
+    """
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        max_limit: int,
+        initial: int = 4,
+        backoff: float = 0.5,
+        latency_backoff: float = 0.9,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        drift: float = 0.001,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._scheduler = scheduler
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.drift = drift
+        self._limit = float(min(initial, max_limit))
+        self._latency: Optional[float] = None
+        self._min_latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._last_decrease = 0.0
+        scheduler.limit = int(self._limit)
+
+    @property
+    def limit(self) -> int:
+        """The current concurrency limit."""
+        return _floor(self._limit)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Smoothed latency of successful requests, in seconds."""
+        return self._latency
+
+    @property
+    def min_latency(self) -> Optional[float]:
+        """The no-load latency estimate, in seconds."""
+        return self._min_latency
+
+    @property
+    def error_rate(self) -> float:
+        """Smoothed fraction of requests that ended in an overload signal."""
+        return self._error_rate
+
+    def record(self, latency: float, overloaded: bool = False) -> None:
+        """Account for a completed request."""
+        now = time.monotonic()
+        with self._lock:
+            a = self.smoothing
+            self._error_rate += a * (float(overloaded) - self._error_rate)
+            if overloaded:
+                self._decrease(now, self.backoff)
+                return
+            if self._latency is None or self._min_latency is None:
+                self._latency = self._min_latency = latency
+            else:
+                self._latency += a * (latency - self._latency)
+                self._min_latency = min(latency, self._min_latency * (1 + self.drift))
+            if self._latency > self.tolerance * self._min_latency:
+                self._decrease(now, self.latency_backoff)
+            elif self._scheduler.in_flight >= self.limit:
+                # only grow a limit that is actually used, the request
+                # recorded still holds its slot
+                self._apply(min(self.max_limit, self._limit + 1 / self.limit))
+
+    def _decrease(self, now: float, factor: float) -> None:
+        if now - self._last_decrease < (self._latency or 0.0):
+            return
+        self._last_decrease = now
+        self._apply(max(1.0, self._limit * factor))
+
+    def _apply(self, limit: float) -> None:
+        changed = _floor(limit) != _floor(self._limit)
+        self._limit = limit
+        if changed:
+            self._scheduler.limit = _floor(limit)
+
+
+def _floor(limit: float) -> int:
+    # steps of 1/limit do not add up to whole numbers exactly
+    return int(limit + 1e-9)
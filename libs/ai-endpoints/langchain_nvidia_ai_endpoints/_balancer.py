@@ -0,0 +1,326 @@
+"""Load balancing across the replicas of an endpoint."""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Collection,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+import requests
+
+from langchain_nvidia_ai_endpoints.errors import NVIDIACircuitOpen
+
+if TYPE_CHECKING:
+    from langchain_nvidia_ai_endpoints._breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+Policy = Literal["least_outstanding", "p2c", "prefix_affinity"]
+# the replicas and the hash of the credential of a shared balancer
+Key = Tuple[Tuple[str, ...], str]
+
+# weight of a new latency probe in the moving average
+_SMOOTHING = 0.3
+# points of each replica on the hash ring, enough to even out its share
+_VIRTUAL_NODES = 100
+
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.sha256(data).digest()[:8], "big")
+
+
+def affinity_key(payload: dict, turns: int) -> Optional[int]:
+    """
+    The hash of the prefix of a chat payload: its model, system messages and
+    first `turns` other messages, None for other payloads. The encoding is
+    fixed so that all processes agree on it.
+    """
+    messages = payload.get("messages")
+    if not isinstance(messages, list):
+        return None
+    system = [m for m in messages if m.get("role") == "system"]
+    others = [m for m in messages if m.get("role") != "system"]
+    prefix = [payload.get("model"), system, others[:turns]]
+    return _hash(json.dumps(prefix, sort_keys=True, default=str).encode())
+
+
+class Endpoint:
+    """A replica: its base URL, requests in flight, health and latency."""
+
+    __slots__ = ("url", "outstanding", "healthy", "latency", "_lock")
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True
+        # smoothed round trip of the health probes, None until probed
+        self.latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"Endpoint({self.url!r}, outstanding={self.outstanding}, "
+            f"healthy={self.healthy}, latency={self.latency})"
+        )
+
+    def begin(self) -> None:
+        with self._lock:
+            self.outstanding += 1
+
+    def end(self) -> None:
+        with self._lock:
+            self.outstanding -= 1
+
+    def load(self) -> Tuple[int, float]:
+        """Replicas with fewer requests in flight, then nearer ones, go first."""
+        return self.outstanding, self.latency or 0.0
+
+    def probed(self, latency: Optional[float]) -> None:
+        """Record a health probe, None if it failed."""
+        self.healthy = latency is not None
+        if latency is not None:
+            self.latency = (
+                latency
+                if self.latency is None
+                else self.latency + _SMOOTHING * (latency - self.latency)
+            )
+
+
+class Balancer:
+    """
+    Spreads requests over the replicas of an endpoint. The replicas, their
+    requests in flight and probes are shared by all clients of the balancer,
+    each picks replicas by its own policy and circuit breakers.
+
+    With "least_outstanding", a request goes to the replica with the fewest
+    requests in flight, with "p2c" (power of two choices) to the less loaded
+    of two replicas picked at random, which avoids herding when many
+    processes balance over the same replicas. Ties go to the replica with the
+    lowest probe latency, i.e. the nearest.
+
+    With "prefix_affinity", requests with the same affinity key (see
+    affinity_key) go to the same replica, so that it serves their shared
+    prefix from its cache: consistent hashing maps the key to a point on a
+    ring of the replicas, the request goes to the first replica found from
+    there. Loads are bounded: a replica with more than `load_factor` times
+    the average requests in flight is passed over for the next one, so that
+    a popular prefix spills over instead of making a hot spot. Requests
+    without a key are balanced like "least_outstanding".
+
+    Replicas are probed (GET {base_url}/models) on a background thread when
+    the balancer starts, then every `interval` seconds, the shortest interval
+    any client asked for. Replicas that fail their probe are skipped until
+    they pass one, unless none is left.
+
+    Replicas whose circuit breaker is open are ejected from the pool until
+    their cooldown is over, requests fail fast when all are.
+
+    Clients hold references to a balancer, probing stops when the last one is
+    released. A closed balancer is never handed out again, the next client
+    gets a new one.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        headers: Dict[str, str],
+        interval: float = 10.0,
+        probe_timeout: float = 2.0,
+        key: Optional[Key] = None,
+    ) -> None:
+        self.key = key
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._ring = sorted(
+            (
+                (_hash(f"{endpoint.url}#{i}".encode()), endpoint)
+                for endpoint in self.endpoints
+                for i in range(_VIRTUAL_NODES)
+            ),
+            key=lambda point: point[0],
+        )
+        self._ring_hashes = [point for point, _ in self._ring]
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self._headers = headers
+        self.refs = 0
+        self.closed = False
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, interval: float) -> None:
+        """Probe at least every `interval` seconds (0, once), from now on."""
+        with self._lock:
+            if interval and (not self.interval or interval < self.interval):
+                self.interval = interval
+                self._wakeup.set()
+        self.start()
+
+    def pick(
+        self,
+        exclude: Collection[Endpoint] = (),
+        key: Optional[int] = None,
+        policy: Policy = "least_outstanding",
+        load_factor: float = 1.25,
+        breakers: Optional[Mapping[str, CircuitBreaker]] = None,
+    ) -> Endpoint:
+        """
+        The replica for a request with affinity key `key`, avoiding those of
+        `exclude` (e.g. tried already) while others are left, by `policy`.
+        Replicas whose breaker in `breakers` (by URL) turns the request down
+        are ejected, the breaker of the replica picked has admitted it.
+        NVIDIACircuitOpen is raised when every replica is ejected.
+        """
+        breakers = breakers or {}
+        endpoints = list(self.endpoints)
+        while endpoints:
+            endpoint = self._choose(endpoints, exclude, key, policy, load_factor)
+            breaker = breakers.get(endpoint.url)
+            if breaker is None or breaker.try_acquire():
+                return endpoint
+            endpoints.remove(endpoint)
+        retry_after = min(b.retry_after for b in breakers.values())
+        raise NVIDIACircuitOpen(
+            f"Circuit open for all {len(self.endpoints)} replicas, "
+            f"retry in {retry_after:.1f}s",
+            retry_after=retry_after,
+        )
+
+    def _choose(
+        self,
+        endpoints: List[Endpoint],
+        exclude: Collection[Endpoint],
+        key: Optional[int],
+        policy: Policy,
+        load_factor: float,
+    ) -> Endpoint:
+        """The replica of `endpoints` for a request, by `policy`."""
+        candidates = [e for e in endpoints if e.healthy and e not in exclude]
+        if not candidates:
+            candidates = [e for e in endpoints if e not in exclude] or endpoints
+        if policy == "prefix_affinity" and key is not None:
+            return self._affine(key, candidates, load_factor)
+        if policy == "p2c" and len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+        return min(candidates, key=Endpoint.load)
+
+    def _affine(
+        self, key: int, candidates: List[Endpoint], load_factor: float
+    ) -> Endpoint:
+        """The first candidate within the load bound from `key` on the ring."""
+        # counting the request being placed, so that idle replicas admit it
+        total = sum(e.outstanding for e in self.endpoints) + 1
+        bound = math.ceil(load_factor * total / len(candidates))
+        ring = self._ring
+        start = bisect.bisect(self._ring_hashes, key)
+        for i in range(len(ring)):
+            endpoint = ring[(start + i) % len(ring)][1]
+            if endpoint.outstanding < bound and endpoint in candidates:
+                return endpoint
+        return min(candidates, key=Endpoint.load)
+
+    def probe(self) -> None:
+        """Probe every replica now."""
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update(self._headers)
+        for endpoint in self.endpoints:
+            start = time.monotonic()
+            try:
+                response = self._session.get(
+                    f"{endpoint.url}/models", timeout=self.probe_timeout
+                )
+                response.close()
+                healthy = response.status_code < 500
+            except requests.RequestException as e:
+                logger.debug(f"Health probe of {endpoint.url} failed: {e}")
+                healthy = False
+            endpoint.probed(time.monotonic() - start if healthy else None)
+
+    def start(self) -> None:
+        """Start probing, if not started yet nor closed."""
+        with self._lock:
+            if self.closed:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="nvidia-health-probe", daemon=True
+                )
+                self._thread.start()
+
+    def release(self) -> bool:
+        """
+        Drop a reference, True if it was the last and probing is stopped: the
+        probe thread is woken up to exit and close its session.
+        """
+        with _balancers_lock:
+            if self.closed:
+                return False
+            self.refs -= 1
+            if self.refs > 0:
+                return False
+            self.closed = True
+            if self.key is not None and _balancers.get(self.key) is self:
+                del _balancers[self.key]
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                self._close_session()
+        self._wakeup.set()
+        return True
+
+    def _run(self) -> None:
+        try:
+            while not self.closed:
+                self.probe()
+                self._wakeup.clear()
+                if not self.interval or self.closed:
+                    return
+                self._wakeup.wait(self.interval)
+        finally:
+            with self._lock:
+                self._close_session()
+
+    def _close_session(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+_balancers: Dict[Key, Balancer] = {}
+_balancers_lock = threading.Lock()
+
+
+def acquire_balancer(
+    urls: List[str], headers: Dict[str, str], interval: float = 10.0
+) -> Balancer:
+    """
+    Take a reference to the process-wide balancer of a set of replicas and
+    credential, all clients of the same replicas share their in-flight counts
+    and probes.
+    """
+    # never keep the key itself around
+    credential = hashlib.sha256(headers.get("Authorization", "").encode()).hexdigest()
+    key = (tuple(urls), credential)
+    with _balancers_lock:
+        if (balancer := _balancers.get(key)) is None:
+            balancer = _balancers[key] = Balancer(urls, headers, interval, key=key)
+        balancer.refs += 1
+    balancer.watch(interval)
+    return balancer
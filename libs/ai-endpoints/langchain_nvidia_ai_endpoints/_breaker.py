@@ -0,0 +1,161 @@
+"""Circuit breakers of endpoints, failing fast while one is unhealthy."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Literal, Optional, Tuple
+
+from langchain_nvidia_ai_endpoints.errors import NVIDIACircuitOpen
+
+State = Literal["closed", "open", "half_open"]
+
+# outcomes the failure rate is computed over, and the fewest that may trip it
+_WINDOW = 20
+_MIN_CALLS = 10
+# failures in a row that trip the breaker whatever the volume
+_CONSECUTIVE_FAILURES = 5
+
+
+class CircuitBreaker:
+    """
+    The health of an endpoint as seen by its callers.
+
+    closed: requests flow, their outcomes are recorded. The breaker opens when
+    `failure_rate` of the last outcomes failed, or after a run of failures.
+    A request fails when it ends in an overload signal (429/5xx responses,
+    connection failures, timeouts, stalled streams) or, with `slow_call` set,
+    when it took longer than `slow_call` seconds (to the first event, for a
+    stream).
+
+    open: requests fail fast with NVIDIACircuitOpen for `cooldown` seconds,
+    and balancing ejects the endpoint from its pool meanwhile.
+
+    half_open: after the cooldown, a single trial request goes through. The
+    breaker closes if it succeeds and opens again if it fails.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        failure_rate: float = 0.5,
+        slow_call: Optional[float] = None,
+        cooldown: float = 30.0,
+    ) -> None:
+        self.url = url
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.cooldown = cooldown
+        self.trips = 0
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=_WINDOW)
+        self._consecutive = 0
+        self._opened: Optional[float] = None
+        self._trial = False
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker({self.url!r}, state={self.state!r})"
+
+    @property
+    def state(self) -> State:
+        if self._opened is None:
+            return "closed"
+        if time.monotonic() - self._opened < self.cooldown:
+            return "open"
+        return "half_open"
+
+    @property
+    def error_rate(self) -> float:
+        """The fraction of the recent outcomes that were failures."""
+        outcomes = list(self._outcomes)
+        return outcomes.count(True) / len(outcomes) if outcomes else 0.0
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a trial request through."""
+        if (opened := self._opened) is None:
+            return 0.0
+        return max(0.0, opened + self.cooldown - time.monotonic())
+
+    def error(self) -> NVIDIACircuitOpen:
+        return NVIDIACircuitOpen(
+            f"Circuit open for {self.url} after repeated failures, "
+            f"retry in {self.retry_after:.1f}s",
+            retry_after=self.retry_after,
+        )
+
+    def try_acquire(self) -> bool:
+        """
+        Whether a request may be sent now, noting it sent if so: any request
+        while closed, the single trial one while half open, none while open.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def cancel(self) -> None:
+        """A request ended without telling anything of the endpoint."""
+        with self._lock:
+            self._trial = False
+
+    def record(self, latency: float, failed: bool) -> None:
+        """Record the outcome of a request."""
+        if self.slow_call is not None and latency > self.slow_call:
+            failed = True
+        with self._lock:
+            self._trial = False
+            if self._opened is not None:
+                # outcomes of requests sent before the breaker opened do not
+                # close it, only the trial does
+                if self.state == "half_open":
+                    if failed:
+                        self._trip()
+                    else:
+                        self._reset()
+                return
+            self._outcomes.append(failed)
+            self._consecutive = self._consecutive + 1 if failed else 0
+            if self._consecutive >= _CONSECUTIVE_FAILURES or (
+                len(self._outcomes) >= _MIN_CALLS
+                and self.error_rate >= self.failure_rate
+            ):
+                self._trip()
+
+    def _trip(self) -> None:
+        self._opened = time.monotonic()
+        self.trips += 1
+
+    def _reset(self) -> None:
+        self._opened = None
+        self._outcomes.clear()
+        self._consecutive = 0
+
+
+_breakers: Dict[Tuple[str, float, Optional[float], float], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(
+    url: str,
+    failure_rate: float = 0.5,
+    slow_call: Optional[float] = None,
+    cooldown: float = 30.0,
+) -> CircuitBreaker:
+    """
+    Return the process-wide circuit breaker of an endpoint (its base URL) and
+    configuration, all clients talking to it with the same configuration
+    share its state.
+    """
+    key = (url, failure_rate, slow_call, cooldown)
+    with _breakers_lock:
+        if (breaker := _breakers.get(key)) is None:
+            breaker = _breakers[key] = CircuitBreaker(
+                url, failure_rate, slow_call, cooldown
+            )
+    return breaker
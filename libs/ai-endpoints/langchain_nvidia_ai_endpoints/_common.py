@@ -1,20 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import json
 import logging
 import os
-import time
+import threading
 import warnings
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import (
+    TYPE_CHECKING,
     Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
     Callable,
+    Deque,
     Dict,
     Generator,
     Iterator,
     List,
+    Literal,
     Optional,
     Sequence,
     Tuple,
+    Type,
     Union,
 )
 from urllib.parse import urlparse, urlunparse
@@ -29,25 +43,148 @@ from langchain_core.pydantic_v1 import (
     validator,
 )
 from requests.models import Response
+from requests.structures import CaseInsensitiveDict
 
+from langchain_nvidia_ai_endpoints._balancer import (
+    Balancer,
+    Endpoint,
+    Policy,
+    acquire_balancer,
+    affinity_key,
+)
+from langchain_nvidia_ai_endpoints._breaker import CircuitBreaker, get_breaker
+from langchain_nvidia_ai_endpoints._compression import (
+    check_encoding,
+    compress_body,
+    negotiate,
+)
+from langchain_nvidia_ai_endpoints._deadline import Deadline, StreamWatch
+from langchain_nvidia_ai_endpoints._hedging import Hedger, cancelled
+from langchain_nvidia_ai_endpoints._history import (
+    Call,
+    Retention,
+    last_call,
+    summarize,
+    summarize_response,
+)
+from langchain_nvidia_ai_endpoints._jsoncodec import JSONCodec, get_codec
+from langchain_nvidia_ai_endpoints._models_cache import (
+    MODELS_CACHE_ENV,
+    get_models_cache,
+)
+from langchain_nvidia_ai_endpoints._polling import get_poller
+from langchain_nvidia_ai_endpoints._ratelimit import RateLimiter, get_rate_limiter
+from langchain_nvidia_ai_endpoints._retry import (
+    _RETRYABLE_EXCEPTIONS,
+    Retrier,
+    RetryBudget,
+    _aretryable_exceptions,
+)
+from langchain_nvidia_ai_endpoints._scheduler import (
+    PRIORITIES,
+    Lease,
+    Priority,
+    Scheduler,
+    get_scheduler,
+)
+from langchain_nvidia_ai_endpoints._singleflight import (
+    coalescible,
+    flight_key,
+    singleflight,
+)
+from langchain_nvidia_ai_endpoints._sse import (
+    SSEDecoder,
+    adrain,
+    drain,
+    iter_chunks,
+    set_read_timeout,
+)
 from langchain_nvidia_ai_endpoints._statics import MODEL_TABLE, Model, determine_model
+from langchain_nvidia_ai_endpoints._transport import (
+    AbortableAdapter,
+    Transport,
+    acquire_transport,
+)
+from langchain_nvidia_ai_endpoints._utils import parse_retry_after
+from langchain_nvidia_ai_endpoints.errors import (
+    RETRYABLE_STATUS_CODES,
+    NVIDIAHTTPError,
+    NVIDIARetryableError,
+    NVIDIAStreamStalled,
+)
+
+if TYPE_CHECKING:
+    # aiohttp is imported by the first async call, see _get_aio_session
+    import aiohttp
 
 logger = logging.getLogger(__name__)
 
+# _NVIDIAClient fields the public classes accept as constructor keyword
+# arguments and forward to their client, e.g. ChatNVIDIA(pool_maxsize=32)
+_CLIENT_OPTIONS = (
+    "pool_connections",
+    "pool_maxsize",
+    "keep_alive",
+    "max_retries",
+    "retry_backoff",
+    "retry_max_backoff",
+    "retry_budget_ratio",
+    "rpm_limit",
+    "tpm_limit",
+    "max_concurrency",
+    "adaptive_concurrency",
+    "json_codec",
+    "compression",
+    "compression_threshold",
+    "models_cache_ttl",
+    "models_cache_path",
+    "defer_model_discovery",
+    "shared_transport",
+    "call_retention",
+    "call_history_size",
+    "connect_timeout",
+    "read_timeout",
+    "deadline",
+    "stream_first_token_timeout",
+    "stream_idle_timeout",
+    "retry_stalled_streams",
+    "load_balancing",
+    "health_check_interval",
+    "affinity_prefix_turns",
+    "affinity_load_factor",
+    "circuit_breaker",
+    "circuit_failure_rate",
+    "circuit_slow_call",
+    "circuit_cooldown",
+    "hedge_percentile",
+    "hedge_budget_ratio",
+    "coalesce_requests",
+)
+
+
+# upper bound of an adaptive concurrency limit without max_concurrency
+_DEFAULT_MAX_ADAPTIVE_CONCURRENCY = 64
+
+
+def _client_options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Select the client options present in a public class's kwargs."""
+    return {k: kwargs[k] for k in _CLIENT_OPTIONS if k in kwargs}
+
 
 class _NVIDIAClient(BaseModel):
     """
     Low level client library interface to NIM endpoints.
     """
 
+    # clients release their shared transport when garbage collected
+    __slots__ = ("__weakref__",)
+
     default_hosted_model_name: str = Field(..., description="Default model name to use")
     model_name: Optional[str] = Field(..., description="Name of the model to invoke")
     model: Optional[Model] = Field(None, description="The model to invoke")
     is_hosted: bool = Field(True)
     cls: str = Field(..., description="Class Name")
 
-    # todo: add a validator for requests.Response (last_response attribute) and
-    #       remove arbitrary_types_allowed=True
     class Config:
         arbitrary_types_allowed = True
 
@@ -57,6 +194,10 @@ class _NVIDIAClient(BaseModel):
         ...,
         description="Base URL for standard inference",
     )
+    base_urls: List[str] = Field(
+        default_factory=list,
+        description="Base URLs of the replicas requests are balanced over",
+    )
     infer_path: str = Field(
         ...,
         description="Path for inference",
@@ -71,19 +212,276 @@ class _NVIDIAClient(BaseModel):
     )
     get_session_fn: Callable = Field(requests.Session)
 
+    ## Connection pooling
+    pool_connections: int = Field(
+        10, ge=1, description="Number of per-host connection pools to keep"
+    )
+    pool_maxsize: int = Field(
+        10, ge=1, description="Maximum number of connections kept per host"
+    )
+    keep_alive: bool = Field(
+        True, description="Reuse connections across requests (HTTP keep-alive)"
+    )
+
+    ## Retries of transient failures (429, 5xx, connection errors)
+    max_retries: int = Field(2, ge=0, description="Maximum retries per request")
+    retry_backoff: float = Field(
+        0.5, ge=0, description="Base delay for exponential retry backoff (s)"
+    )
+    retry_max_backoff: float = Field(
+        8.0,
+        ge=0,
+        description=(
+            "Maximum delay between retries (s), a request whose Retry-After "
+            "is longer is not retried"
+        ),
+    )
+    retry_budget_ratio: float = Field(
+        0.2,
+        ge=0,
+        description=(
+            "Retries allowed as a fraction of recent requests, shared by all "
+            "requests of the client"
+        ),
+    )
+
     api_key: Optional[SecretStr] = Field(description="API Key for service of choice")
 
+    ## Client-side rate limits, shared by all clients with the same
+    ## base_url, api_key and model
+    rpm_limit: Optional[int] = Field(
+        None, gt=0, description="Maximum requests per minute"
+    )
+    tpm_limit: Optional[int] = Field(
+        None, gt=0, description="Maximum tokens per minute"
+    )
+
+    ## Concurrency per endpoint, shared by the clients with the same settings
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, description="Maximum concurrent requests per endpoint"
+    )
+    adaptive_concurrency: bool = Field(
+        False,
+        description=(
+            "Adapt the concurrency limit to the latency and errors of the "
+            "endpoint, up to max_concurrency (default 64)"
+        ),
+    )
+
+    json_codec: Literal["auto", "orjson", "msgspec", "json"] = Field(
+        "auto",
+        description=(
+            "JSON codec for request and response bodies, auto picks orjson or "
+            "msgspec when installed and the standard library otherwise"
+        ),
+    )
+
+    ## Request body compression, opt-in
+    compression: Optional[Literal["gzip", "zstd"]] = Field(
+        None,
+        description=(
+            "Content-Encoding of large request bodies, zstd needs zstandard. "
+            "Falls back to what the server accepts when it rejects the body"
+        ),
+    )
+    compression_threshold: int = Field(
+        16 * 1024, ge=0, description="Minimum size of a body to compress (bytes)"
+    )
+
+    ## Model listings are cached process-wide, see _models_cache
+    models_cache_ttl: float = Field(
+        300,
+        ge=0,
+        description=(
+            "Time to live of model listings (available_models), cached for the "
+            "clients of the same base_url and API key (s), 0 disables"
+        ),
+    )
+    models_cache_path: Optional[str] = Field(
+        default_factory=lambda: os.getenv(MODELS_CACHE_ENV),
+        description=(
+            "Snapshot file of model listings that warms up new processes, "
+            f"${MODELS_CACHE_ENV} by default, see invalidate_available_models"
+        ),
+    )
+    defer_model_discovery: bool = Field(
+        False,
+        description=(
+            "Resolve and check the model on the first call instead of on "
+            "construction, which then makes no request. The model is None "
+            "until then when none is given"
+        ),
+    )
+    shared_transport: bool = Field(
+        True,
+        description=(
+            "Share connection pools with the other clients of the same base_url, "
+            "credential and pool options in the process. The pools are closed "
+            "when the last client sharing them is closed or garbage collected"
+        ),
+    )
+
+    ## Records of recent calls, see last_inputs, last_response and call_history
+    call_retention: Retention = Field(
+        "summary",
+        description=(
+            "What is kept of recent calls: nothing (off), their inputs and "
+            "responses with long strings, lists and bodies cut short (summary), "
+            "or everything (full)"
+        ),
+    )
+    call_history_size: int = Field(1, ge=1, description="Number of calls kept")
+
+    ## Timeouts, a hung endpoint must not hold a caller forever
+    connect_timeout: Optional[float] = Field(
+        10, gt=0, description="Timeout for connecting to the endpoint (s)"
+    )
+    read_timeout: Optional[float] = Field(
+        300,
+        gt=0,
+        description=(
+            "Timeout for the endpoint to start answering, and between the "
+            "chunks of a streamed answer (s)"
+        ),
+    )
+    deadline: Optional[float] = Field(
+        None,
+        gt=0,
+        description=(
+            "End-to-end time limit of a call, covering admission, connects, "
+            "reads, 202 polling, retries and streaming (s), past which "
+            "NVIDIADeadlineExceeded is raised. It can be set per call, e.g. "
+            "invoke(..., deadline=30)"
+        ),
+    )
+    stream_first_token_timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Time limit for the first event of a stream, from sending (s)",
+    )
+    stream_idle_timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        description=(
+            "Time limit between the events of a stream (s), a stream silent "
+            "for longer raises NVIDIAStreamStalled. Keep-alive comments do not "
+            "count as events"
+        ),
+    )
+    retry_stalled_streams: bool = Field(
+        False,
+        description=(
+            "Retry streams that stall before their first event like other "
+            "transient failures"
+        ),
+    )
+
+    ## Balancing over replicas, when base_url lists several
+    load_balancing: Policy = Field(
+        "least_outstanding",
+        description=(
+            "How requests are spread over replicas: to the one with the fewest "
+            "requests in flight (least_outstanding), the less loaded of two "
+            "picked at random (p2c), or the same one for chat requests sharing "
+            "a prefix, to reuse its prefix cache (prefix_affinity). Ties go to "
+            "the nearest replica"
+        ),
+    )
+    health_check_interval: float = Field(
+        10,
+        ge=0,
+        description=(
+            "Interval of the health probes of replicas, GET /v1/models (s), 0 "
+            "probes them once, on first use. Replicas failing their probe are "
+            "skipped while others are healthy"
+        ),
+    )
+
+    affinity_prefix_turns: int = Field(
+        1,
+        ge=0,
+        description=(
+            "Messages after the system prompt that make the prefix of a chat "
+            "request, with prefix_affinity"
+        ),
+    )
+    affinity_load_factor: float = Field(
+        1.25,
+        ge=1,
+        description=(
+            "Requests in flight a replica may take, relative to the average, "
+            "before prefix_affinity passes it over"
+        ),
+    )
+
+    ## Circuit breaking, per endpoint (replica), shared by the clients with the
+    ## same settings
+    circuit_breaker: bool = Field(
+        False,
+        description=(
+            "Fail fast with NVIDIACircuitOpen while an endpoint keeps failing, "
+            "and eject failing replicas from balancing, for circuit_cooldown. "
+            "See circuit_breakers for their state"
+        ),
+    )
+    circuit_failure_rate: float = Field(
+        0.5,
+        gt=0,
+        le=1,
+        description=(
+            "Fraction of recent requests failing (429/5xx, connection errors, "
+            "timeouts, stalls) that opens the circuit, as do five in a row"
+        ),
+    )
+    circuit_slow_call: Optional[float] = Field(
+        None,
+        gt=0,
+        description=(
+            "Latency above which a request counts as failed, to the first "
+            "event for streams (s)"
+        ),
+    )
+    circuit_cooldown: float = Field(
+        30, gt=0, description="Time an open circuit fails fast before a trial (s)"
+    )
+
+    ## Hedging of slow requests, opt-in
+    hedge_percentile: Optional[float] = Field(
+        None,
+        gt=0,
+        lt=100,
+        description=(
+            "Latency percentile of recent requests past which a duplicate of "
+            "a request is sent, e.g. 95, to the same endpoint or another "
+            "replica. The first answer wins, the other is cancelled. Streams "
+            "are not hedged"
+        ),
+    )
+    hedge_budget_ratio: float = Field(
+        0.05, ge=0, description="Hedges allowed as a fraction of recent requests"
+    )
+
+    coalesce_requests: bool = Field(
+        False,
+        description=(
+            "Make identical requests in flight at the same time, in the "
+            "process, a single call whose answer they all get. Chat requests "
+            "are coalesced only when deterministic, with temperature=0 or a "
+            "seed, streams never"
+        ),
+    )
+
     ## Generation arguments
     timeout: float = Field(60, ge=0, description="Timeout for waiting on response (s)")
-    interval: float = Field(0.02, ge=0, description="Interval for pulling response")
-    last_inputs: Optional[dict] = Field(
-        description="Last inputs sent over to the server"
+    interval: float = Field(
+        0.02, ge=0, description="Initial interval for polling a response (s)"
     )
-    last_response: Response = Field(
-        None, description="Last response sent from the server"
+    max_interval: float = Field(
+        2.0, ge=0, description="Maximum interval for polling a response (s)"
     )
     headers_tmpl: dict = Field(
-        {
+        # a factory is cheaper than the deep copy pydantic makes of a default
+        default_factory=lambda: {
             "call": {
                 "Accept": "application/json",
                 "Authorization": "Bearer **********",
@@ -98,7 +496,26 @@ class _NVIDIAClient(BaseModel):
         },
         description="Headers template must contain `call` and `stream` keys.",
     )
-    _available_models: Optional[List[Model]] = PrivateAttr(default=None)
+    # with the generation of the models cache they were listed in
+    _available_models: Optional[Tuple[int, List[Model]]] = PrivateAttr(default=None)
+    _transport: Optional[Transport] = PrivateAttr(default=None)
+    _release: Optional[weakref.finalize] = PrivateAttr(default=None)
+    _session_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _session_headers: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _request_headers: Dict[str, Dict[str, str]] = PrivateAttr(default_factory=dict)
+    _retry_budget: Optional[RetryBudget] = PrivateAttr(default=None)
+    _rate_limiter: Optional[RateLimiter] = PrivateAttr(default=None)
+    _scheduler: Optional[Scheduler] = PrivateAttr(default=None)
+    _balancer: Optional[Balancer] = PrivateAttr(default=None)
+    _release_balancer: Optional[weakref.finalize] = PrivateAttr(default=None)
+    _breakers: Optional[Dict[str, CircuitBreaker]] = PrivateAttr(default=None)
+    _hedger: Optional[Hedger] = PrivateAttr(default=None)
+    # the encoding in use, compression may be switched or turned off when the
+    # server rejects compressed bodies
+    _content_encoding: Optional[str] = PrivateAttr(default=None)
+    _model_resolved: bool = PrivateAttr(default=False)
+    _resolve_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: Optional[Deque[Call]] = PrivateAttr(default=None)
 
     ###################################################################################
     ################### Validation and Initialization #################################
@@ -113,6 +530,11 @@ class _NVIDIAClient(BaseModel):
                 raise ValueError(f"Invalid base_url format. {expected_format} Got: {v}")
         return v
 
+    @validator("compression")
+    def _validate_compression(cls, v: Optional[str]) -> Optional[str]:
+        check_encoding(v)
+        return v
+
     @root_validator(pre=True)
     def _preprocess_args(cls, values: Dict[str, Any]) -> Dict[str, Any]:
         values["api_key"] = (
@@ -125,33 +547,16 @@ class _NVIDIAClient(BaseModel):
         ## Making sure /v1 in added to the url, followed by infer_path
         if "base_url" in values:
             base_url = values["base_url"]
-            parsed = urlparse(base_url)
-            expected_format = "Expected format is: http://host:port"
-
-            if not (parsed.scheme and parsed.netloc):
-                raise ValueError(
-                    f"Invalid base_url format. {expected_format} Got: {base_url}"
-                )
-
-            if parsed.path:
-                normalized_path = parsed.path.strip("/")
-                if normalized_path == "v1":
-                    pass
-                elif normalized_path in [
-                    "v1/embeddings",
-                    "v1/completions",
-                    "v1/rankings",
-                ]:
-                    warnings.warn(f"Using {base_url}, ignoring the rest")
-                else:
-                    raise ValueError(
-                        f"Base URL path is not recognized. {expected_format}"
-                    )
-
-            base_url = urlunparse(
-                (parsed.scheme, parsed.netloc, "v1", None, None, None)
-            )
+            if isinstance(base_url, (list, tuple)):
+                if not base_url:
+                    raise ValueError("base_url must list at least one URL")
+                base_urls = [_normalize_base_url(url) for url in base_url]
+            else:
+                base_urls = [_normalize_base_url(base_url)]
+            # the first replica stands for all in the client's attributes
+            base_url = base_urls[0]
             values["base_url"] = base_url
+            values["base_urls"] = base_urls
             values["infer_path"] = values["infer_path"].format(base_url=base_url)
 
         return values
@@ -161,20 +566,41 @@ class _NVIDIAClient(BaseModel):
     #       use __post_init__ or model_validator(method="after")
     def __init__(self, **kwargs: Any):
         super().__init__(**kwargs)
+        self._content_encoding = self.compression
 
         self.is_hosted = urlparse(self.base_url).netloc in [
             "integrate.api.nvidia.com",
             "ai.api.nvidia.com",
         ]
 
-        if self.is_hosted:
-            if not self.api_key:
-                warnings.warn(
-                    "An API key is required for the hosted NIM. "
-                    "This will become an error in the future.",
-                    UserWarning,
-                )
+        if self.is_hosted and not self.api_key:
+            warnings.warn(
+                "An API key is required for the hosted NIM. "
+                "This will become an error in the future.",
+                UserWarning,
+            )
+
+        if not self.defer_model_discovery:
+            self.resolve_model()
+
+    def resolve_model(self) -> Optional[str]:
+        """
+        Resolve model_name to a known or listed model, once, and return it.
 
+        This checks the model is compatible with the client, picks the default
+        model if none was given and follows aliases, which may list the
+        models of the endpoint. It runs on construction, or with
+        defer_model_discovery on the first call.
+        """
+        if self._model_resolved:
+            return self.model_name
+        with self._resolve_lock:
+            if not self._model_resolved:
+                self._resolve_model()
+        return self.model_name
+
+    def _resolve_model(self) -> None:
+        if self.is_hosted:
             # set default model for hosted endpoint
             if not self.model_name:
                 self.model_name = self.default_hosted_model_name
@@ -234,6 +660,47 @@ class _NVIDIAClient(BaseModel):
                     )
                 else:
                     raise ValueError("No locally hosted model was found.")
+        self._model_resolved = True
+
+    async def aresolve_model(self) -> Optional[str]:
+        """Async version of resolve_model, listing models in an executor."""
+        if self._model_resolved:
+            return self.model_name
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.resolve_model
+        )
+
+    # sessions and locks belong to the process that created them, they are
+    # dropped when pickling and recreated on first use
+    _process_local_attrs = (
+        "_transport",
+        "_release",
+        "_session_lock",
+        "_resolve_lock",
+        "_calls",
+        "_retry_budget",
+        "_rate_limiter",
+        "_scheduler",
+        "_balancer",
+        "_release_balancer",
+        "_breakers",
+        "_hedger",
+    )
+
+    def __getstate__(self) -> Dict[Any, Any]:
+        state = super().__getstate__()
+        state["__private_attribute_values__"] = {
+            k: v
+            for k, v in state["__private_attribute_values__"].items()
+            if k not in self._process_local_attrs
+        }
+        return state
+
+    def __setstate__(self, state: Dict[Any, Any]) -> None:
+        super().__setstate__(state)
+        for name, attr in self.__private_attributes__.items():
+            if name not in state["__private_attribute_values__"]:
+                object.__setattr__(self, name, attr.get_default())
 
     ###################################################################################
     ################### LangChain functions ###########################################
@@ -249,7 +716,9 @@ class _NVIDIAClient(BaseModel):
     @property
     def lc_attributes(self) -> Dict[str, Any]:
         attributes: Dict[str, Any] = {}
-        attributes["base_url"] = self.base_url
+        attributes["base_url"] = (
+            self.base_urls if len(self.base_urls) > 1 else self.base_url
+        )
 
         if self.model_name:
             attributes["model"] = self.model_name
@@ -264,16 +733,400 @@ class _NVIDIAClient(BaseModel):
         return self.infer_path.format(base_url=self.base_url)
 
     ###################################################################################
-    ################### Authorization handling ########################################
+    ################### Connection pool and authorization handling ####################
 
-    def __add_authorization(self, payload: dict) -> dict:
+    def _init_headers(self) -> None:
+        """
+        Split headers_tmpl into headers attached once to a session and the
+        few headers that differ between regular and streaming calls.
+        """
+        static: Dict[str, str] = {}
+        for headers in self.headers_tmpl.values():
+            if "User-Agent" in headers:
+                static["User-Agent"] = headers["User-Agent"]
         if self.api_key:
-            payload = {**payload}
-            payload["headers"] = {
-                **payload.get("headers", {}),
-                "Authorization": f"Bearer {self.api_key.get_secret_value()}",
+            static["Authorization"] = f"Bearer {self.api_key.get_secret_value()}"
+        if not self.keep_alive:
+            static["Connection"] = "close"
+        self._session_headers = static
+
+        # the templates carry a masked Authorization header for debugging
+        # (see last_inputs), it must not shadow the real one on the session
+        self._request_headers = {
+            kind: {
+                k: v
+                for k, v in headers.items()
+                if k not in ("Authorization", "User-Agent")
             }
-        return payload
+            for kind, headers in self.headers_tmpl.items()
+        }
+        # bodies are sent pre-encoded, see _encode
+        for headers in self._request_headers.values():
+            headers.setdefault("Content-Type", "application/json")
+
+    def _get_transport(self) -> Transport:
+        """
+        Return the client's connection pools, acquiring them on first use.
+
+        Unless shared_transport is off, clients with the same base_url,
+        credential, headers and pool options share them. The client holds a
+        reference until it is closed or garbage collected.
+        """
+        transport = self._transport
+        if transport is None or transport.closed:
+            with self._session_lock:
+                if self._transport is None or self._transport.closed:
+                    self._init_headers()
+                    key = None
+                    if self.shared_transport:
+                        key = (
+                            self.base_url,
+                            hashlib.sha256(
+                                repr(sorted(self._session_headers.items())).encode()
+                            ).hexdigest(),
+                            self.pool_connections,
+                            self.pool_maxsize,
+                            self.get_session_fn,
+                        )
+                    self._transport = acquire_transport(key)
+                    self._release = weakref.finalize(self, self._transport.release)
+                transport = self._transport
+        return transport
+
+    def _get_session(self) -> requests.Session:
+        """
+        Return the long-lived session of the client's transport.
+
+        The session owns a connection pool shared by every request made through
+        it. Headers common to all requests, including Authorization, are
+        attached to the session once. Only the headers that differ between
+        regular and streaming calls are sent per request.
+        """
+        return self._get_transport().session(self._new_session)
+
+    def _new_session(self) -> requests.Session:
+        session = self.get_session_fn()
+        adapter = AbortableAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self._session_headers)
+        return session
+
+    def _get_aio_session(self) -> aiohttp.ClientSession:
+        """
+        Return the aiohttp session of the client's transport for the running
+        event loop. Like the requests session, it carries the static headers
+        and its connection pool is reused across calls.
+        """
+        return self._get_transport().aio_session(self._new_aio_session)
+
+    def _new_aio_session(self) -> aiohttp.ClientSession:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            # concurrency is bounded by the caller, not by the pool
+            limit=0,
+            force_close=not self.keep_alive,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self._session_headers,
+        )
+
+    def close(self) -> None:
+        """
+        Release the client's connection pools, they are closed when no other
+        client shares them, the aiohttp ones on their event loops, and its
+        balancer, which stops probing when no other client shares it. New ones
+        are acquired on next use.
+        """
+        with self._session_lock:
+            release, self._release, self._transport = self._release, None, None
+        self._close_balancer()
+        if release is not None:
+            release()
+
+    def _close_balancer(self) -> None:
+        with self._session_lock:
+            release, self._release_balancer = self._release_balancer, None
+            self._balancer = None
+        if release is not None:
+            release()
+
+    def _get_retrier(self) -> Retrier:
+        """Retry policy for a request, all requests share the client's budget."""
+        if self._retry_budget is None:
+            with self._session_lock:
+                if self._retry_budget is None:
+                    self._retry_budget = RetryBudget(ratio=self.retry_budget_ratio)
+        return Retrier(
+            max_retries=self.max_retries,
+            backoff=self.retry_backoff,
+            max_backoff=self.retry_max_backoff,
+            budget=self._retry_budget,
+        )
+
+    @property
+    def hedger(self) -> Optional[Hedger]:
+        """
+        The hedging policy of the client's non-streaming requests, None
+        without hedge_percentile. Its delay() is the latency past which a
+        request is hedged, learned from the client's recent requests, `hedges`
+        and `wins` count the duplicates sent and those that answered first.
+        """
+        if self.hedge_percentile is None:
+            return None
+        if self._hedger is None:
+            with self._session_lock:
+                if self._hedger is None:
+                    self._hedger = Hedger(
+                        self.hedge_percentile,
+                        # no floor, hedges only ever add the ratio
+                        RetryBudget(ratio=self.hedge_budget_ratio, min_per_second=0),
+                    )
+        return self._hedger
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """
+        The process-wide rate limiter this client shares with all clients for
+        the same base_url, api_key and model, None without rpm/tpm limits.
+        Its queue_depth tells how many requests are waiting for admission.
+        """
+        if not (self.rpm_limit or self.tpm_limit):
+            return None
+        if self._rate_limiter is None:
+            self._rate_limiter = get_rate_limiter(
+                self.base_url,
+                self.api_key.get_secret_value() if self.api_key else None,
+                self.model_name,
+                rpm=self.rpm_limit,
+                tpm=self.tpm_limit,
+            )
+        return self._rate_limiter
+
+    def charge_usage(
+        self,
+        usage: Optional[Dict[str, Any]],
+        response: Union[str, Response, None] = None,
+    ) -> None:
+        """
+        Charge a response's token usage to the tokens-per-minute limit, once:
+        not for a coalesced response, the caller that made the call charged it.
+        """
+        if self.coalesced(response):
+            return
+        if usage and (limiter := self.rate_limiter):
+            limiter.charge(usage.get("total_tokens", 0))
+
+    @staticmethod
+    def coalesced(response: Union[str, Response, None]) -> bool:
+        """Whether a response answered the identical call of another caller."""
+        return isinstance(response, Response) and bool(
+            response.__dict__.get("_coalesced")
+        )
+
+    def callback_output(
+        self, output: Dict[str, Any], response: Union[str, Response, None]
+    ) -> Dict[str, Any]:
+        """
+        The output of a response reported to callbacks: for a coalesced
+        response, marked as such and without its token usage, the caller that
+        made the call reported it.
+        """
+        if not self.coalesced(response):
+            return output
+        output = {k: v for k, v in output.items() if k not in ("token_usage", "usage")}
+        return {**output, "coalesced": True}
+
+    def _admit(self, deadline: Deadline) -> None:
+        if limiter := self.rate_limiter:
+            timeout = deadline.remaining()
+            try:
+                limiter.acquire(timeout)
+            except TimeoutError as e:
+                raise deadline.exceeded() from e
+
+    async def _aadmit(self, deadline: Deadline) -> None:
+        if limiter := self.rate_limiter:
+            timeout = deadline.remaining()
+            try:
+                await limiter.aacquire(timeout)
+            except TimeoutError as e:
+                raise deadline.exceeded() from e
+
+    @property
+    def scheduler(self) -> Optional[Scheduler]:
+        """
+        The process-wide scheduler of the inference endpoint, shared by all
+        clients talking to it, None without max_concurrency or
+        adaptive_concurrency.
+
+        With adaptive_concurrency, `scheduler.adaptive` exposes the current
+        limit and the latency and error rate estimates it is derived from.
+        """
+        if not self.max_concurrency and not self.adaptive_concurrency:
+            return None
+        if self._scheduler is None:
+            # replicas share the slots, the balancer spreads them
+            parsed = [urlparse(url) for url in self.base_urls or [self.infer_url]]
+            self._scheduler = get_scheduler(
+                ",".join(f"{p.scheme}://{p.netloc}" for p in parsed),
+                self.max_concurrency or _DEFAULT_MAX_ADAPTIVE_CONCURRENCY,
+                adaptive=self.adaptive_concurrency,
+            )
+        return self._scheduler
+
+    def _acquire_slot(
+        self, priority: Optional[Priority], deadline: Deadline = Deadline()
+    ) -> Lease:
+        """Wait for a slot on the endpoint, return the lease releasing it."""
+        priority = _check_priority(priority)
+        if (scheduler := self.scheduler) is None:
+            return Lease()
+        timeout = deadline.remaining()
+        try:
+            scheduler.acquire(priority, flow=id(self), timeout=timeout)
+        except TimeoutError as e:
+            raise deadline.exceeded() from e
+        return Lease(scheduler)
+
+    async def _aacquire_slot(
+        self, priority: Optional[Priority], deadline: Deadline = Deadline()
+    ) -> Lease:
+        priority = _check_priority(priority)
+        if (scheduler := self.scheduler) is None:
+            return Lease()
+        timeout = deadline.remaining()
+        try:
+            await scheduler.aacquire(priority, flow=id(self), timeout=timeout)
+        except asyncio.TimeoutError as e:
+            raise deadline.exceeded() from e
+        return Lease(scheduler)
+
+    @property
+    def balancer(self) -> Optional[Balancer]:
+        """
+        The process-wide balancer of the replicas of base_url, None for a
+        single one. Its endpoints expose the requests in flight, health and
+        probe latency of each replica. The client holds a reference until it
+        is closed or garbage collected.
+        """
+        if len(self.base_urls) < 2:
+            return None
+        balancer = self._balancer
+        if balancer is None:
+            with self._session_lock:
+                if self._balancer is None:
+                    self._init_headers()
+                    self._balancer = acquire_balancer(
+                        self.base_urls,
+                        self._session_headers,
+                        self.health_check_interval,
+                    )
+                    self._release_balancer = weakref.finalize(
+                        self, self._balancer.release
+                    )
+                balancer = self._balancer
+        return balancer
+
+    @property
+    def circuit_breakers(self) -> Dict[str, CircuitBreaker]:
+        """
+        The process-wide circuit breakers of the endpoint, or of each replica,
+        by base URL, none without circuit_breaker. Their state ("closed",
+        "open" or "half_open"), error_rate and trips count tell how the
+        endpoints fare.
+        """
+        if not self.circuit_breaker:
+            return {}
+        if self._breakers is None:
+            self._breakers = {
+                url: get_breaker(
+                    url,
+                    self.circuit_failure_rate,
+                    self.circuit_slow_call,
+                    self.circuit_cooldown,
+                )
+                for url in self.base_urls
+            }
+        return self._breakers
+
+    def _affinity_key(self, payload: dict) -> Optional[int]:
+        """The affinity key of a request, None unless routed by prefix."""
+        if self.load_balancing != "prefix_affinity" or len(self.base_urls) < 2:
+            return None
+        return affinity_key(payload, self.affinity_prefix_turns)
+
+    def _route(
+        self,
+        lease: Lease,
+        url: str,
+        tried: List[Endpoint],
+        key: Optional[int] = None,
+    ) -> str:
+        """
+        The URL of a request for `url` on the replica picked for it, by its
+        affinity key with prefix_affinity, which the lease holds until
+        released. Retries go to replicas not `tried` by the previous attempts
+        while there are some.
+
+        Raises NVIDIACircuitOpen, without sending, while the circuit of the
+        endpoint (of every replica) is open.
+        """
+        if (balancer := self.balancer) is None:
+            if (breaker := self.circuit_breakers.get(self.base_url)) is not None:
+                if not breaker.try_acquire():
+                    raise breaker.error()
+                lease.guard(breaker)
+            return url
+        breakers = self.circuit_breakers
+        endpoint = balancer.pick(
+            exclude=tried,
+            key=key,
+            policy=self.load_balancing,
+            load_factor=self.affinity_load_factor,
+            breakers=breakers,
+        )
+        tried.append(endpoint)
+        lease.hold(endpoint, breakers.get(endpoint.url))
+        return endpoint.url + url[len(self.base_url) :]
+
+    def _deadline(self, deadline: Optional[float] = None) -> Deadline:
+        """The deadline of a call starting now, the client's unless given one."""
+        return Deadline(self.deadline if deadline is None else deadline)
+
+    def _timeouts(self, deadline: Deadline) -> Tuple[Optional[float], Optional[float]]:
+        """The requests timeout of a request sent now."""
+        return deadline.timeouts(self.connect_timeout, self.read_timeout)
+
+    def _aio_timeout(self, deadline: Deadline) -> aiohttp.ClientTimeout:
+        """
+        The aiohttp timeout of a request sent now. aiohttp applies the total
+        to reading the body as well, streams included.
+        """
+        import aiohttp
+
+        return aiohttp.ClientTimeout(
+            total=deadline.remaining(),
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout,
+        )
+
+    async def aclose(self) -> None:
+        """
+        Async version of close, which also waits for the aiohttp connection
+        pool of the running event loop to be closed.
+        """
+        with self._session_lock:
+            transport, release = self._transport, self._release
+            self._release = self._transport = None
+        self._close_balancer()
+        if transport is not None and release is not None and release():
+            await transport.aclose()
 
     ###################################################################################
     ################### Model discovery and selection #################################
@@ -281,10 +1134,71 @@ class _NVIDIAClient(BaseModel):
     @property
     def available_models(self) -> list[Model]:
         """List the available models that can be invoked."""
-        if self._available_models is not None:
-            return self._available_models
+        # invalidate_available_models drops the models of every client too
+        generation = get_models_cache().generation
+        if (listed := self._available_models) is not None and listed[0] == generation:
+            return listed[1]
+
+        # built aside, concurrent readers see no list or the whole list
+        available_models = []
+        for element in self._list_models():
+            assert "id" in element, f"No id found in {element}"
+            if not (model := determine_model(element["id"])):
+                # model is not in table of known models, but it exists
+                # so we'll let it through. use of this model will be
+                # accompanied by a warning.
+                model = Model(id=element["id"])
+
+            # add base model for local-nim mode
+            model.base_model = element.get("root")
+
+            available_models.append(model)
+
+        self._available_models = (generation, available_models)
+        return available_models
 
-        response, _ = self._get(self.listing_path.format(base_url=self.base_url))
+    def _list_models(self) -> List[dict]:
+        """
+        The model listing of the endpoint, merged across its replicas: a
+        model is listed when any replica that answers lists it. Raises only
+        when none answers.
+        """
+        if len(self.base_urls) < 2:
+            return self._list_replica_models(self.base_url)
+        listed: Dict[str, dict] = {}
+        error: Optional[Exception] = None
+        for base_url in self.base_urls:
+            try:
+                models = self._list_replica_models(base_url)
+            except Exception as e:
+                logger.warning(f"Failed to list the models of {base_url}: {e}")
+                error = e
+                continue
+            for model in models:
+                listed.setdefault(model["id"], model)
+        if not listed and error is not None:
+            raise error
+        return list(listed.values())
+
+    def _list_replica_models(self, base_url: str) -> List[dict]:
+        """
+        The model listing of a replica, from the process-wide cache when
+        another client fetched it within models_cache_ttl.
+        """
+        url = self.listing_path.format(base_url=base_url)
+        cache = get_models_cache()
+        key = cache.key(url, self.api_key.get_secret_value() if self.api_key else None)
+        path = self.models_cache_path
+        if self.models_cache_ttl and (
+            (data := cache.get(key, self.models_cache_ttl, path)) is not None
+        ):
+            return data
+
+        deadline = self._deadline()
+        with deadline:
+            response, _ = self._get_retrier().call(
+                lambda: self._get(url, deadline), deadline
+            )
         # expecting -
         # {"object": "list",
         #  "data": [
@@ -298,22 +1212,10 @@ class _NVIDIAClient(BaseModel):
         #  ]
         # }
         assert response.status_code == 200, "Failed to get models"
-        assert "data" in response.json(), "No data found in response"
-        self._available_models = []
-        for element in response.json()["data"]:
-            assert "id" in element, f"No id found in {element}"
-            if not (model := determine_model(element["id"])):
-                # model is not in table of known models, but it exists
-                # so we'll let it through. use of this model will be
-                # accompanied by a warning.
-                model = Model(id=element["id"])
-
-            # add base model for local-nim mode
-            model.base_model = element.get("root")
-
-            self._available_models.append(model)
-
-        return self._available_models
+        assert "data" in (listing := self.decode(response)), "No data found in response"
+        if self.models_cache_ttl:
+            cache.put(key, listing["data"], path)
+        return listing["data"]
 
     def get_available_models(
         self,
@@ -339,78 +1241,360 @@ class _NVIDIAClient(BaseModel):
     ###################################################################################
     ## Core utilities for posting and getting from NV Endpoints #######################
 
+    @property
+    def codec(self) -> JSONCodec:
+        return get_codec(self.json_codec)
+
+    def _encode(self, payload: Optional[dict]) -> Optional[bytes]:
+        return None if payload is None else self.codec.dumps(payload)
+
+    def decode(self, response: Response) -> Any:
+        """
+        Decode the JSON body of a response. The body is parsed once, later
+        calls return the same object.
+        """
+        try:
+            return response.__dict__["_decoded"]
+        except KeyError:
+            decoded = response.__dict__["_decoded"] = self.codec.loads(response.content)
+            return decoded
+
+    def _body(
+        self, payload: Optional[dict], kind: str, compress: bool = True
+    ) -> Tuple[Optional[bytes], Dict[str, str]]:
+        """Encode a request body, compressed if it is large enough."""
+        headers = self._request_headers[kind]
+        data = self._encode(payload)
+        encoding = self._content_encoding
+        if (
+            data is None
+            or not compress
+            or encoding is None
+            or len(data) < self.compression_threshold
+        ):
+            return data, headers
+        return compress_body(data, encoding), {**headers, "Content-Encoding": encoding}
+
+    def _rejected(self, response: Any, headers: Dict[str, str]) -> Optional[bool]:
+        """
+        Whether the server rejected a compressed body. 415 answers say so,
+        and may list the encodings the server accepts (RFC 7694), the
+        encoding in use is switched to one of them or compression is turned
+        off. Other 400 answers may come from a server that failed to read the
+        compressed body or from a genuinely invalid request, the body is sent
+        again uncompressed to find out. Returns None if nothing was rejected,
+        otherwise whether the body should be resent compressed.
+        """
+        encoding = headers.get("Content-Encoding")
+        status = getattr(response, "status_code", None) or response.status
+        if encoding is None or status not in (400, 415):
+            return None
+        if status == 415:
+            accepted = negotiate(response.headers.get("Accept-Encoding"))
+            self._content_encoding = accepted if accepted != encoding else None
+            logger.warning(
+                f"{self.infer_url} rejected {encoding} request bodies, "
+                f"using {self._content_encoding or 'no compression'} instead"
+            )
+            return True
+        return False
+
+    def _accepted_uncompressed(self, response: Any) -> None:
+        """The server read an uncompressed body after rejecting a compressed one."""
+        status = getattr(response, "status_code", None) or response.status
+        if status < 400:
+            logger.warning(
+                f"{self.infer_url} cannot read {self._content_encoding} request "
+                "bodies, turning compression off"
+            )
+            self._content_encoding = None
+
+    def _send(
+        self,
+        send: Callable[[Optional[bytes], Dict[str, str]], Response],
+        payload: Optional[dict],
+        kind: str,
+    ) -> Response:
+        """Send a body, falling back when the server rejects compression."""
+        data, headers = self._body(payload, kind)
+        response = send(data, headers)
+        if (compress := self._rejected(response, headers)) is None:
+            return response
+        response.close()
+        response = send(*self._body(payload, kind, compress))
+        if not compress:
+            self._accepted_uncompressed(response)
+        return response
+
+    async def _asend(
+        self,
+        send: Callable[
+            [Optional[bytes], Dict[str, str]], Awaitable[aiohttp.ClientResponse]
+        ],
+        payload: Optional[dict],
+        kind: str,
+    ) -> aiohttp.ClientResponse:
+        """Async version of _send."""
+        data, headers = self._body(payload, kind)
+        response = await send(data, headers)
+        if (compress := self._rejected(response, headers)) is None:
+            return response
+        response.release()
+        response = await send(*self._body(payload, kind, compress))
+        if not compress:
+            self._accepted_uncompressed(response)
+        return response
+
     def _post(
         self,
         invoke_url: str,
         payload: Optional[dict] = {},
+        deadline: Deadline = Deadline(),
     ) -> Tuple[Response, requests.Session]:
         """Method for posting to the AI Foundation Model Function API."""
-        self.last_inputs = {
-            "url": invoke_url,
-            "headers": self.headers_tmpl["call"],
-            "json": payload,
-        }
-        session = self.get_session_fn()
-        self.last_response = response = session.post(
-            **self.__add_authorization(self.last_inputs)
+        self._record(
+            {
+                "url": invoke_url,
+                "headers": self.headers_tmpl["call"],
+                "json": payload,
+            }
+        )
+        session = self._get_session()
+        response = self._send(
+            lambda data, headers: session.post(
+                invoke_url,
+                headers=headers,
+                data=data,
+                timeout=self._timeouts(deadline),
+            ),
+            payload,
+            "call",
         )
+        self._record_response(response)
         self._try_raise(response)
         return response, session
 
     def _get(
         self,
         invoke_url: str,
+        deadline: Deadline = Deadline(),
     ) -> Tuple[Response, requests.Session]:
         """Method for getting from the AI Foundation Model Function API."""
-        self.last_inputs = {
-            "url": invoke_url,
-            "headers": self.headers_tmpl["call"],
-        }
-        session = self.get_session_fn()
-        self.last_response = response = session.get(
-            **self.__add_authorization(self.last_inputs)
+        self._record({"url": invoke_url, "headers": self.headers_tmpl["call"]})
+        session = self._get_session()
+        response = session.get(
+            invoke_url,
+            headers=self._request_headers["call"],
+            timeout=self._timeouts(deadline),
         )
+        self._record_response(response)
         self._try_raise(response)
         return response, session
 
-    def _wait(self, response: Response, session: requests.Session) -> Response:
+    def _poll(
+        self, response: Response, session: requests.Session, deadline: Deadline
+    ) -> Future:
+        """Hand a 202 response over to the process-wide NVCF poller."""
+        left = deadline.remaining()
+        return get_poller().submit(
+            response,
+            url_tmpl=self.polling_url_tmpl,
+            session=session,
+            headers=self._request_headers["call"],
+            timeout=self.timeout if left is None else min(self.timeout, left),
+            interval=self.interval,
+            max_interval=self.max_interval,
+            request_timeout=(self.connect_timeout, self.read_timeout),
+        )
+
+    def _wait(
+        self,
+        response: Response,
+        session: requests.Session,
+        deadline: Deadline = Deadline(),
+    ) -> Response:
         """
         Any request may return a 202 status code, which means the request is still
         processing. This method will wait for a response using the request id.
 
+        The status checks are done by a poller shared by all clients, with
+        exponential backoff, the calling thread only waits to be woken.
+
         see https://docs.nvidia.com/cloud-functions/user-guide/latest/cloud-function/api.html#http-polling
         """
-        start_time = time.time()
         # note: the local NIM does not return a 202 status code
         #       (per RL 22may2024 circa 24.05)
-        while (
-            response.status_code == 202
-        ):  # todo: there are no tests that reach this point
-            time.sleep(self.interval)
-            if (time.time() - start_time) > self.timeout:
-                raise TimeoutError(
-                    f"Timeout reached without a successful response."
-                    f"\nLast response: {str(response)}"
+        if response.status_code == 202:
+            future = self._poll(response, session, deadline)
+            try:
+                response = future.result(deadline.remaining())
+            except FutureTimeoutError:
+                # on 3.11+ also the poller's own TimeoutError, past self.timeout
+                if not deadline.expired:
+                    raise
+                future.cancel()  # stops the polling
+                raise deadline.exceeded() from None
+            self._record_response(response)
+        self._try_raise(response)
+        return response
+
+    async def _arequest(
+        self,
+        method: str,
+        url: str,
+        kind: str,
+        payload: Optional[dict] = None,
+        deadline: Deadline = Deadline(),
+    ) -> Response:
+        """
+        Issue a request with aiohttp and return it as a requests.Response,
+        which lets the async path share response handling with the sync one.
+        """
+        session = self._get_aio_session()
+        aio_response = await self._asend(
+            lambda data, headers: session.request(
+                method,
+                url,
+                headers=headers,
+                data=data,
+                timeout=self._aio_timeout(deadline),
+            ),
+            payload,
+            kind,
+        )
+        async with aio_response:
+            content = await aio_response.read()
+        return _to_response(aio_response, content)
+
+    async def _apost(
+        self,
+        invoke_url: str,
+        payload: Optional[dict] = {},
+        deadline: Deadline = Deadline(),
+    ) -> Response:
+        """Async version of _post."""
+        self._record(
+            {
+                "url": invoke_url,
+                "headers": self.headers_tmpl["call"],
+                "json": payload,
+            }
+        )
+        self._get_aio_session()  # make sure the request headers are ready
+        response = await self._arequest("POST", invoke_url, "call", payload, deadline)
+        self._record_response(response)
+        self._try_raise(response)
+        return response
+
+    async def _aget(
+        self,
+        invoke_url: str,
+        deadline: Deadline = Deadline(),
+    ) -> Response:
+        """Async version of _get."""
+        self._record({"url": invoke_url, "headers": self.headers_tmpl["call"]})
+        self._get_aio_session()  # make sure the request headers are ready
+        response = await self._arequest("GET", invoke_url, "call", None, deadline)
+        self._record_response(response)
+        self._try_raise(response)
+        return response
+
+    async def _await(
+        self, response: Response, deadline: Deadline = Deadline()
+    ) -> Response:
+        """Async version of _wait, waits without blocking the event loop."""
+        if response.status_code == 202:
+            future = self._poll(response, self._get_session(), deadline)
+            try:
+                # cancelling the wrapper on timeout cancels the future
+                response = await asyncio.wait_for(
+                    asyncio.wrap_future(future), deadline.remaining()
                 )
-            assert (
-                "NVCF-REQID" in response.headers
-            ), "Received 202 response with no request id to follow"
-            request_id = response.headers.get("NVCF-REQID")
-            # todo: this needs testing, missing auth header update
-            self.last_response = response = session.get(
-                self.polling_url_tmpl.format(request_id=request_id),
-                headers=self.headers_tmpl["call"],
-            )
+            except asyncio.TimeoutError:
+                if not deadline.expired:
+                    raise
+                raise deadline.exceeded() from None
+            self._record_response(response)
         self._try_raise(response)
         return response
 
+    def _record(self, inputs: dict) -> None:
+        """
+        Record the inputs of a call, as call_retention says. The client keeps
+        the last call_history_size records, the current thread or asyncio
+        task the last one made in it.
+        """
+        if self.call_retention == "off":
+            return
+        if self.call_retention == "summary":
+            inputs = summarize(inputs)
+        call = Call(weakref.ref(self), inputs)
+        with self._session_lock:
+            if self._calls is None:
+                self._calls = deque(maxlen=self.call_history_size)
+            self._calls.append(call)
+        last_call.set(call)
+
+    def _record_response(self, response: Response) -> None:
+        """
+        Complete the record of the call in progress with its response. A
+        record is replaced, never modified, so readers never see the inputs
+        of a call with the response of another.
+        """
+        call = last_call.get()
+        if call is None or call.client() is not self:
+            return
+        if self.call_retention == "summary":
+            response = summarize_response(response)
+        done = call._replace(response=response)
+        with self._session_lock:
+            calls = self._calls if self._calls is not None else deque()
+            for i in range(len(calls) - 1, -1, -1):
+                if calls[i] is call:
+                    calls[i] = done
+                    break
+        last_call.set(done)
+
+    def _current_call(self) -> Optional[Call]:
+        # the client's last call in this thread or task, if it made one there,
+        # otherwise its last call anywhere, e.g. in a task that has finished
+        call = last_call.get()
+        if call is None or call.client() is not self:
+            call = self._calls[-1] if self._calls else None
+        return call
+
+    @property
+    def last_inputs(self) -> Optional[dict]:
+        """
+        The url, headers and payload of the client's last call in the current
+        thread or asyncio task (if none, of its last call), for debugging.
+        The Authorization header is masked. Long values are cut short with
+        call_retention="summary", there is none with "off".
+        """
+        return call.inputs if (call := self._current_call()) else None
+
+    @property
+    def last_response(self) -> Optional[Response]:
+        """
+        The response to the call of last_inputs, None before it arrives. With
+        call_retention="summary", a large body is cut short.
+        """
+        return call.response if (call := self._current_call()) else None
+
+    @property
+    def call_history(self) -> List[Tuple[dict, Optional[Response]]]:
+        """The inputs and responses of the last call_history_size calls."""
+        with self._session_lock:
+            calls = list(self._calls or ())
+        return [(call.inputs, call.response) for call in calls]
+
     def _try_raise(self, response: Response) -> None:
         """Try to raise an error from a response"""
         try:
             response.raise_for_status()
         except requests.HTTPError:
             try:
-                rd = response.json()
+                rd = self.decode(response)
                 if "detail" in rd and "reqId" in rd.get("detail", ""):
                     rd_buf = "- " + str(rd["detail"])
                     rd_buf = rd_buf.replace(": ", ", Error: ").replace(", ", "\n- ")
@@ -446,8 +1630,13 @@ class _NVIDIAClient(BaseModel):
                 body = rd.get("detail", rd)
             if str(status) == "401":
                 body += "\nPlease check or regenerate your API key."
-            # todo: raise as an HTTPError
-            raise Exception(f"{header}\n{body}") from None
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                raise NVIDIARetryableError(
+                    f"{header}\n{body}",
+                    response=response,
+                    retry_after=parse_retry_after(response.headers),
+                ) from None
+            raise NVIDIAHTTPError(f"{header}\n{body}", response=response) from None
 
     ###################################################################################
     ## Generation interface to allow users to generate new values from endpoints ######
@@ -455,10 +1644,139 @@ class _NVIDIAClient(BaseModel):
     def get_req(
         self,
         payload: dict = {},
+        priority: Optional[Priority] = None,
+        deadline: Optional[float] = None,
     ) -> Response:
-        """Post to the API."""
-        response, session = self._post(self.infer_url, payload)
-        return self._wait(response, session)
+        """
+        Post to the API, retrying transient failures.
+
+        With max_concurrency set, the request waits for a slot on the endpoint
+        in the lane of its priority ("interactive", "default" or "batch").
+        With adaptive_concurrency, its latency and outcome adjust the limit.
+
+        The call, retries included, raises NVIDIADeadlineExceeded once it has
+        taken `deadline` seconds (the client's deadline by default).
+
+        With hedge_percentile set, an attempt still running past that latency
+        percentile of the recent requests is duplicated, to another replica
+        when there are several, and the first answer wins.
+
+        With coalesce_requests set, identical requests made while one is in
+        flight wait for its answer instead of being sent (see _flight_key).
+        """
+        call_deadline = self._deadline(deadline)
+        tried: List[Endpoint] = []
+        key = self._affinity_key(payload)
+
+        def attempt() -> Response:
+            lease = self._acquire_slot(priority, call_deadline)
+            try:
+                self._admit(call_deadline)
+                url = self._route(lease, self.infer_url, tried, key)
+                lease.start()
+                response, session = self._post(url, payload, call_deadline)
+                response = self._wait(response, session, call_deadline)
+            except _RETRYABLE_EXCEPTIONS:
+                # a hedged attempt that lost tells nothing of the endpoint
+                if not cancelled():
+                    lease.observe(overloaded=True)
+                raise
+            else:
+                lease.observe()
+                return response
+            finally:
+                lease()
+
+        hedger = self.hedger
+
+        def call() -> Response:
+            with call_deadline:
+                return self._get_retrier().call(
+                    attempt
+                    if hedger is None
+                    else lambda: hedger.call(attempt, call_deadline, Response.close),
+                    call_deadline,
+                )
+
+        if (flight := self._flight_key(payload)) is None:
+            return call()
+        response, shared = singleflight.call(flight, call, call_deadline)
+        return self._share(payload, response) if shared else response
+
+    async def aget_req(
+        self,
+        payload: dict = {},
+        priority: Optional[Priority] = None,
+        deadline: Optional[float] = None,
+    ) -> Response:
+        """Post to the API without blocking the event loop."""
+        call_deadline = self._deadline(deadline)
+        tried: List[Endpoint] = []
+        key = self._affinity_key(payload)
+
+        async def attempt() -> Response:
+            lease = await self._aacquire_slot(priority, call_deadline)
+            try:
+                await self._aadmit(call_deadline)
+                url = self._route(lease, self.infer_url, tried, key)
+                lease.start()
+                response = await self._apost(url, payload, call_deadline)
+                response = await self._await(response, call_deadline)
+            except _aretryable_exceptions():
+                lease.observe(overloaded=True)
+                raise
+            else:
+                lease.observe()
+                return response
+            finally:
+                lease()
+
+        hedger = self.hedger
+
+        async def call() -> Response:
+            with call_deadline:
+                return await self._get_retrier().acall(
+                    attempt
+                    if hedger is None
+                    else lambda: hedger.acall(attempt, call_deadline),
+                    call_deadline,
+                )
+
+        if (flight := self._flight_key(payload)) is None:
+            return await call()
+        response, shared = await singleflight.acall(flight, call, call_deadline)
+        return self._share(payload, response) if shared else response
+
+    def _flight_key(self, payload: dict) -> Optional[bytes]:
+        """
+        The key identical requests share with coalesce_requests, None for
+        requests that are not coalesced: generations unless deterministic.
+        """
+        if not self.coalesce_requests or not coalescible(payload):
+            return None
+        return flight_key(
+            self.infer_url,
+            self.api_key.get_secret_value() if self.api_key else None,
+            payload,
+        )
+
+    def _share(self, payload: dict, response: Response) -> Response:
+        """
+        The response of a call answered by the identical call of another
+        caller: a copy of it, decoded apart, marked as coalesced.
+        """
+        # pickling state, the body without the decoded cache or connection
+        response = copy.copy(response)
+        response.__dict__["_coalesced"] = True
+        self._record(
+            {
+                "url": self.infer_url,
+                "headers": self.headers_tmpl["call"],
+                "json": payload,
+            }
+        )
+        self._record_response(response)
+        return response
 
     def postprocess(
         self,
@@ -467,13 +1785,31 @@ class _NVIDIAClient(BaseModel):
         """Parses a response from the AI Foundation Model Function API.
         Strongly assumes that the API will return a single response.
         """
-        return self._aggregate_msgs(self._process_response(response))
+        msg, is_stopped = self._aggregate_msgs(self._process_response(response))
+        self.charge_usage(msg.get("token_usage"), response)
+        return msg, is_stopped
+
+    def _postprocess_event(self, data: bytes) -> Optional[Tuple[dict, bool]]:
+        """
+        Parse the data of one event of a stream, None for an event that is not
+        a JSON object, e.g. a keep-alive, which is skipped.
+        """
+        try:
+            event = self.codec.loads(data)
+        except json.JSONDecodeError:
+            event = None
+        if not isinstance(event, dict):
+            logger.debug(f"Skipping stream event that is not a JSON object: {data!r}")
+            return None
+        msg, is_stopped = self._aggregate_msgs([event])
+        self.charge_usage(msg.get("token_usage"))
+        return msg, is_stopped
 
     def _process_response(self, response: Union[str, Response]) -> List[dict]:
         """General-purpose response processing for single responses and streams"""
-        if hasattr(response, "json"):  ## For single response (i.e. non-streaming)
+        if isinstance(response, Response):  ## For single response (non-streaming)
             try:
-                return [response.json()]
+                return [self.decode(response)]
             except json.JSONDecodeError:
                 response = str(response.__dict__)
         if isinstance(response, str):  ## For set of responses (i.e. streaming)
@@ -525,31 +1861,297 @@ class _NVIDIAClient(BaseModel):
     ###################################################################################
     ## Streaming interface to allow you to iterate through progressive generations ####
 
+    def _watch(self) -> StreamWatch:
+        return StreamWatch(self.stream_first_token_timeout, self.stream_idle_timeout)
+
+    def _stream_retry_on(self) -> Tuple[Type[Exception], ...]:
+        return (NVIDIAStreamStalled,) if self.retry_stalled_streams else ()
+
+    def _watched_chunks(
+        self, response: Response, watch: StreamWatch, deadline: Deadline
+    ) -> Iterator[bytes]:
+        """
+        The chunks of a streamed response, each read timing out at the first
+        of read_timeout, the stall limit of the stream and the deadline.
+        """
+        chunks = iter_chunks(response)
+        while True:
+            set_read_timeout(response, deadline.clamp(watch.timeout(self.read_timeout)))
+            if (chunk := next(chunks, None)) is None:
+                return
+            yield chunk
+
     def get_req_stream(
         self,
         payload: dict,
-    ) -> Iterator[Dict]:
-        self.last_inputs = {
-            "url": self.infer_url,
-            "headers": self.headers_tmpl["stream"],
-            "json": payload,
-        }
+        priority: Optional[Priority] = None,
+        deadline: Optional[float] = None,
+    ) -> Generator[Dict, None, None]:
+        """
+        Post to the API and stream the events of the answer. The deadline
+        covers the whole stream, the gaps between its chunks are bounded by
+        read_timeout. A stream that goes silent for stream_first_token_timeout
+        before its first event, or stream_idle_timeout after, raises
+        NVIDIAStreamStalled.
+
+        The first event is awaited here, failures before it are retried.
 
-        response = self.get_session_fn().post(
-            **self.__add_authorization(self.last_inputs)
+        Closing the returned generator, or dropping it, cancels the stream:
+        its connection is closed, which makes the server stop generating.
+        """
+        call_deadline = self._deadline(deadline)
+        self._record(
+            {
+                "url": self.infer_url,
+                "headers": self.headers_tmpl["stream"],
+                "json": payload,
+            }
         )
-        self._try_raise(response)
-        call = self.copy()
-
-        def out_gen() -> Generator[dict, Any, Any]:
-            ## Good for client, since it allows self.last_inputs
-            for line in response.iter_lines():
-                if line and line.strip() != b"data: [DONE]":
-                    line = line.decode("utf-8")
-                    msg, final_line = call.postprocess(line)
-                    yield msg
-                    if final_line:
-                        break
+        tried: List[Endpoint] = []
+        key = self._affinity_key(payload)
+
+        def connect() -> (
+            Tuple[Response, Lease, StreamWatch, Optional[bytes], Iterator[bytes]]
+        ):
+            lease = self._acquire_slot(priority, call_deadline)
+            response: Optional[Response] = None
+            try:
+                self._admit(call_deadline)
+                url = self._route(lease, self.infer_url, tried, key)
+                lease.start()
+                watch = self._watch()
+                connect_timeout, read_timeout = self._timeouts(call_deadline)
+                session = self._get_session()
+                response = self._send(
+                    lambda data, headers: session.post(
+                        url,
+                        headers=headers,
+                        data=data,
+                        stream=True,
+                        timeout=(connect_timeout, watch.timeout(read_timeout)),
+                    ),
+                    payload,
+                    "stream",
+                )
+                self._record_response(response)
                 self._try_raise(response)
+                events = SSEDecoder().events(
+                    self._watched_chunks(response, watch, call_deadline)
+                )
+                with watch:
+                    if (first := next(events, None)) is not None:
+                        watch.event()
+            except BaseException as e:
+                lease.observe(
+                    overloaded=isinstance(
+                        e, _RETRYABLE_EXCEPTIONS + (NVIDIAStreamStalled,)
+                    )
+                )
+                if response is not None:
+                    response.close()
+                lease()
+                raise
+            # the latency of a stream is its time to first event, its length
+            # depends on the number of tokens generated
+            lease.observe()
+            return response, lease, watch, first, events
+
+        with call_deadline:
+            response, lease, watch, first, events = self._get_retrier().call(
+                connect, call_deadline, retry_on=self._stream_retry_on()
+            )
+
+        def out_gen() -> Generator[dict, None, None]:
+            try:
+                with watch, call_deadline:
+                    data = first
+                    while data is not None:
+                        if (event := self._postprocess_event(data)) is not None:
+                            msg, final_line = event
+                            yield msg
+                            if final_line:
+                                break
+                        if (data := next(events, None)) is not None:
+                            watch.event()
+                # read on to the end of the body, usually just [DONE], so
+                # that the connection is reused
+                drain(response)
+            finally:
+                # a finished body has already gone back to the pool, closing
+                # an unfinished one, e.g. of a stream abandoned, drops its
+                # connection
+                response.close()
+                lease()
+
+        gen = out_gen()
+        # the connection and endpoint slot are held for the life of the
+        # stream, a stream dropped before it was started must free them too
+        weakref.finalize(gen, _close_stream, response, lease)
+        return gen
+
+    async def _awatched_chunks(
+        self, aio_response: aiohttp.ClientResponse, watch: StreamWatch
+    ) -> AsyncIterator[bytes]:
+        """
+        Async version of _watched_chunks. aiohttp enforces read_timeout and
+        the deadline itself, the stall limits are only set when configured.
+        """
+        chunks = aio_response.content.iter_any().__aiter__()
+        while True:
+            try:
+                if (timeout := watch.timeout()) is None:
+                    chunk = await chunks.__anext__()
+                else:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            yield chunk
+
+    async def aget_req_stream(
+        self,
+        payload: dict,
+        priority: Optional[Priority] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncGenerator[Dict, None]:
+        """Async version of get_req_stream."""
+        call_deadline = self._deadline(deadline)
+        self._record(
+            {
+                "url": self.infer_url,
+                "headers": self.headers_tmpl["stream"],
+                "json": payload,
+            }
+        )
+        session = self._get_aio_session()
+        tried: List[Endpoint] = []
+        key = self._affinity_key(payload)
+
+        async def connect() -> (
+            Tuple[
+                aiohttp.ClientResponse,
+                Lease,
+                StreamWatch,
+                Optional[bytes],
+                AsyncIterator[bytes],
+            ]
+        ):
+            lease = await self._aacquire_slot(priority, call_deadline)
+            aio_response: Optional[aiohttp.ClientResponse] = None
+            try:
+                await self._aadmit(call_deadline)
+                url = self._route(lease, self.infer_url, tried, key)
+                lease.start()
+                watch = self._watch()
+                aio_response = await self._asend(
+                    lambda data, headers: session.post(
+                        url,
+                        headers=headers,
+                        data=data,
+                        timeout=self._aio_timeout(call_deadline),
+                    ),
+                    payload,
+                    "stream",
+                )
+                if aio_response.status >= 400:
+                    content = await aio_response.read()
+                    aio_response.release()
+                    self._try_raise(_to_response(aio_response, content))
+                events = SSEDecoder().aevents(
+                    self._awatched_chunks(aio_response, watch)
+                )
+                with watch:
+                    try:
+                        first: Optional[bytes] = await events.__anext__()
+                        watch.event()
+                    except StopAsyncIteration:
+                        first = None
+            except BaseException as e:
+                lease.observe(
+                    overloaded=isinstance(
+                        e, _aretryable_exceptions() + (NVIDIAStreamStalled,)
+                    )
+                )
+                if aio_response is not None:
+                    aio_response.close()
+                lease()
+                raise
+            lease.observe()
+            return aio_response, lease, watch, first, events
+
+        with call_deadline:
+            aio_response, lease, watch, first, events = await self._get_retrier().acall(
+                connect, call_deadline, retry_on=self._stream_retry_on()
+            )
+        try:
+            with watch, call_deadline:
+                data = first
+                while data is not None:
+                    if (event := self._postprocess_event(data)) is not None:
+                        msg, final_line = event
+                        yield msg
+                        if final_line:
+                            break
+                    try:
+                        data = await events.__anext__()
+                        watch.event()
+                    except StopAsyncIteration:
+                        data = None
+                await adrain(aio_response)
+        except BaseException:
+            # cancelled, e.g. by aclose(), or failed: drop the connection
+            aio_response.close()
+            raise
+        finally:
+            aio_response.release()
+            lease()
+
+
+def _normalize_base_url(base_url: str) -> str:
+    """Check a base URL and reduce it to scheme://host:port/v1."""
+    parsed = urlparse(base_url)
+    expected_format = "Expected format is: http://host:port"
+
+    if not (parsed.scheme and parsed.netloc):
+        raise ValueError(f"Invalid base_url format. {expected_format} Got: {base_url}")
+
+    if parsed.path:
+        normalized_path = parsed.path.strip("/")
+        if normalized_path == "v1":
+            pass
+        elif normalized_path in [
+            "v1/embeddings",
+            "v1/completions",
+            "v1/rankings",
+        ]:
+            warnings.warn(f"Using {base_url}, ignoring the rest")
+        else:
+            raise ValueError(f"Base URL path is not recognized. {expected_format}")
+
+    return urlunparse((parsed.scheme, parsed.netloc, "v1", None, None, None))
+
+
+def _close_stream(response: Response, lease: Lease) -> None:
+    response.close()
+    lease()
+
+
+def _check_priority(priority: Optional[str]) -> Priority:
+    if priority is None:
+        return "default"
+    if priority not in PRIORITIES:
+        raise ValueError(
+            f"Unknown priority {priority!r}, expected one of {list(PRIORITIES)}"
+        )
+    return priority  # type: ignore[return-value]
+
 
-        return (r for r in out_gen())
+def _to_response(aio_response: aiohttp.ClientResponse, content: bytes) -> Response:
+    """Wrap a completed aiohttp response and its body in a requests.Response."""
+    response = Response()
+    response.status_code = aio_response.status
+    response.reason = aio_response.reason or ""
+    response.headers = CaseInsensitiveDict(aio_response.headers)
+    response.url = str(aio_response.url)
+    response.encoding = aio_response.charset
+    response._content = content
+    return response
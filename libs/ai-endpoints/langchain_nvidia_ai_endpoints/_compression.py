@@ -0,0 +1,72 @@
+"""Compression of request bodies (Content-Encoding)."""
+
+from __future__ import annotations
+
+import gzip
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+
+    has_zstd = True
+except ImportError:
+    has_zstd = False
+
+# fast levels, the point is to save upload time, not bytes at any cost
+_GZIP_LEVEL = 5
+_ZSTD_LEVEL = 3
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=_GZIP_LEVEL)
+
+
+def _zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+
+
+_COMPRESSORS = {"zstd": _zstd, "gzip": _gzip}
+_INSTALLED = {"zstd": has_zstd, "gzip": True}
+
+
+def compress_body(data: bytes, encoding: str) -> bytes:
+    return _COMPRESSORS[encoding](data)
+
+
+def check_encoding(encoding: Optional[str]) -> None:
+    """Raise ValueError for an unknown or unavailable encoding."""
+    if encoding is None:
+        return
+    if encoding not in _COMPRESSORS:
+        raise ValueError(
+            f"Unknown compression {encoding!r}, expected one of {list(_COMPRESSORS)}"
+        )
+    if not _INSTALLED[encoding]:
+        raise ValueError(
+            f"{encoding} compression requires the zstandard package."
+            " Please install it using `pip install zstandard`."
+        )
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the encoding to use from the Accept-Encoding a server sent back with
+    a 415 response (RFC 7694), None if it accepts none we support.
+    """
+    accepted: Dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                pass
+        if name:
+            accepted[name.strip().lower()] = q
+    candidates: List[str] = [
+        encoding
+        for encoding, installed in _INSTALLED.items()
+        if installed and accepted.get(encoding, 0) > 0
+    ]
+    return candidates[0] if candidates else None
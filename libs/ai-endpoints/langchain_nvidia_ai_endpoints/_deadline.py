@@ -0,0 +1,150 @@
+"""Time limits of calls: end-to-end deadlines and stream stalls."""
+
+from __future__ import annotations
+
+import time
+from types import TracebackType
+from typing import Optional, Tuple, Type
+
+import requests
+
+from langchain_nvidia_ai_endpoints.errors import (
+    NVIDIADeadlineExceeded,
+    NVIDIAStreamStalled,
+)
+
+
+class Deadline:
+    """
+    The time by which a call must be over: admission, connects, reads, 202
+    polling, retries and, for streams, the whole stream. A deadline of None
+    never expires.
+
+    Used as a context manager, it turns a failure that happens once the
+    deadline has passed, e.g. a read timeout cut short to fit it, into
+    NVIDIADeadlineExceeded.
+    """
+
+    __slots__ = ("seconds", "expires")
+
+    def __init__(self, seconds: Optional[float] = None) -> None:
+        self.seconds = seconds
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def exceeded(self) -> NVIDIADeadlineExceeded:
+        return NVIDIADeadlineExceeded(f"Deadline of {self.seconds}s exceeded")
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, None without a deadline. Raises once it has passed."""
+        if self.expires is None:
+            return None
+        left = self.expires - time.monotonic()
+        if left <= 0:
+            raise self.exceeded()
+        return left
+
+    def clamp(self, timeout: Optional[float]) -> Optional[float]:
+        """The smaller of a timeout (None for none) and the time left."""
+        left = self.remaining()
+        if left is None or (timeout is not None and timeout < left):
+            return timeout
+        return left
+
+    def timeouts(
+        self, connect: Optional[float], read: Optional[float]
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """The (connect, read) timeouts of a request sent now, for requests."""
+        return self.clamp(connect), self.clamp(read)
+
+    def __enter__(self) -> Deadline:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        # errors carrying a response say more than the deadline would
+        if (
+            isinstance(exc, Exception)
+            and not isinstance(exc, (NVIDIADeadlineExceeded, requests.HTTPError))
+            and self.expired
+        ):
+            raise self.exceeded() from exc
+
+
+class StreamWatch:
+    """
+    The time limits of a stream between its events: `first_token` seconds
+    from sending the request to the first event, then `idle` seconds between
+    events. A limit of None is no limit. Bytes that carry no event, e.g.
+    keep-alive comments, do not count.
+
+    Used as a context manager, it turns a failure that happens once a limit
+    has passed, e.g. a read timeout set with timeout(), into
+    NVIDIAStreamStalled.
+    """
+
+    __slots__ = ("first_token", "idle", "events", "last")
+
+    def __init__(self, first_token: Optional[float], idle: Optional[float]) -> None:
+        self.first_token = first_token
+        self.idle = idle
+        self.events = 0
+        self.last = time.monotonic()
+
+    @property
+    def limit(self) -> Optional[float]:
+        return self.idle if self.events else self.first_token
+
+    def event(self) -> None:
+        """Note the arrival of an event."""
+        self.events += 1
+        self.last = time.monotonic()
+
+    @property
+    def stalled(self) -> bool:
+        limit = self.limit
+        return limit is not None and time.monotonic() - self.last >= limit
+
+    def stall(self) -> NVIDIAStreamStalled:
+        if self.events:
+            message = f"No event for {self.idle}s after {self.events} events"
+        else:
+            message = f"No first event within {self.first_token}s"
+        return NVIDIAStreamStalled(f"Stream stalled: {message}", self.events)
+
+    def timeout(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        The smaller of a timeout (None for none) and the time left before the
+        current limit. Raises once the limit has passed.
+        """
+        if (limit := self.limit) is None:
+            return timeout
+        left = self.last + limit - time.monotonic()
+        if left <= 0:
+            raise self.stall()
+        return left if timeout is None or left < timeout else timeout
+
+    def __enter__(self) -> StreamWatch:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if (
+            isinstance(exc, Exception)
+            and not isinstance(
+                exc, (NVIDIAStreamStalled, NVIDIADeadlineExceeded, requests.HTTPError)
+            )
+            and self.stalled
+        ):
+            raise self.stall() from exc
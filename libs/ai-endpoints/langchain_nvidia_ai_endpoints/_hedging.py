@@ -0,0 +1,374 @@
+"""Hedged requests: a duplicate of a slow request, the first answer wins."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from langchain_nvidia_ai_endpoints._deadline import Deadline
+from langchain_nvidia_ai_endpoints._retry import RetryBudget
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# latencies the percentile is learned from, and the fewest to trust it
+_WINDOW = 200
+_MIN_SAMPLES = 20
+# threads running the hedges of sync calls, shared by all clients
+_MAX_WORKERS = 64
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_MAX_WORKERS, thread_name_prefix="nvidia-hedge"
+                )
+    return _executor
+
+
+class _Timers:
+    """Callbacks run after a delay, on one thread shared by all hedgers."""
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self._order = itertools.count()
+        self._wakeup = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> None:
+        with self._wakeup:
+            due = time.monotonic() + delay
+            heapq.heappush(self._heap, (due, next(self._order), callback))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="nvidia-hedge-timer", daemon=True
+                )
+                self._thread.start()
+            self._wakeup.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._wakeup:
+                while True:
+                    if not self._heap:
+                        self._wakeup.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._wakeup.wait(wait)
+                callback = heapq.heappop(self._heap)[2]
+            try:
+                callback()
+            except Exception:
+                logger.exception("Hedge timer callback failed")
+
+
+_timers = _Timers()
+
+
+class Attempt:
+    """
+    An attempt of a hedged sync call. Once the other attempt wins, it is
+    cancelled: the aborts registered by the code it runs (see on_cancel) are
+    called, e.g. shutting down its connection so that it fails at once.
+    """
+
+    __slots__ = ("cancelled", "_aborts", "_lock")
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self._aborts: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, abort: Callable[[], None]) -> None:
+        with self._lock:
+            if not self.cancelled:
+                self._aborts.append(abort)
+                return
+        abort()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            aborts, self._aborts = self._aborts, []
+        for abort in aborts:
+            abort()
+
+
+_attempt: contextvars.ContextVar[Optional[Attempt]] = contextvars.ContextVar(
+    "nvidia_hedged_attempt", default=None
+)
+
+
+def current_attempt() -> Optional[Attempt]:
+    """The hedged sync attempt running in this context, None outside one."""
+    return _attempt.get()
+
+
+def cancelled() -> bool:
+    """Whether the running attempt lost to the other one of its hedged call."""
+    attempt = _attempt.get()
+    return attempt is not None and attempt.cancelled
+
+
+def adopt_context(context: contextvars.Context) -> None:
+    """
+    Carry the changes a call made to context variables, running in a copy of
+    the caller's context (a thread pool, a task), over to the caller.
+    """
+    for var, value in context.items():
+        if var.get(None) is not value:
+            var.set(value)
+
+
+class _Race(Generic[T]):
+    """The attempts of a hedged sync call, and which one won."""
+
+    __slots__ = (
+        "primary",
+        "hedge",
+        "winner",
+        "settled",
+        "launched",
+        "done",
+        "result",
+        "context",
+        "_lock",
+    )
+
+    def __init__(self) -> None:
+        self.primary = Attempt()
+        self.hedge = Attempt()
+        self.winner: Optional[Attempt] = None
+        # once the primary is over, no hedge is launched anymore
+        self.settled = False
+        self.launched = False
+        # set when the hedge is over, its result and context if it won
+        self.done = threading.Event()
+        self.result: Any = None
+        self.context: Optional[contextvars.Context] = None
+        self._lock = threading.Lock()
+
+    def launch(self, admit: Callable[[], bool]) -> bool:
+        """Launch the hedge if the primary is not over and `admit` allows."""
+        with self._lock:
+            if self.settled or not admit():
+                return False
+            self.launched = True
+            return True
+
+    def settle(self) -> bool:
+        """End the race for the hedge, return whether it was launched."""
+        with self._lock:
+            self.settled = True
+            return self.launched
+
+    def claim(self, attempt: Attempt) -> bool:
+        """Make `attempt` the winner, unless the other one is already."""
+        with self._lock:
+            if self.winner is None:
+                self.winner = attempt
+            return self.winner is attempt
+
+
+class Hedger:
+    """
+    Sends a duplicate of a request that has not completed within the
+    `percentile` latency of the recent successful ones, e.g. 95 hedges the
+    slowest 5%. The first attempt to succeed wins, the other is cancelled.
+    When one fails, the other may still win.
+
+    Hedges are capped by `budget` to a fraction of the requests, and nothing
+    is hedged until enough latencies have been observed. `hedges` and `wins`
+    count the duplicates sent and those that answered first.
+
+    A sync call runs on the caller's thread, only its hedge runs on a shared
+    thread pool. The sync loser is cancelled through the aborts it registered
+    (see Attempt), if it answers anyway its answer is passed to `discard`.
+    Async losers are cancelled, which closes their connection.
+    """
+
+    def __init__(self, percentile: float, budget: RetryBudget) -> None:
+        self.percentile = percentile
+        self.budget = budget
+        self.hedges = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=_WINDOW)
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def delay(self) -> Optional[float]:
+        """How long a request runs before it is hedged, None if not learned."""
+        with self._lock:
+            if len(self._latencies) < _MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        index = math.ceil(self.percentile / 100 * len(latencies)) - 1
+        return latencies[max(0, index)]
+
+    def _hedge(self, deadline: Deadline) -> bool:
+        if deadline.expired or not self.budget.try_acquire():
+            return False
+        with self._lock:
+            self.hedges += 1
+        return True
+
+    def _won(self) -> None:
+        with self._lock:
+            self.wins += 1
+
+    def _timed(self, fn: Callable[[], T], attempt: Optional[Attempt] = None) -> T:
+        token = _attempt.set(attempt)
+        try:
+            start = time.monotonic()
+            result = fn()
+            self.record(time.monotonic() - start)
+            return result
+        finally:
+            _attempt.reset(token)
+
+    async def _atimed(
+        self, fn: Callable[[], Awaitable[T]]
+    ) -> Tuple[T, contextvars.Context]:
+        start = time.monotonic()
+        result = await fn()
+        self.record(time.monotonic() - start)
+        return result, contextvars.copy_context()
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        deadline: Deadline,
+        discard: Optional[Callable[[T], None]] = None,
+    ) -> T:
+        """
+        Call fn, hedging it once it runs longer than delay(). The answer of
+        an attempt that lost, if any, is passed to `discard`.
+        """
+        self.budget.record_request()
+        if (delay := self.delay()) is None:
+            return self._timed(fn)
+        race: _Race[T] = _Race()
+        context = contextvars.copy_context()
+        _timers.schedule(
+            delay, lambda: self._launch(race, fn, deadline, context, discard)
+        )
+        try:
+            result = self._timed(fn, race.primary)
+        except Exception:
+            if not race.settle():
+                raise
+            # the hedge may still win, or have made this attempt fail
+            race.done.wait()
+            if race.winner is not race.hedge:
+                raise
+        else:
+            if race.claim(race.primary):
+                race.settle()
+                race.hedge.cancel()
+                return result
+            if discard is not None:
+                discard(result)
+            race.done.wait()
+        finally:
+            race.settle()
+        assert race.context is not None
+        self._won()
+        adopt_context(race.context)
+        return race.result
+
+    def _launch(
+        self,
+        race: _Race[T],
+        fn: Callable[[], T],
+        deadline: Deadline,
+        context: contextvars.Context,
+        discard: Optional[Callable[[T], None]],
+    ) -> None:
+        if race.launch(lambda: self._hedge(deadline)):
+            _get_executor().submit(context.run, self._run_hedge, race, fn, discard)
+
+    def _run_hedge(
+        self,
+        race: _Race[T],
+        fn: Callable[[], T],
+        discard: Optional[Callable[[T], None]],
+    ) -> None:
+        try:
+            result = self._timed(fn, race.hedge)
+        except Exception:
+            pass
+        else:
+            if race.claim(race.hedge):
+                race.primary.cancel()
+                race.result = result
+                race.context = contextvars.copy_context()
+            elif discard is not None:
+                discard(result)
+        finally:
+            race.done.set()
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], deadline: Deadline) -> T:
+        """Async version of call, the loser is cancelled."""
+        self.budget.record_request()
+        if (delay := self.delay()) is None:
+            return (await self._atimed(fn))[0]
+        primary = asyncio.ensure_future(self._atimed(fn))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._hedge(deadline):
+                result, context = await primary
+                adopt_context(context)
+                return result
+            hedge = asyncio.ensure_future(self._atimed(fn))
+            tasks.add(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._won()
+                        result, context = task.result()
+                        adopt_context(context)
+                        return result
+            return (await primary)[0]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,64 @@
+"""Records of recent calls, kept for debugging (see _NVIDIAClient.last_inputs)."""
+
+from __future__ import annotations
+
+import weakref
+from contextvars import ContextVar
+from typing import Any, Literal, NamedTuple, Optional
+
+from requests.models import Response
+
+Retention = Literal["off", "summary", "full"]
+
+# summaries keep this much of each string, list and response body, enough to
+# debug a call without holding on to its images or embeddings
+SUMMARY_MAX_CHARS = 1024
+SUMMARY_MAX_ITEMS = 32
+SUMMARY_MAX_BODY = 8 * 1024
+
+
+class Call(NamedTuple):
+    """What a client sent and got back in a call."""
+
+    client: weakref.ref
+    inputs: dict
+    response: Optional[Response] = None
+
+
+# the last call made in the current thread or asyncio task, by any client
+last_call: ContextVar[Optional[Call]] = ContextVar("last_call", default=None)
+
+
+def summarize(value: Any) -> Any:
+    """A copy of a JSON-like value with long strings and lists cut short."""
+    if isinstance(value, str):
+        if len(value) > SUMMARY_MAX_CHARS:
+            return f"{value[:SUMMARY_MAX_CHARS]}... ({len(value)} chars)"
+        return value
+    if isinstance(value, dict):
+        return {k: summarize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [summarize(v) for v in value[:SUMMARY_MAX_ITEMS]]
+        if len(value) > SUMMARY_MAX_ITEMS:
+            items.append(f"... ({len(value)} items)")
+        return items
+    return value
+
+
+def summarize_response(response: Response) -> Response:
+    """
+    The response itself if its body is small or was not read into memory
+    (streams), otherwise a copy with the body cut to SUMMARY_MAX_BODY bytes.
+    """
+    content = response.__dict__.get("_content")
+    if not isinstance(content, bytes) or len(content) <= SUMMARY_MAX_BODY:
+        return response
+    summary = Response()
+    summary.status_code = response.status_code
+    summary.reason = response.reason
+    summary.headers = response.headers
+    summary.url = response.url
+    summary.encoding = response.encoding
+    summary.elapsed = response.elapsed
+    summary._content = content[:SUMMARY_MAX_BODY]
+    return summary
@@ -0,0 +1,92 @@
+"""JSON codecs for request and response bodies.
+
+orjson or msgspec are used when installed, they encode and decode large
+bodies, e.g. embeddings with thousands of floats, several times faster than
+the standard library. Decode errors are raised as json.JSONDecodeError
+whatever the codec.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, NamedTuple, Union
+
+try:
+    import orjson
+
+    has_orjson = True
+except ImportError:
+    has_orjson = False
+
+try:
+    import msgspec
+
+    has_msgspec = True
+except ImportError:
+    has_msgspec = False
+
+Document = Union[str, bytes, bytearray, memoryview]
+
+
+class JSONCodec(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Document], Any]
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    # same settings as requests' json= argument
+    return json.dumps(obj, allow_nan=False).encode("utf-8")
+
+
+def _stdlib_loads(doc: Document) -> Any:
+    return json.loads(bytes(doc) if isinstance(doc, memoryview) else doc)
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    try:
+        return orjson.dumps(obj)
+    except TypeError:  # e.g. ints beyond 64 bits, non-str keys
+        return _stdlib_dumps(obj)
+
+
+def _msgspec_dumps(obj: Any) -> bytes:
+    try:
+        return msgspec.json.encode(obj)
+    except (TypeError, msgspec.EncodeError):
+        return _stdlib_dumps(obj)
+
+
+def _msgspec_loads(doc: Document) -> Any:
+    try:
+        return msgspec.json.decode(doc)
+    except msgspec.DecodeError as e:
+        raise json.JSONDecodeError(str(e), str(doc), 0) from None
+
+
+_STDLIB = JSONCodec("json", _stdlib_dumps, _stdlib_loads)
+
+# orjson.JSONDecodeError already is a json.JSONDecodeError
+_CODECS: Dict[str, Callable[[], JSONCodec]] = {
+    "orjson": lambda: JSONCodec("orjson", _orjson_dumps, orjson.loads),
+    "msgspec": lambda: JSONCodec("msgspec", _msgspec_dumps, _msgspec_loads),
+    "json": lambda: _STDLIB,
+}
+_INSTALLED = {"orjson": has_orjson, "msgspec": has_msgspec, "json": True}
+
+
+def get_codec(name: str = "auto") -> JSONCodec:
+    """
+    Return a codec by name: "orjson", "msgspec", "json" (the standard
+    library), or "auto" for the fastest one installed. A named codec that is
+    not installed falls back to the standard library.
+    """
+    if name == "auto":
+        name = next(name for name, installed in _INSTALLED.items() if installed)
+    if name not in _CODECS:
+        raise ValueError(
+            f"Unknown JSON codec {name!r}, expected one of {list(_CODECS)}"
+        )
+    if not _INSTALLED[name]:
+        return _STDLIB
+    return _CODECS[name]()
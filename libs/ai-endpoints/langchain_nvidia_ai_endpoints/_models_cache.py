@@ -0,0 +1,152 @@
+"""Process-wide cache of model listings (/v1/models), optionally on disk."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# default snapshot file, e.g. on a volume shared by the workers of a host
+MODELS_CACHE_ENV = "NVIDIA_MODELS_CACHE"
+
+_SNAPSHOT_VERSION = 1
+
+
+class _Entry(NamedTuple):
+    fetched: float  # wall clock, comparable across processes
+    data: List[dict]
+
+
+class ModelsCache:
+    """
+    Model listings keyed by listing URL and credential.
+
+    Entries expire after a TTL chosen by the reader. With a snapshot path,
+    entries are also written to a JSON file and read back by processes that
+    do not have them yet, so a new process starts warm without listing. The
+    snapshot is best effort, I/O errors are logged and ignored.
+
+    `generation` changes whenever listings are dropped, for what clients
+    derived from them to be dropped too.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._mtimes: Dict[str, float] = {}  # snapshots read, by path
+        self.generation = 0
+
+    @staticmethod
+    def key(url: str, api_key: Optional[str]) -> str:
+        # never keep the key itself around, in memory or on disk
+        credential = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+        return f"{url} {credential}"
+
+    def get(self, key: str, ttl: float, path: Optional[str] = None) -> Optional[list]:
+        """The cached listing, None if missing or older than ttl seconds."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if path and (entry is None or _expired(entry, ttl)):
+                self._load(path)
+                entry = self._entries.get(key)
+        if entry is None or _expired(entry, ttl):
+            return None
+        return entry.data
+
+    def put(self, key: str, data: List[dict], path: Optional[str] = None) -> None:
+        with self._lock:
+            self._entries[key] = _Entry(time.time(), data)
+            if path:
+                self._load(path)  # keep what other processes added
+                self._save(path)
+
+    def invalidate(self, url: Optional[str] = None, path: Optional[str] = None) -> None:
+        """Drop the listings of URLs starting with `url`, or all of them."""
+        with self._lock:
+            self.generation += 1
+            if path:
+                self._load(path)
+            prefix = url.rstrip("/") if url else ""
+            for key in list(self._entries):
+                if url is None or (key.startswith(prefix) and key[len(prefix)] in "/ "):
+                    del self._entries[key]
+            if path:
+                self._save(path)
+
+    def clear(self) -> None:
+        """Drop the listings held in memory, snapshot files are left alone."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._mtimes.clear()
+
+    def _load(self, path: str) -> None:
+        """Merge a snapshot, if it changed since it was last read."""
+        try:
+            mtime = os.stat(path).st_mtime
+            if self._mtimes.get(path) == mtime:
+                return
+            with open(path, "rb") as f:
+                snapshot = json.load(f)
+            self._mtimes[path] = mtime
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring models cache {path}: {e}")
+            return
+        if snapshot.get("version") != _SNAPSHOT_VERSION:
+            return
+        for key, (fetched, data) in snapshot.get("entries", {}).items():
+            current = self._entries.get(key)
+            if current is None or current.fetched < fetched:
+                self._entries[key] = _Entry(fetched, data)
+
+    def _save(self, path: str) -> None:
+        snapshot = {
+            "version": _SNAPSHOT_VERSION,
+            "entries": {key: list(entry) for key, entry in self._entries.items()},
+        }
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            # write and rename, readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self._mtimes[path] = os.stat(path).st_mtime
+        except OSError as e:
+            logger.debug(f"Could not write models cache {path}: {e}")
+
+
+def _expired(entry: _Entry, ttl: float) -> bool:
+    return time.time() - entry.fetched >= ttl
+
+
+_cache = ModelsCache()
+
+
+def get_models_cache() -> ModelsCache:
+    return _cache
+
+
+def invalidate_available_models(
+    base_url: Optional[str] = None, path: Optional[str] = None
+) -> None:
+    """
+    Forget cached model listings, so that the next available_models lists
+    again. With a base_url, only the listings of that endpoint are dropped.
+    The snapshot file (`path`, default $NVIDIA_MODELS_CACHE) is updated too.
+    """
+    _cache.invalidate(base_url, path or os.getenv(MODELS_CACHE_ENV))
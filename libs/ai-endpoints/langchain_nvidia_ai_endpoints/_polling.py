@@ -0,0 +1,236 @@
+"""Shared poller for NVCF requests answered with HTTP 202."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import requests
+from requests.models import Response
+
+from langchain_nvidia_ai_endpoints._utils import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# the timeout argument of requests: seconds, (connect, read) or None
+RequestTimeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+
+class _Pending:
+    """An NVCF request that is still being processed server-side."""
+
+    __slots__ = (
+        "url_tmpl",
+        "request_id",
+        "session",
+        "headers",
+        "future",
+        "deadline",
+        "interval",
+        "max_interval",
+        "request_timeout",
+        "attempt",
+        "last_response",
+    )
+
+    def __init__(
+        self,
+        url_tmpl: str,
+        request_id: str,
+        session: requests.Session,
+        headers: Dict[str, str],
+        deadline: float,
+        interval: float,
+        max_interval: float,
+        request_timeout: RequestTimeout = None,
+    ) -> None:
+        self.url_tmpl = url_tmpl
+        self.request_id = request_id
+        self.session = session
+        self.headers = headers
+        self.future: Future[Response] = Future()
+        self.deadline = deadline
+        self.interval = interval
+        self.max_interval = max_interval
+        self.request_timeout = request_timeout
+        self.attempt = 0
+        self.last_response: Optional[Response] = None
+
+    def next_delay(self, response: Optional[Response]) -> float:
+        """
+        Exponential backoff with jitter, a Retry-After hint from the server
+        takes precedence.
+        """
+        if response is not None:
+            hint = parse_retry_after(response.headers)
+            if hint is not None:
+                return hint
+        delay = min(self.max_interval, self.interval * (2**self.attempt))
+        self.attempt += 1
+        # "equal jitter", never poll sooner than half the backoff
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class _NVCFPoller:
+    """
+    Tracks every outstanding NVCF-REQID of the process on a single thread.
+
+    Callers hand over a 202 response and receive a Future that resolves to the
+    first non-202 response. Status checks are scheduled on a timer heap with
+    per-request exponential backoff and executed by a small worker pool, so
+    hundreds of long-running requests need neither hundreds of threads nor a
+    busy polling loop each.
+    """
+
+    def __init__(self, max_workers: int = 8) -> None:
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, _Pending]] = []
+        self._counter = itertools.count()
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def outstanding(self) -> int:
+        """Number of requests waiting for their next status check."""
+        with self._cond:
+            return len(self._heap)
+
+    def submit(
+        self,
+        response: Response,
+        url_tmpl: str,
+        session: requests.Session,
+        headers: Dict[str, str],
+        timeout: float,
+        interval: float,
+        max_interval: float,
+        request_timeout: RequestTimeout = None,
+    ) -> Future[Response]:
+        """
+        Start following a 202 response.
+
+        Args:
+            response: The 202 response, it must carry an NVCF-REQID header.
+            url_tmpl: Status URL template with a {request_id} placeholder.
+            session: Session used for the status checks, it carries the
+                     Authorization header.
+            headers: Additional per-request headers.
+            timeout: Give up after this many seconds (TimeoutError).
+            interval: Initial delay between status checks.
+            max_interval: Upper bound for the delay between status checks.
+            request_timeout: Timeout of each status check, as the requests
+                             timeout argument, e.g. (connect, read).
+
+        Returns:
+            A Future resolving to the first response that is not a 202.
+            Cancelling the Future stops the polling.
+        """
+        assert (
+            "NVCF-REQID" in response.headers
+        ), "Received 202 response with no request id to follow"
+        pending = _Pending(
+            url_tmpl=url_tmpl,
+            request_id=response.headers["NVCF-REQID"],
+            session=session,
+            headers=headers,
+            deadline=time.monotonic() + timeout,
+            interval=interval,
+            max_interval=max_interval,
+            request_timeout=request_timeout,
+        )
+        pending.last_response = response
+        self._schedule(pending, pending.next_delay(response))
+        return pending.future
+
+    def _schedule(self, pending: _Pending, delay: float) -> None:
+        when = min(time.monotonic() + delay, pending.deadline)
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix="nvcf-poll",
+                )
+                self._thread = threading.Thread(
+                    target=self._run, name="nvcf-poller", daemon=True
+                )
+                self._thread.start()
+            heapq.heappush(self._heap, (when, next(self._counter), pending))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                when, _, pending = self._heap[0]
+                now = time.monotonic()
+                if when > now:
+                    self._cond.wait(when - now)
+                    continue
+                heapq.heappop(self._heap)
+            if pending.future.cancelled():
+                continue
+            assert self._executor is not None
+            self._executor.submit(self._poll, pending)
+
+    def _poll(self, pending: _Pending) -> None:
+        try:
+            response = pending.session.get(
+                pending.url_tmpl.format(request_id=pending.request_id),
+                headers=pending.headers,
+                timeout=pending.request_timeout,
+            )
+        except Exception as e:
+            _resolve(pending.future, exception=e)
+            return
+        pending.last_response = response
+        if response.status_code == 202 and time.monotonic() >= pending.deadline:
+            _resolve(
+                pending.future,
+                exception=TimeoutError(
+                    f"Timeout reached without a successful response."
+                    f"\nLast response: {str(response)}"
+                ),
+            )
+        elif response.status_code == 202:
+            # the status endpoint may hand out a new id to follow
+            pending.request_id = response.headers.get("NVCF-REQID", pending.request_id)
+            self._schedule(pending, pending.next_delay(response))
+        else:
+            _resolve(pending.future, result=response)
+
+
+def _resolve(
+    future: Future,
+    result: Optional[Response] = None,
+    exception: Optional[BaseException] = None,
+) -> None:
+    """Complete a future unless the waiter has cancelled it meanwhile."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+_poller: Optional[_NVCFPoller] = None
+_poller_lock = threading.Lock()
+
+
+def get_poller() -> _NVCFPoller:
+    """Return the process-wide NVCF poller."""
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = _NVCFPoller()
+    return _poller
@@ -0,0 +1,170 @@
+"""Client-side request and token rate limiting, shared across clients."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class _Bucket:
+    """A token bucket refilled continuously at `limit` tokens per minute."""
+
+    __slots__ = ("limit", "tokens", "updated")
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(
+            float(self.limit), self.tokens + (now - self.updated) * self.limit / 60
+        )
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until the balance is back to zero (no debt)."""
+        return max(0.0, -self.tokens) * 60 / self.limit
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one endpoint,
+    credential and model.
+
+    Each request reserves one token from the RPM bucket when it is admitted,
+    callers are admitted in arrival order and sleep exactly until their
+    reservation is due. Token usage is only known once a response arrives, it
+    is charged to the TPM bucket afterwards and the resulting debt delays the
+    admission of the next requests. Sync and async callers share the same
+    buckets.
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None) -> None:
+        self._lock = threading.Lock()
+        self._rpm: Optional[_Bucket] = None
+        self._tpm: Optional[_Bucket] = None
+        self._waiting = 0
+        self.configure(rpm, tpm)
+
+    def configure(self, rpm: Optional[int], tpm: Optional[int]) -> None:
+        """Change the limits, None removes a limit."""
+        with self._lock:
+            if rpm != (self._rpm.limit if self._rpm else None):
+                self._rpm = _Bucket(rpm) if rpm else None
+            if tpm != (self._tpm.limit if self._tpm else None):
+                self._tpm = _Bucket(tpm) if tpm else None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of callers currently waiting for admission."""
+        return self._waiting
+
+    def _queue(self, delta: int) -> None:
+        with self._lock:
+            self._waiting += delta
+
+    def _reserve(self) -> float:
+        """Reserve a request slot, return how long to wait for it."""
+        now = time.monotonic()
+        with self._lock:
+            wait = 0.0
+            if self._rpm:
+                self._rpm.refill(now)
+                self._rpm.tokens -= 1
+                wait = self._rpm.wait_time()
+            return max(wait, self._tpm_wait(now))
+
+    def _tpm_wait(self, now: float) -> float:
+        if not self._tpm:
+            return 0.0
+        self._tpm.refill(now)
+        return self._tpm.wait_time()
+
+    def _recheck(self) -> float:
+        with self._lock:
+            return self._tpm_wait(time.monotonic())
+
+    def _unreserve(self) -> None:
+        """Give back the request slot of a caller that gave up waiting."""
+        with self._lock:
+            if self._rpm:
+                self._rpm.tokens += 1
+
+    def _check_wait(self, wait: float, expires: Optional[float]) -> None:
+        """Give up, with TimeoutError, a wait that would end after `expires`."""
+        if expires is not None and time.monotonic() + wait > expires:
+            self._unreserve()
+            raise TimeoutError(f"Rate limited for {wait:.2f}s, past the timeout")
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until a request may be sent. Raises TimeoutError, without
+        waiting in vain, when that is more than `timeout` seconds away.
+        """
+        expires = None if timeout is None else time.monotonic() + timeout
+        wait = self._reserve()
+        if wait <= 0:
+            return
+        self._check_wait(wait, expires)
+        self._queue(1)
+        try:
+            while wait > 0:
+                time.sleep(wait)
+                # token debt may have grown while we were waiting
+                wait = self._recheck()
+                self._check_wait(wait, expires)
+        finally:
+            self._queue(-1)
+
+    async def aacquire(self, timeout: Optional[float] = None) -> None:
+        """Wait, without blocking the event loop, until a request may be sent."""
+        expires = None if timeout is None else time.monotonic() + timeout
+        wait = self._reserve()
+        if wait <= 0:
+            return
+        self._check_wait(wait, expires)
+        self._queue(1)
+        try:
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self._recheck()
+                self._check_wait(wait, expires)
+        finally:
+            self._queue(-1)
+
+    def charge(self, tokens: int) -> None:
+        """Charge the tokens a completed request consumed."""
+        if self._tpm and tokens > 0:
+            with self._lock:
+                self._tpm.refill(time.monotonic())
+                self._tpm.tokens -= tokens
+
+
+_limiters: Dict[Tuple[str, str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    base_url: str,
+    api_key: Optional[str],
+    model: Optional[str],
+    rpm: Optional[int],
+    tpm: Optional[int],
+) -> RateLimiter:
+    """
+    Return the process-wide limiter for an endpoint, credential and model,
+    all clients with the same key share it. The most recently requested limits
+    apply.
+    """
+    # never keep the key itself around
+    credential = hashlib.sha256((api_key or "").encode()).hexdigest()
+    key = (base_url, credential, model or "")
+    with _limiters_lock:
+        if (limiter := _limiters.get(key)) is None:
+            limiter = _limiters[key] = RateLimiter(rpm, tpm)
+    limiter.configure(rpm, tpm)
+    return limiter
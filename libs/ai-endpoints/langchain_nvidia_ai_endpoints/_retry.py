@@ -0,0 +1,175 @@
+"""Retry support for _NVIDIAClient: backoff, budgets and error classification."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, Deque, Optional, Tuple, Type, TypeVar
+
+import requests
+
+from langchain_nvidia_ai_endpoints._deadline import Deadline
+from langchain_nvidia_ai_endpoints.errors import NVIDIARetryableError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# failures that happen before the server produced a response, sending the
+# request again is safe
+_RETRYABLE_EXCEPTIONS: Tuple[Type[Exception], ...] = (
+    NVIDIARetryableError,
+    requests.ConnectionError,
+)
+
+
+@lru_cache(maxsize=None)
+def _aretryable_exceptions() -> Tuple[Type[Exception], ...]:
+    """
+    _RETRYABLE_EXCEPTIONS of async calls, which add aiohttp's. aiohttp is
+    slow to import, it is only imported by the first async call.
+    """
+    import aiohttp
+
+    return _RETRYABLE_EXCEPTIONS + (aiohttp.ClientConnectionError,)
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of the recent request volume.
+
+    Within a sliding window, retries are allowed while they stay below
+    `ratio` times the number of requests plus a small floor of
+    `min_per_second` retries per second. During an outage, when every request
+    fails, this keeps the extra load from retries at about `ratio` instead of
+    multiplying it by the number of attempts.
+    """
+
+    def __init__(
+        self, ratio: float = 0.2, min_per_second: float = 1.0, window: float = 10.0
+    ) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._lock = threading.Lock()
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self.window
+        for events in (self._requests, self._retries):
+            while events and events[0] < horizon:
+                events.popleft()
+
+    def record_request(self) -> None:
+        """Account for a new (first attempt) request."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """Take permission for one retry, False if the budget is exhausted."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            allowed = self.min_per_second * self.window + self.ratio * len(
+                self._requests
+            )
+            if len(self._retries) < allowed:
+                self._retries.append(now)
+                return True
+            return False
+
+
+def backoff_delay(
+    attempt: int, base: float, cap: float, retry_after: Optional[float] = None
+) -> float:
+    """
+    Delay before retry number `attempt` (0-based): exponential backoff with
+    full jitter, or the server's Retry-After when it sent one.
+    """
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+class Retrier:
+    """Runs a request function, retrying transient failures."""
+
+    def __init__(
+        self, max_retries: int, backoff: float, max_backoff: float, budget: RetryBudget
+    ) -> None:
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+
+    def _next_delay(
+        self, attempt: int, error: Exception, deadline: Optional[Deadline]
+    ) -> Optional[float]:
+        """
+        The delay before the next attempt, or None to give up, also when the
+        attempt could not start before the deadline or the server asks for a
+        longer wait than max_backoff.
+        """
+        if attempt >= self.max_retries:
+            return None
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None and retry_after > self.max_backoff:
+            # longer than any backoff, the error tells the caller how long
+            logger.debug(f"Not retrying, asked to wait {retry_after:.0f}s: {error}")
+            return None
+        delay = backoff_delay(attempt, self.backoff, self.max_backoff, retry_after)
+        if deadline is not None and deadline.expires is not None:
+            if time.monotonic() + delay >= deadline.expires:
+                return None
+        if not self.budget.try_acquire():
+            return None
+        logger.debug(f"Retrying in {delay:.2f}s after: {error}")
+        return delay
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        deadline: Optional[Deadline] = None,
+        retry_on: Tuple[Type[Exception], ...] = (),
+    ) -> T:
+        """
+        Call fn until it succeeds, retrying transient failures and the
+        exceptions of `retry_on`.
+        """
+        retryable = _RETRYABLE_EXCEPTIONS + retry_on
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except retryable as e:
+                if (delay := self._next_delay(attempt, e, deadline)) is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        deadline: Optional[Deadline] = None,
+        retry_on: Tuple[Type[Exception], ...] = (),
+    ) -> T:
+        retryable = _aretryable_exceptions() + retry_on
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except retryable as e:
+                if (delay := self._next_delay(attempt, e, deadline)) is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
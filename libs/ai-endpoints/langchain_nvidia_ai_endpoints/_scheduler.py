@@ -0,0 +1,268 @@
+"""Priority scheduling of requests with bounded concurrency per endpoint."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Literal, Optional, Tuple
+
+from langchain_nvidia_ai_endpoints._adaptive import AdaptiveLimit
+from langchain_nvidia_ai_endpoints._balancer import Endpoint
+from langchain_nvidia_ai_endpoints._breaker import CircuitBreaker
+
+Priority = Literal["interactive", "default", "batch"]
+
+# lanes are served strictly in this order
+PRIORITIES: Dict[str, int] = {"interactive": 0, "default": 1, "batch": 2}
+
+
+class _Waiter:
+    """A queued caller, woken from any thread once it holds a slot."""
+
+    __slots__ = ("loop", "event", "future", "granted")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.loop = loop
+        self.event: Optional[threading.Event] = None
+        self.future: Optional[asyncio.Future] = None
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+        self.granted = False
+
+    def wake(self) -> None:
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        elif self.loop is not None and self.future is not None:
+            self.loop.call_soon_threadsafe(_set_done, self.future)
+
+
+def _set_done(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class Scheduler:
+    """
+    Admits at most `limit` concurrent requests to one endpoint.
+
+    Callers that cannot be admitted right away wait in one of the priority
+    lanes. A freed slot always goes to the highest priority lane with waiters.
+    Within a lane, callers are grouped into flows (one per client) and flows
+    are served round-robin, so a client with a deep backlog, e.g. a bulk
+    embed_documents, cannot starve other clients of the same lane.
+
+    With `adaptive`, an AdaptiveLimit moves the limit between 1 and `limit`.
+    """
+
+    def __init__(self, limit: int, adaptive: bool = False) -> None:
+        self._lock = threading.Lock()
+        self._limit = limit
+        self._in_flight = 0
+        self._lanes: Dict[int, OrderedDict[Hashable, Deque[_Waiter]]] = {
+            rank: OrderedDict() for rank in sorted(PRIORITIES.values())
+        }
+        self.adaptive: Optional[AdaptiveLimit] = None
+        if adaptive:
+            self.adaptive = AdaptiveLimit(self, max_limit=limit)
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @limit.setter
+    def limit(self, value: int) -> None:
+        with self._lock:
+            self._limit = max(1, value)
+            self._dispatch()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> Dict[str, int]:
+        """Number of waiting callers per priority lane."""
+        with self._lock:
+            return {
+                name: sum(len(q) for q in self._lanes[rank].values())
+                for name, rank in PRIORITIES.items()
+            }
+
+    def _enter(self, waiter: _Waiter, priority: Priority, flow: Hashable) -> bool:
+        """Take a slot if one is free and nobody is queued, else enqueue."""
+        with self._lock:
+            if self._in_flight < self._limit and not any(self._lanes.values()):
+                self._in_flight += 1
+                return True
+            lane = self._lanes[PRIORITIES[priority]]
+            lane.setdefault(flow, deque()).append(waiter)
+            return False
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, caller holds the lock."""
+        while self._in_flight < self._limit:
+            lane = next((lane for lane in self._lanes.values() if lane), None)
+            if lane is None:
+                return
+            flow, queue = next(iter(lane.items()))
+            waiter = queue.popleft()
+            # round-robin: the flow goes to the back of its lane
+            del lane[flow]
+            if queue:
+                lane[flow] = queue
+            self._in_flight += 1
+            waiter.wake()
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """Remove a waiter that gave up, False if it was granted a slot."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            for lane in self._lanes.values():
+                for flow, queue in list(lane.items()):
+                    if waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del lane[flow]
+                        return True
+            return True
+
+    def acquire(
+        self,
+        priority: Priority = "default",
+        flow: Hashable = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Block until a slot is granted, at most `timeout` seconds after which
+        the caller leaves the queue with TimeoutError.
+        """
+        waiter = _Waiter()
+        if self._enter(waiter, priority, flow):
+            return
+        assert waiter.event is not None
+        if not waiter.event.wait(timeout) and self._withdraw(waiter):
+            raise TimeoutError(f"No slot was free within {timeout:.2f}s")
+
+    async def aacquire(
+        self,
+        priority: Priority = "default",
+        flow: Hashable = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Wait, without blocking the event loop, until a slot is granted."""
+        waiter = _Waiter(asyncio.get_running_loop())
+        if self._enter(waiter, priority, flow):
+            return
+        assert waiter.future is not None
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if not self._withdraw(waiter):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Free a slot taken with acquire/aacquire."""
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+
+class Lease:
+    """
+    A slot held on a scheduler (or none, without one) for one request, and
+    the replica the request went to, if balanced over several.
+
+    The lease reports the latency and outcome of the request to the adaptive
+    limit of the scheduler and to the circuit breaker of the endpoint, if
+    any, and frees the slot exactly once however many times it is released.
+    """
+
+    __slots__ = (
+        "_scheduler",
+        "_endpoint",
+        "_breaker",
+        "_lock",
+        "_started",
+        "_observed",
+        "_released",
+    )
+
+    def __init__(self, scheduler: Optional[Scheduler] = None) -> None:
+        self._scheduler = scheduler
+        self._endpoint: Optional[Endpoint] = None
+        self._breaker: Optional[CircuitBreaker] = None
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._observed = False
+        self._released = False
+
+    def hold(
+        self, endpoint: Endpoint, breaker: Optional[CircuitBreaker] = None
+    ) -> None:
+        """
+        Count the request in flight on a replica until released, reporting
+        its outcome to the replica's circuit breaker, if any, which admitted
+        it already.
+        """
+        self._endpoint = endpoint
+        endpoint.begin()
+        if breaker is not None:
+            self.guard(breaker)
+
+    def guard(self, breaker: CircuitBreaker) -> None:
+        """Report the outcome of the request to the circuit breaker admitting it."""
+        self._breaker = breaker
+
+    def start(self) -> None:
+        """Start the latency clock, when the request is actually sent."""
+        self._started = time.monotonic()
+
+    def observe(self, overloaded: bool = False) -> None:
+        """Report the outcome of the request, only the first report counts."""
+        if self._observed:
+            return
+        self._observed = True
+        latency = time.monotonic() - self._started
+        scheduler = self._scheduler
+        if scheduler is not None and (adaptive := scheduler.adaptive) is not None:
+            adaptive.record(latency, overloaded)
+        if self._breaker is not None:
+            self._breaker.record(latency, overloaded)
+
+    def __call__(self) -> None:
+        """Free the slot, and the replica."""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+            endpoint, self._endpoint = self._endpoint, None
+        if self._breaker is not None and not self._observed:
+            self._breaker.cancel()
+        if endpoint is not None:
+            endpoint.end()
+        if self._scheduler is not None:
+            self._scheduler.release()
+
+
+_schedulers: Dict[Tuple[str, int, bool], Scheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(endpoint: str, limit: int, adaptive: bool = False) -> Scheduler:
+    """
+    Return the process-wide scheduler of an endpoint (scheme://host:port) and
+    configuration, all clients talking to it with the same limit share the
+    same slots. A client asking for another limit gets a scheduler of its own.
+    """
+    key = (endpoint, limit, adaptive)
+    with _schedulers_lock:
+        if (scheduler := _schedulers.get(key)) is None:
+            scheduler = _schedulers[key] = Scheduler(limit, adaptive)
+    return scheduler
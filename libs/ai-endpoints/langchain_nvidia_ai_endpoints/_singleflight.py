@@ -0,0 +1,170 @@
+"""Coalescing of identical requests in flight into a single call."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from langchain_nvidia_ai_endpoints._deadline import Deadline
+from langchain_nvidia_ai_endpoints._hedging import adopt_context
+
+T = TypeVar("T")
+
+
+def coalescible(payload: dict) -> bool:
+    """
+    Whether callers sending the same payload may share its answer: always for
+    embeddings and rankings, for generations only when they are deterministic
+    (temperature 0 or a seed).
+    """
+    if "messages" in payload or "prompt" in payload:
+        return payload.get("temperature") == 0 or payload.get("seed") is not None
+    return True
+
+
+def flight_key(url: str, credential: Optional[str], payload: dict) -> bytes:
+    """
+    The key of a request: its URL, credential and payload, with dict keys in
+    a fixed order so that equal payloads give equal keys.
+    """
+    return hashlib.sha256(
+        json.dumps([url, credential, payload], sort_keys=True, default=str).encode()
+    ).digest()
+
+
+class _Flight:
+    """A sync call in flight and, once done, its outcome."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncFlight:
+    """An async call in flight, run as a task its callers wait on."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class Singleflight:
+    """
+    Runs identical calls made at the same time once: the first caller of a
+    key makes the call, the others wait for it and get the same result, or
+    the same exception. Later calls, once it is done, make a new call.
+
+    Sync and async callers coalesce among themselves, async ones per event
+    loop. A waiting caller gives up at its own deadline. An async call is
+    cancelled when all its callers are, not before.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._aflights: Dict[Hashable, _AsyncFlight] = {}
+        # calls answered by another caller's call, for metrics
+        self.coalesced = 0
+
+    def call(
+        self, key: Hashable, fn: Callable[[], T], deadline: Deadline = Deadline()
+    ) -> Tuple[T, bool]:
+        """The result of fn, and whether it came from another caller's call."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if shared := flight is not None:
+                self.coalesced += 1
+            else:
+                flight = self._flights[key] = _Flight()
+        assert flight is not None
+        if not shared:
+            try:
+                flight.result = fn()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+            return flight.result, False
+        if not flight.done.wait(deadline.remaining()):
+            raise deadline.exceeded()
+        if flight.error is not None:
+            if not isinstance(flight.error, Exception):
+                # e.g. the caller making the call was interrupted, not the call
+                return fn(), False
+            raise flight.error
+        return flight.result, True
+
+    async def acall(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        deadline: Deadline = Deadline(),
+    ) -> Tuple[T, bool]:
+        """Async version of call."""
+
+        async def run() -> Tuple[T, contextvars.Context]:
+            return await fn(), contextvars.copy_context()
+
+        key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            flight = self._aflights.get(key)
+            if shared := flight is not None:
+                self.coalesced += 1
+            else:
+                flight = self._aflights[key] = _AsyncFlight(
+                    asyncio.ensure_future(run())
+                )
+                flight.task.add_done_callback(lambda _: self._land(key, flight))
+            assert flight is not None
+            flight.waiters += 1
+        try:
+            result, context = await asyncio.wait_for(
+                asyncio.shield(flight.task), deadline.remaining()
+            )
+        except asyncio.TimeoutError:
+            self._leave(flight)
+            raise deadline.exceeded() from None
+        except BaseException:
+            self._leave(flight)
+            raise
+        self._leave(flight, cancel=False)
+        if not shared:
+            adopt_context(context)
+        return result, shared
+
+    def _land(self, key: Hashable, flight: _AsyncFlight) -> None:
+        with self._lock:
+            if self._aflights.get(key) is flight:
+                del self._aflights[key]
+
+    def _leave(self, flight: _AsyncFlight, cancel: bool = True) -> None:
+        with self._lock:
+            flight.waiters -= 1
+            abandoned = flight.waiters == 0
+        if cancel and abandoned and not flight.task.done():
+            flight.task.cancel()
+
+
+# shared by all clients, identical requests of any client are coalesced
+singleflight = Singleflight()
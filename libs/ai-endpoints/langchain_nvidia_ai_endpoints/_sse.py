@@ -0,0 +1,197 @@
+"""Incremental decoding of server-sent event (text/event-stream) bodies."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
+
+from requests.exceptions import ChunkedEncodingError, ContentDecodingError
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import SSLError as RequestsSSLError
+from requests.models import Response
+from urllib3.exceptions import (
+    DecodeError,
+    HTTPError,
+    ProtocolError,
+    ReadTimeoutError,
+    SSLError,
+)
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# read size of streamed bodies, a read returns early with whatever arrived
+STREAM_CHUNK_SIZE = 16 * 1024
+# what is read of a stream past its last message (its [DONE]) to reuse the
+# connection, beyond that it is dropped
+DRAIN_LIMIT = 64 * 1024
+DRAIN_TIMEOUT = 1.0
+
+_DONE = b"[DONE]"
+
+
+class SSEDecoder:
+    """
+    Turns the chunks of an event stream, split at arbitrary byte offsets,
+    into the data of its events.
+
+    Lines end with LF or CRLF. The `data:` lines of an event are joined with
+    LF and the event is complete at the next blank line. Comments and the
+    other fields (event, id, retry) are ignored. The OpenAI-style `[DONE]`
+    event ends the stream.
+
+    A server that ignores the stream flag answers with a plain JSON body, such
+    a body is returned whole as the only event.
+    """
+
+    __slots__ = ("_buffer", "_data", "_plain", "done")
+
+    def __init__(self) -> None:
+        self._buffer = b""
+        self._data: List[bytes] = []
+        self._plain: Optional[bool] = None
+        self.done = False
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Decode a chunk, return the data of the events it completed."""
+        events: List[bytes] = []
+        if self.done:
+            return events
+        if self._plain is None and (start := chunk.lstrip()[:1]):
+            self._plain = start in (b"{", b"[")
+        if self._plain or b"\n" not in chunk:
+            self._buffer += chunk
+            return events
+        lines = (self._buffer + chunk if self._buffer else chunk).split(b"\n")
+        self._buffer = lines.pop()
+        for line in lines:
+            self._line(line, events)
+            if self.done:
+                break
+        return events
+
+    def close(self) -> List[bytes]:
+        """Return the event left unterminated at the end of the stream."""
+        events: List[bytes] = []
+        if self._plain:
+            events.append(self._buffer)
+        elif not self.done:
+            self._line(self._buffer, events)
+            self._line(b"", events)
+        self._buffer = b""
+        return events
+
+    def _line(self, line: bytes, events: List[bytes]) -> None:
+        if line[-1:] == b"\r":
+            line = line[:-1]
+        if not line:
+            if self._data:
+                data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+                self._data = []
+                if data == _DONE:
+                    self.done = True
+                else:
+                    events.append(data)
+        elif line[:5] == b"data:":
+            self._data.append(line[6:] if line[5:6] == b" " else line[5:])
+
+    def events(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """The data of the events of a stream, until its end or [DONE]."""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+            if self.done:
+                return
+        yield from self.close()
+
+    async def aevents(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Async version of events."""
+        async for chunk in chunks:
+            for data in self.feed(chunk):
+                yield data
+            if self.done:
+                return
+        for data in self.close():
+            yield data
+
+
+def iter_chunks(response: Response) -> Iterator[bytes]:
+    """
+    The body of a streamed response in large chunks, each handed over as soon
+    as it arrives instead of once a full chunk size has been read.
+    """
+    raw = response.raw
+    if getattr(raw, "chunked", False) or not hasattr(raw, "read1"):
+        # chunked transfer: each read returns at the end of a transfer chunk
+        yield from response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        return
+    # the errors of reads translated as iter_content does
+    try:
+        while chunk := raw.read1(STREAM_CHUNK_SIZE, decode_content=True):
+            yield chunk
+    except ProtocolError as e:
+        raise ChunkedEncodingError(e)
+    except DecodeError as e:
+        raise ContentDecodingError(e)
+    except ReadTimeoutError as e:
+        raise RequestsConnectionError(e)
+    except SSLError as e:
+        raise RequestsSSLError(e)
+
+
+def set_read_timeout(response: Response, timeout: Optional[float]) -> None:
+    """
+    Change the timeout of the next reads of a streamed response, which
+    requests only sets once for the whole response.
+    """
+    connection = getattr(response.raw, "connection", None)
+    if (sock := getattr(connection, "sock", None)) is None:
+        # http.client lets go of the socket of a response that is read until
+        # the connection closes, the file it reads from still holds it
+        fp = getattr(getattr(response.raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(fp, "raw", None), "_sock", None)
+    if sock is not None:
+        sock.settimeout(timeout)
+
+
+def drain(response: Response) -> bool:
+    """
+    Read what is left of a streamed response, at most DRAIN_LIMIT bytes each
+    within DRAIN_TIMEOUT, so that its connection goes back to the pool once
+    the body is over. Returns whether the end of the body was reached.
+    """
+    set_read_timeout(response, DRAIN_TIMEOUT)
+    left = DRAIN_LIMIT
+    try:
+        while left > 0:
+            if not (chunk := response.raw.read(min(left, STREAM_CHUNK_SIZE))):
+                return True
+            left -= len(chunk)
+    except (HTTPError, OSError):
+        pass
+    return False
+
+
+async def adrain(response: aiohttp.ClientResponse) -> bool:
+    """Async version of drain, the whole read is bounded by DRAIN_TIMEOUT."""
+    import aiohttp
+
+    async def read() -> bool:
+        left = DRAIN_LIMIT
+        while left > 0:
+            if not (chunk := await response.content.readany()):
+                return True
+            left -= len(chunk)
+        return False
+
+    try:
+        return await asyncio.wait_for(read(), DRAIN_TIMEOUT)
+    except (asyncio.TimeoutError, aiohttp.ClientError):
+        return False
@@ -1,6 +1,17 @@
+import json
 import os
+import threading
 import warnings
-from typing import Literal, Optional
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from langchain_core.pydantic_v1 import BaseModel, validator
 
@@ -51,423 +62,138 @@ class Model(BaseModel):
         return client
 
 
-CHAT_MODEL_TABLE = {
-    "meta/codellama-70b": Model(
-        id="meta/codellama-70b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=[
-            "ai-codellama-70b",
-            "playground_llama2_code_70b",
-            "llama2_code_70b",
-            "playground_llama2_code_34b",
-            "llama2_code_34b",
-            "playground_llama2_code_13b",
-            "llama2_code_13b",
-        ],
-    ),
-    "google/gemma-7b": Model(
-        id="google/gemma-7b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-gemma-7b", "playground_gemma_7b", "gemma_7b"],
-    ),
-    "meta/llama2-70b": Model(
-        id="meta/llama2-70b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=[
-            "ai-llama2-70b",
-            "playground_llama2_70b",
-            "llama2_70b",
-            "playground_llama2_13b",
-            "llama2_13b",
-        ],
-    ),
-    "mistralai/mistral-7b-instruct-v0.2": Model(
-        id="mistralai/mistral-7b-instruct-v0.2",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-mistral-7b-instruct-v2", "playground_mistral_7b", "mistral_7b"],
-    ),
-    "mistralai/mixtral-8x7b-instruct-v0.1": Model(
-        id="mistralai/mixtral-8x7b-instruct-v0.1",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-mixtral-8x7b-instruct", "playground_mixtral_8x7b", "mixtral_8x7b"],
-    ),
-    "google/codegemma-7b": Model(
-        id="google/codegemma-7b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-codegemma-7b"],
-    ),
-    "google/gemma-2b": Model(
-        id="google/gemma-2b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-gemma-2b", "playground_gemma_2b", "gemma_2b"],
-    ),
-    "google/recurrentgemma-2b": Model(
-        id="google/recurrentgemma-2b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-recurrentgemma-2b"],
-    ),
-    "mistralai/mistral-large": Model(
-        id="mistralai/mistral-large",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-mistral-large"],
-    ),
-    "mistralai/mixtral-8x22b-instruct-v0.1": Model(
-        id="mistralai/mixtral-8x22b-instruct-v0.1",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-mixtral-8x22b-instruct"],
-    ),
-    "meta/llama3-8b-instruct": Model(
-        id="meta/llama3-8b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-llama3-8b"],
-    ),
-    "meta/llama3-70b-instruct": Model(
-        id="meta/llama3-70b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-llama3-70b"],
-    ),
-    "microsoft/phi-3-mini-128k-instruct": Model(
-        id="microsoft/phi-3-mini-128k-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-phi-3-mini"],
-    ),
-    "snowflake/arctic": Model(
-        id="snowflake/arctic",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-arctic"],
-    ),
-    "databricks/dbrx-instruct": Model(
-        id="databricks/dbrx-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-dbrx-instruct"],
-    ),
-    "microsoft/phi-3-mini-4k-instruct": Model(
-        id="microsoft/phi-3-mini-4k-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-phi-3-mini-4k", "playground_phi2", "phi2"],
-    ),
-    "seallms/seallm-7b-v2.5": Model(
-        id="seallms/seallm-7b-v2.5",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-seallm-7b"],
-    ),
-    "aisingapore/sea-lion-7b-instruct": Model(
-        id="aisingapore/sea-lion-7b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-sea-lion-7b-instruct"],
-    ),
-    "microsoft/phi-3-small-8k-instruct": Model(
-        id="microsoft/phi-3-small-8k-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-phi-3-small-8k-instruct"],
-    ),
-    "microsoft/phi-3-small-128k-instruct": Model(
-        id="microsoft/phi-3-small-128k-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-phi-3-small-128k-instruct"],
-    ),
-    "microsoft/phi-3-medium-4k-instruct": Model(
-        id="microsoft/phi-3-medium-4k-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-phi-3-medium-4k-instruct"],
-    ),
-    "ibm/granite-8b-code-instruct": Model(
-        id="ibm/granite-8b-code-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-granite-8b-code-instruct"],
-    ),
-    "ibm/granite-34b-code-instruct": Model(
-        id="ibm/granite-34b-code-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-granite-34b-code-instruct"],
-    ),
-    "google/codegemma-1.1-7b": Model(
-        id="google/codegemma-1.1-7b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-codegemma-1.1-7b"],
-    ),
-    "mediatek/breeze-7b-instruct": Model(
-        id="mediatek/breeze-7b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-breeze-7b-instruct"],
-    ),
-    "upstage/solar-10.7b-instruct": Model(
-        id="upstage/solar-10.7b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-solar-10_7b-instruct"],
-    ),
-    "writer/palmyra-med-70b-32k": Model(
-        id="writer/palmyra-med-70b-32k",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-palmyra-med-70b-32k"],
-    ),
-    "writer/palmyra-med-70b": Model(
-        id="writer/palmyra-med-70b",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-palmyra-med-70b"],
-    ),
-    "mistralai/mistral-7b-instruct-v0.3": Model(
-        id="mistralai/mistral-7b-instruct-v0.3",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-mistral-7b-instruct-v03"],
-    ),
-    "01-ai/yi-large": Model(
-        id="01-ai/yi-large",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-yi-large"],
-    ),
-    "nvidia/nemotron-4-340b-instruct": Model(
-        id="nvidia/nemotron-4-340b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["qa-nemotron-4-340b-instruct"],
-    ),
-    "mistralai/codestral-22b-instruct-v0.1": Model(
-        id="mistralai/codestral-22b-instruct-v0.1",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-codestral-22b-instruct-v01"],
-        supports_structured_output=True,
-    ),
-    "google/gemma-2-9b-it": Model(
-        id="google/gemma-2-9b-it",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-gemma-2-9b-it"],
-    ),
-    "google/gemma-2-27b-it": Model(
-        id="google/gemma-2-27b-it",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-gemma-2-27b-it"],
-    ),
-    "microsoft/phi-3-medium-128k-instruct": Model(
-        id="microsoft/phi-3-medium-128k-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-phi-3-medium-128k-instruct"],
-    ),
-    "deepseek-ai/deepseek-coder-6.7b-instruct": Model(
-        id="deepseek-ai/deepseek-coder-6.7b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        aliases=["ai-deepseek-coder-6_7b-instruct"],
-    ),
-    "nv-mistralai/mistral-nemo-12b-instruct": Model(
-        id="nv-mistralai/mistral-nemo-12b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        supports_tools=True,
-        supports_structured_output=True,
-    ),
-    "meta/llama-3.1-8b-instruct": Model(
-        id="meta/llama-3.1-8b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        supports_tools=True,
-        supports_structured_output=True,
-    ),
-    "meta/llama-3.1-70b-instruct": Model(
-        id="meta/llama-3.1-70b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        supports_tools=True,
-        supports_structured_output=True,
-    ),
-    "meta/llama-3.1-405b-instruct": Model(
-        id="meta/llama-3.1-405b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-        supports_tools=True,
-        supports_structured_output=True,
-    ),
-    "nvidia/usdcode-llama3-70b-instruct": Model(
-        id="nvidia/usdcode-llama3-70b-instruct",
-        model_type="chat",
-        client="ChatNVIDIA",
-    ),
-    "mistralai/mamba-codestral-7b-v0.1": Model(
-        id="mistralai/mamba-codestral-7b-v0.1",
-        model_type="chat",
-        client="ChatNVIDIA",
-    ),
-    "writer/palmyra-fin-70b-32k": Model(
-        id="writer/palmyra-fin-70b-32k",
-        model_type="chat",
-        client="ChatNVIDIA",
-        supports_structured_output=True,
-    ),
-    "google/gemma-2-2b-it": Model(
-        id="google/gemma-2-2b-it",
-        model_type="chat",
-        client="ChatNVIDIA",
-    ),
-}
-
-QA_MODEL_TABLE = {
-    "nvidia/llama3-chatqa-1.5-8b": Model(
-        id="nvidia/llama3-chatqa-1.5-8b",
-        model_type="qa",
-        client="ChatNVIDIA",
-        aliases=["ai-chatqa-1.5-8b"],
-    ),
-    "nvidia/llama3-chatqa-1.5-70b": Model(
-        id="nvidia/llama3-chatqa-1.5-70b",
-        model_type="qa",
-        client="ChatNVIDIA",
-        aliases=["ai-chatqa-1.5-70b"],
-    ),
-}
-
-VLM_MODEL_TABLE = {
-    "adept/fuyu-8b": Model(
-        id="adept/fuyu-8b",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/vlm/adept/fuyu-8b",
-        aliases=["ai-fuyu-8b", "playground_fuyu_8b", "fuyu_8b"],
-    ),
-    "google/deplot": Model(
-        id="google/deplot",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/vlm/google/deplot",
-        aliases=["ai-google-deplot", "playground_deplot", "deplot"],
-    ),
-    "microsoft/kosmos-2": Model(
-        id="microsoft/kosmos-2",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/vlm/microsoft/kosmos-2",
-        aliases=["ai-microsoft-kosmos-2", "playground_kosmos_2", "kosmos_2"],
-    ),
-    "nvidia/neva-22b": Model(
-        id="nvidia/neva-22b",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/vlm/nvidia/neva-22b",
-        aliases=["ai-neva-22b", "playground_neva_22b", "neva_22b"],
-    ),
-    "google/paligemma": Model(
-        id="google/paligemma",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/vlm/google/paligemma",
-        aliases=["ai-google-paligemma"],
-    ),
-    "microsoft/phi-3-vision-128k-instruct": Model(
-        id="microsoft/phi-3-vision-128k-instruct",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/vlm/microsoft/phi-3-vision-128k-instruct",
-        aliases=["ai-phi-3-vision-128k-instruct"],
-    ),
-    "liuhaotian/llava-v1.6-mistral-7b": Model(
-        id="liuhaotian/llava-v1.6-mistral-7b",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/stg/vlm/community/llava16-mistral-7b",
-        aliases=[
-            "ai-llava16-mistral-7b",
-            "community/llava16-mistral-7b",
-            "liuhaotian/llava16-mistral-7b",
-        ],
-    ),
-    "liuhaotian/llava-v1.6-34b": Model(
-        id="liuhaotian/llava-v1.6-34b",
-        model_type="vlm",
-        client="ChatNVIDIA",
-        endpoint="https://ai.api.nvidia.com/v1/stg/vlm/community/llava16-34b",
-        aliases=["ai-llava16-34b", "community/llava16-34b", "liuhaotian/llava16-34b"],
-    ),
-}
-
-EMBEDDING_MODEL_TABLE = {
-    "snowflake/arctic-embed-l": Model(
-        id="snowflake/arctic-embed-l",
-        model_type="embedding",
-        client="NVIDIAEmbeddings",
-        aliases=["ai-arctic-embed-l"],
-    ),
-    "NV-Embed-QA": Model(
-        id="NV-Embed-QA",
-        model_type="embedding",
-        client="NVIDIAEmbeddings",
-        endpoint="https://ai.api.nvidia.com/v1/retrieval/nvidia/embeddings",
-        aliases=[
-            "ai-embed-qa-4",
-            "playground_nvolveqa_40k",
-            "nvolveqa_40k",
-        ],
-    ),
-    "nvidia/nv-embed-v1": Model(
-        id="nvidia/nv-embed-v1",
-        model_type="embedding",
-        client="NVIDIAEmbeddings",
-        aliases=["ai-nv-embed-v1"],
-    ),
-    "nvidia/nv-embedqa-mistral-7b-v2": Model(
-        id="nvidia/nv-embedqa-mistral-7b-v2",
-        model_type="embedding",
-        client="NVIDIAEmbeddings",
-    ),
-    "nvidia/nv-embedqa-e5-v5": Model(
-        id="nvidia/nv-embedqa-e5-v5",
-        model_type="embedding",
-        client="NVIDIAEmbeddings",
-    ),
-    "baai/bge-m3": Model(
-        id="baai/bge-m3",
-        model_type="embedding",
-        client="NVIDIAEmbeddings",
-    ),
-}
-
-RANKING_MODEL_TABLE = {
-    "nv-rerank-qa-mistral-4b:1": Model(
-        id="nv-rerank-qa-mistral-4b:1",
-        model_type="ranking",
-        client="NVIDIARerank",
-        endpoint="https://ai.api.nvidia.com/v1/retrieval/nvidia/reranking",
-        aliases=["ai-rerank-qa-mistral-4b"],
-    ),
-    "nvidia/nv-rerankqa-mistral-4b-v3": Model(
-        id="nvidia/nv-rerankqa-mistral-4b-v3",
-        model_type="ranking",
-        client="NVIDIARerank",
-        endpoint="https://ai.api.nvidia.com/v1/retrieval/nvidia/nv-rerankqa-mistral-4b-v3/reranking",
-    ),
-}
+# The known models are listed in models.json, in tables of one model type and
+# client each. An entry only holds the fields that differ from the defaults,
+# it becomes a Model the first time it is read.
+_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "models.json")
+_catalog: Optional[Dict[str, dict]] = None
+_catalog_models: Dict[Tuple[str, str], Model] = {}
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog() -> Dict[str, dict]:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            with open(_CATALOG_PATH, encoding="utf-8") as f:
+                _catalog = json.load(f)
+        return _catalog
+
+
+def _catalog_model(table: str, id: str) -> Model:
+    """The Model of a catalog entry, the same object for every reader."""
+    key = (table, id)
+    if (model := _catalog_models.get(key)) is None:
+        catalog = _load_catalog()[table]
+        with _catalog_lock:
+            if (model := _catalog_models.get(key)) is None:
+                model = _catalog_models[key] = Model(
+                    id=id,
+                    model_type=catalog["model_type"],
+                    client=catalog["client"],
+                    **catalog["models"][id],
+                )
+    return model
+
+
+class ModelTable(MutableMapping[str, Model]):
+    """
+    Models by id, filled from catalog tables on first use.
+
+    The table keeps an index of aliases to ids, maintained as models are set
+    or removed, so that looking up an alias (or a name that is neither an id
+    nor an alias) is a dict lookup instead of a scan of every model's aliases.
+    When aliases collide, the model set first keeps the alias, which passes
+    to the next model claiming it once that one is replaced or removed.
+    """
+
+    def __init__(self, *tables: str) -> None:
+        self._tables = tables
+        # an entry is a Model, or the catalog table the model comes from
+        self._entries: Optional[Dict[str, Union[Model, str]]] = None
+        self._aliases: Dict[str, str] = {}
+        # the ids claiming each alias in the order they were set, and the
+        # aliases each id claims
+        self._claims: Dict[str, List[str]] = {}
+        self._claimed: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Union[Model, str]]:
+        entries = self._entries
+        if entries is None:
+            with self._lock:
+                if (entries := self._entries) is None:
+                    entries = {}
+                    catalog = _load_catalog()
+                    for table in self._tables:
+                        for id, fields in catalog[table]["models"].items():
+                            self._put(entries, id, table, fields.get("aliases"))
+                    # published once filled, readers never see a partial table
+                    self._entries = entries
+        return entries
+
+    def _put(
+        self,
+        entries: Dict[str, Union[Model, str]],
+        id: str,
+        entry: Union[Model, str],
+        aliases: Optional[List[str]],
+    ) -> None:
+        if id in entries:
+            self._forget_aliases(id)
+        entries[id] = entry
+        if aliases:
+            self._claimed[id] = list(aliases)
+        for alias in aliases or ():
+            self._claims.setdefault(alias, []).append(id)
+            self._aliases.setdefault(alias, id)
+
+    def _forget_aliases(self, id: str) -> None:
+        for alias in self._claimed.pop(id, ()):
+            claims = self._claims[alias]
+            claims.remove(id)
+            if not claims:
+                del self._claims[alias]
+                del self._aliases[alias]
+            elif self._aliases[alias] == id:
+                self._aliases[alias] = claims[0]
+
+    def __getitem__(self, id: str) -> Model:
+        entries = self._load()
+        entry = entries[id]
+        if isinstance(entry, Model):
+            return entry
+        model = entries[id] = _catalog_model(entry, id)
+        return model
+
+    def __setitem__(self, id: str, model: Model) -> None:
+        self._put(self._load(), id, model, model.aliases)
+
+    def __delitem__(self, id: str) -> None:
+        del self._load()[id]
+        self._forget_aliases(id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._load()
+
+    def resolve(self, name: str) -> Optional[Model]:
+        """The model with an id or alias of `name`, None if there is none."""
+        entries = self._load()
+        id = name if name in entries else self._aliases.get(name)
+        return None if id is None else self[id]
+
+
+CHAT_MODEL_TABLE = ModelTable("chat")
+QA_MODEL_TABLE = ModelTable("qa")
+VLM_MODEL_TABLE = ModelTable("vlm")
+EMBEDDING_MODEL_TABLE = ModelTable("embedding")
+RANKING_MODEL_TABLE = ModelTable("ranking")
 
 # COMPLETION_MODEL_TABLE = {
 #     "mistralai/mixtral-8x22b-v0.1": Model(
@@ -478,28 +204,16 @@ RANKING_MODEL_TABLE = {
 #     ),
 # }
 
+OPENAI_MODEL_TABLE = ModelTable("openai")
 
-OPENAI_MODEL_TABLE = {
-    "gpt-3.5-turbo": Model(
-        id="gpt-3.5-turbo",
-        model_type="chat",
-        client="ChatNVIDIA",
-        endpoint="https://api.openai.com/v1/chat/completions",
-        supports_tools=True,
-    ),
-}
-
-
-MODEL_TABLE = {
-    **CHAT_MODEL_TABLE,
-    **QA_MODEL_TABLE,
-    **VLM_MODEL_TABLE,
-    **EMBEDDING_MODEL_TABLE,
-    **RANKING_MODEL_TABLE,
-}
-
-if "_INCLUDE_OPENAI" in os.environ:
-    MODEL_TABLE.update(OPENAI_MODEL_TABLE)
+MODEL_TABLE = ModelTable(
+    "chat",
+    "qa",
+    "vlm",
+    "embedding",
+    "ranking",
+    *(["openai"] if "_INCLUDE_OPENAI" in os.environ else []),
+)
 
 
 def register_model(model: Model) -> None:
@@ -554,13 +268,7 @@ def lookup_model(name: str) -> Optional[Model]:
     Callers can check to see if the name was an alias by
     comparing the result's id field to the name they provided.
     """
-    model = None
-    if not (model := MODEL_TABLE.get(name)):
-        for mdl in MODEL_TABLE.values():
-            if mdl.aliases and name in mdl.aliases:
-                model = mdl
-                break
-    return model
+    return MODEL_TABLE.resolve(name)
 
 
 def determine_model(name: str) -> Optional[Model]:
@@ -0,0 +1,186 @@
+"""Connection pools shared by the clients of an endpoint and credential."""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from langchain_nvidia_ai_endpoints._hedging import Attempt, current_attempt
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+class _AbortableHTTPConnection(HTTPConnection):
+    """
+    A connection that the hedged attempt sending a request on it shuts down
+    when it loses, so that the attempt fails instead of waiting for an answer
+    nobody needs. The connection is then discarded by its pool.
+    """
+
+    _attempt: Optional[Attempt] = None
+
+    def request(self, *args: Any, **kwargs: Any) -> None:
+        self._attempt = attempt = current_attempt()
+        if attempt is not None:
+            attempt.on_cancel(lambda: self._abort(attempt))
+        super().request(*args, **kwargs)
+
+    def _abort(self, attempt: Attempt) -> None:
+        # the connection may be serving another request by now
+        if self._attempt is attempt and (sock := self.sock) is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _AbortableHTTPSConnection(_AbortableHTTPConnection, HTTPSConnection):
+    pass
+
+
+class _HTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _AbortableHTTPConnection
+
+
+class _HTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _AbortableHTTPSConnection
+
+
+class AbortableAdapter(HTTPAdapter):
+    """An HTTPAdapter whose connections hedged attempts that lost can abort."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _HTTPConnectionPool,
+            "https": _HTTPSConnectionPool,
+        }
+
+
+def _discard(session: aiohttp.ClientSession) -> None:
+    """
+    Let go of an aiohttp session whose loop is closed, which cannot close it
+    anymore: the sockets of its pooled connections are closed directly.
+    """
+    connector = session.connector
+    session.detach()
+    for connections in getattr(connector, "_conns", {}).values():
+        for protocol, _ in connections:
+            transport = getattr(protocol, "transport", None)
+            sock = transport and transport.get_extra_info("socket")
+            if sock is not None:
+                sock.close()
+
+
+class Transport:
+    """
+    The connection pools of a set of clients: a requests session, and an
+    aiohttp session per event loop, created on first use.
+
+    Clients hold references to a transport, it is closed when the last one is
+    released. A closed transport is never handed out again, the next client
+    gets a new one.
+    """
+
+    def __init__(self, key: Optional[Hashable] = None) -> None:
+        self.key = key
+        self.refs = 0
+        self.closed = False
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._aio_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        # closes of the aiohttp sessions, on their loops, once released
+        self._closing: Dict[asyncio.AbstractEventLoop, Future] = {}
+
+    def session(self, factory: Callable[[], requests.Session]) -> requests.Session:
+        """The requests session, made by `factory` on first use."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = factory()
+        return self._session
+
+    def aio_session(
+        self, factory: Callable[[], aiohttp.ClientSession]
+    ) -> aiohttp.ClientSession:
+        """
+        The aiohttp session of the running event loop, made by `factory` on
+        first use. aiohttp sessions are bound to the loop they were created on.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._aio_sessions if other.is_closed()]:
+                _discard(self._aio_sessions.pop(closed))
+            session = self._aio_sessions.get(loop)
+            if session is None or session.closed:
+                session = self._aio_sessions[loop] = factory()
+        return session
+
+    def release(self) -> bool:
+        """
+        Drop a reference, True if it was the last and the pools are closed:
+        the requests session at once, the aiohttp sessions on their loops.
+        """
+        with _lock:
+            if self.closed:
+                return False
+            self.refs -= 1
+            if self.refs > 0:
+                return False
+            self.closed = True
+            if self.key is not None and _transports.get(self.key) is self:
+                del _transports[self.key]
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            sessions, self._aio_sessions = self._aio_sessions, {}
+        for loop, session in sessions.items():
+            if loop.is_closed():
+                _discard(session)
+                continue
+            if session.closed:
+                continue
+            try:
+                # the running loop included, aclose() then waits for it
+                self._closing[loop] = asyncio.run_coroutine_threadsafe(
+                    session.close(), loop
+                )
+            except RuntimeError:
+                # closed meanwhile
+                pass
+        return True
+
+    async def aclose(self) -> None:
+        """Wait for the aiohttp session of the running loop to be closed."""
+        closing = self._closing.pop(asyncio.get_running_loop(), None)
+        if closing is not None:
+            await asyncio.wrap_future(closing)
+
+
+_transports: Dict[Hashable, Transport] = {}
+_lock = threading.Lock()
+
+
+def acquire_transport(key: Optional[Hashable]) -> Transport:
+    """
+    Take a reference to the transport of `key`, creating it if needed. A key
+    of None gives a new transport private to the caller.
+    """
+    with _lock:
+        transport = _transports.get(key) if key is not None else None
+        if transport is None:
+            transport = Transport(key)
+            if key is not None:
+                _transports[key] = transport
+        transport.refs += 1
+        return transport
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import time
+from email.utils import parsedate_to_datetime
 from typing import (
     Any,
     Dict,
+    Mapping,
+    Optional,
 )
 
 from langchain_core.messages import (
@@ -61,3 +65,26 @@ def convert_message_to_dict(message: BaseMessage) -> dict:
     if "name" in message.additional_kwargs:
         message_dict["name"] = message.additional_kwargs["name"]
     return message_dict
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Parse a Retry-After header into a delay in seconds.
+
+    Args:
+        headers: The response headers.
+
+    Returns:
+        The delay, or None if the header is missing or malformed. Both the
+        delay-seconds and the HTTP-date forms are accepted.
+    """
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
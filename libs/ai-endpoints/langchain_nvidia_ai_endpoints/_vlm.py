@@ -0,0 +1,75 @@
+"""Helpers for VLM inputs: fetching, encoding and resizing images.
+
+Imported by ChatNVIDIA only when a message holds an image reference, Pillow
+only when an image has to be resized.
+"""
+
+import base64
+import io
+import logging
+import os
+import sys
+import urllib.parse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+def _is_url(s: str) -> bool:
+    try:
+        result = urllib.parse.urlparse(s)
+        return all([result.scheme, result.netloc])
+    except Exception as e:
+        logger.debug(f"Unable to parse URL: {e}")
+        return False
+
+
+def _resize_image(img_data: bytes, max_dim: int = 1024) -> str:
+    try:
+        import PIL.Image
+    except ImportError:
+        print(  # noqa: T201
+            "Pillow is required to resize images down to reasonable scale."
+            " Please install it using `pip install pillow`."
+            " For now, not resizing; may cause NVIDIA API to fail."
+        )
+        return base64.b64encode(img_data).decode("utf-8")
+    image = PIL.Image.open(io.BytesIO(img_data))
+    max_dim_size = max(image.size)
+    aspect_ratio = max_dim / max_dim_size
+    new_h = int(image.size[1] * aspect_ratio)
+    new_w = int(image.size[0] * aspect_ratio)
+    resized_image = image.resize((new_w, new_h), PIL.Image.Resampling.LANCZOS)
+    output_buffer = io.BytesIO()
+    resized_image.save(output_buffer, format="JPEG")
+    output_buffer.seek(0)
+    resized_b64_string = base64.b64encode(output_buffer.read()).decode("utf-8")
+    return resized_b64_string
+
+
+def _url_to_b64_string(image_source: str) -> str:
+    b64_template = "data:image/png;base64,{b64_string}"
+    try:
+        if _is_url(image_source):
+            response = requests.get(
+                image_source, headers={"User-Agent": "langchain-nvidia-ai-endpoints"}
+            )
+            response.raise_for_status()
+            encoded = base64.b64encode(response.content).decode("utf-8")
+            if sys.getsizeof(encoded) > 200000:
+                ## (VK) Temporary fix. NVIDIA API has a limit of 250KB for the input.
+                encoded = _resize_image(response.content)
+            return b64_template.format(b64_string=encoded)
+        elif image_source.startswith("data:image"):
+            return image_source
+        elif os.path.exists(image_source):
+            with open(image_source, "rb") as f:
+                encoded = base64.b64encode(f.read()).decode("utf-8")
+                return b64_template.format(b64_string=encoded)
+        else:
+            raise ValueError(
+                "The provided string is not a valid URL, base64, or file path."
+            )
+    except Exception as e:
+        raise ValueError(f"Unable to process the provided image source: {e}")
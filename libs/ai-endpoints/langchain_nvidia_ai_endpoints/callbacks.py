@@ -233,6 +233,9 @@ class UsageCallbackHandler(BaseCallbackHandler):
 
         if not response.llm_output:
             return None
+        # answered by the identical request of another caller, which counted it
+        if response.llm_output.get("coalesced"):
+            return None
 
         # compute tokens and cost for this request
         token_usage = response.llm_output.get(
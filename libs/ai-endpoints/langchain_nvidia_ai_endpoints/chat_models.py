@@ -2,16 +2,15 @@
 
 from __future__ import annotations
 
-import base64
+import asyncio
 import enum
-import io
 import logging
 import os
-import sys
-import urllib.parse
 import warnings
 from typing import (
+    TYPE_CHECKING,
     Any,
+    AsyncIterator,
     Callable,
     Dict,
     Iterator,
@@ -23,23 +22,16 @@ from typing import (
     Union,
 )
 
-import requests
 from langchain_core.callbacks.manager import (
     AsyncCallbackManagerForLLMRun,
     CallbackManagerForLLMRun,
 )
-from langchain_core.exceptions import OutputParserException
 from langchain_core.language_models import BaseChatModel, LanguageModelInput
 from langchain_core.messages import (
     AIMessage,
     AIMessageChunk,
     BaseMessage,
 )
-from langchain_core.output_parsers import (
-    BaseOutputParser,
-    JsonOutputParser,
-    PydanticOutputParser,
-)
 from langchain_core.outputs import (
     ChatGeneration,
     ChatGenerationChunk,
@@ -48,85 +40,24 @@ from langchain_core.outputs import (
 )
 from langchain_core.pydantic_v1 import BaseModel, Field, PrivateAttr, root_validator
 from langchain_core.runnables import Runnable
-from langchain_core.tools import BaseTool
-from langchain_core.utils.function_calling import convert_to_openai_tool
 from langchain_core.utils.pydantic import is_basemodel_subclass
+from requests.models import Response
 
-from langchain_nvidia_ai_endpoints._common import _NVIDIAClient
+from langchain_nvidia_ai_endpoints._common import _client_options, _NVIDIAClient
+from langchain_nvidia_ai_endpoints._scheduler import Priority
 from langchain_nvidia_ai_endpoints._statics import Model
 from langchain_nvidia_ai_endpoints._utils import convert_message_to_dict
 
+if TYPE_CHECKING:
+    from langchain_core.tools import BaseTool
+
 _CallbackManager = Union[AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun]
 _DictOrPydanticOrEnumClass = Union[Dict[str, Any], Type[BaseModel], Type[enum.Enum]]
 _DictOrPydanticOrEnum = Union[Dict, BaseModel, enum.Enum]
 
-try:
-    import PIL.Image
-
-    has_pillow = True
-except ImportError:
-    has_pillow = False
-
 logger = logging.getLogger(__name__)
 
 
-def _is_url(s: str) -> bool:
-    try:
-        result = urllib.parse.urlparse(s)
-        return all([result.scheme, result.netloc])
-    except Exception as e:
-        logger.debug(f"Unable to parse URL: {e}")
-        return False
-
-
-def _resize_image(img_data: bytes, max_dim: int = 1024) -> str:
-    if not has_pillow:
-        print(  # noqa: T201
-            "Pillow is required to resize images down to reasonable scale."
-            " Please install it using `pip install pillow`."
-            " For now, not resizing; may cause NVIDIA API to fail."
-        )
-        return base64.b64encode(img_data).decode("utf-8")
-    image = PIL.Image.open(io.BytesIO(img_data))
-    max_dim_size = max(image.size)
-    aspect_ratio = max_dim / max_dim_size
-    new_h = int(image.size[1] * aspect_ratio)
-    new_w = int(image.size[0] * aspect_ratio)
-    resized_image = image.resize((new_w, new_h), PIL.Image.Resampling.LANCZOS)
-    output_buffer = io.BytesIO()
-    resized_image.save(output_buffer, format="JPEG")
-    output_buffer.seek(0)
-    resized_b64_string = base64.b64encode(output_buffer.read()).decode("utf-8")
-    return resized_b64_string
-
-
-def _url_to_b64_string(image_source: str) -> str:
-    b64_template = "data:image/png;base64,{b64_string}"
-    try:
-        if _is_url(image_source):
-            response = requests.get(
-                image_source, headers={"User-Agent": "langchain-nvidia-ai-endpoints"}
-            )
-            response.raise_for_status()
-            encoded = base64.b64encode(response.content).decode("utf-8")
-            if sys.getsizeof(encoded) > 200000:
-                ## (VK) Temporary fix. NVIDIA API has a limit of 250KB for the input.
-                encoded = _resize_image(response.content)
-            return b64_template.format(b64_string=encoded)
-        elif image_source.startswith("data:image"):
-            return image_source
-        elif os.path.exists(image_source):
-            with open(image_source, "rb") as f:
-                encoded = base64.b64encode(f.read()).decode("utf-8")
-                return b64_template.format(b64_string=encoded)
-        else:
-            raise ValueError(
-                "The provided string is not a valid URL, base64, or file path."
-            )
-    except Exception as e:
-        raise ValueError(f"Unable to process the provided image source: {e}")
-
-
 def _nv_vlm_adjust_input(message_dict: Dict[str, Any]) -> Dict[str, Any]:
     """
     The NVIDIA VLM API input message.content:
@@ -162,18 +93,46 @@ def _nv_vlm_adjust_input(message_dict: Dict[str, Any]) -> Dict[str, Any]:
     In the process, it accepts a url or file and converts them to
     data urls.
     """
-    if content := message_dict.get("content"):
-        if isinstance(content, list):
-            for part in content:
-                if isinstance(part, dict) and "image_url" in part:
-                    if (
-                        isinstance(part["image_url"], dict)
-                        and "url" in part["image_url"]
-                    ):
-                        part["image_url"] = _url_to_b64_string(part["image_url"]["url"])
+    if parts := _nv_vlm_image_parts(message_dict):
+        from langchain_nvidia_ai_endpoints._vlm import _url_to_b64_string
+
+        for part in parts:
+            part["image_url"] = _url_to_b64_string(part["image_url"]["url"])
     return message_dict
 
 
+def _nv_vlm_image_parts(message_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The parts of a message with an OpenAI image_url, to convert."""
+    content = message_dict.get("content")
+    if not isinstance(content, list):
+        return []
+    return [
+        part
+        for part in content
+        if isinstance(part, dict)
+        and isinstance(part.get("image_url"), dict)
+        and "url" in part["image_url"]
+    ]
+
+
+def _nv_adjust_inputs(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+    """The NVIDIA API input messages of messages, images fetched and encoded."""
+    return [_nv_vlm_adjust_input(convert_message_to_dict(m)) for m in messages]
+
+
+async def _anv_adjust_inputs(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+    """
+    Async version of _nv_adjust_inputs, fetching and reading images in an
+    executor.
+    """
+    inputs = [convert_message_to_dict(m) for m in messages]
+    if not any(_nv_vlm_image_parts(m) for m in inputs):
+        return inputs
+    return await asyncio.get_running_loop().run_in_executor(
+        None, lambda: [_nv_vlm_adjust_input(m) for m in inputs]
+    )
+
+
 class ChatNVIDIA(BaseChatModel):
     """NVIDIA chat model.
 
@@ -190,8 +149,11 @@ class ChatNVIDIA(BaseChatModel):
     _client: _NVIDIAClient = PrivateAttr(_NVIDIAClient)
     _default_model_name: str = "meta/llama3-8b-instruct"
     _default_base_url: str = "https://integrate.api.nvidia.com/v1"
-    base_url: str = Field(
-        description="Base url for model listing an invocation",
+    base_url: Union[str, List[str]] = Field(
+        description=(
+            "Base url for model listing an invocation, or the base urls of "
+            "replicas to balance over"
+        ),
     )
     model: Optional[str] = Field(description="Name of the model to invoke")
     temperature: Optional[float] = Field(description="Sampling temperature in [0, 1]")
@@ -201,6 +163,12 @@ class ChatNVIDIA(BaseChatModel):
     top_p: Optional[float] = Field(description="Top-p for distribution sampling")
     seed: Optional[int] = Field(description="The seed for deterministic results")
     stop: Optional[Sequence[str]] = Field(description="Stop words (cased)")
+    priority: Optional[Priority] = Field(
+        description=(
+            "Scheduling priority when max_concurrency is set: "
+            '"interactive", "default" or "batch"'
+        )
+    )
 
     _base_url_var = "NVIDIA_BASE_URL"
 
@@ -227,13 +195,25 @@ class ChatNVIDIA(BaseChatModel):
             model (str): The model to use for chat.
             nvidia_api_key (str): The API key to use for connecting to the hosted NIM.
             api_key (str): Alternative to nvidia_api_key.
-            base_url (str): The base URL of the NIM to connect to.
+            base_url (str | list[str]): The base URL of the NIM to connect to.
                             Format for base URL is http://host:port
+                            A list of the URLs of replicas of the NIM spreads
+                            requests over them, see load_balancing.
             temperature (float): Sampling temperature in [0, 1].
             max_tokens (int): Maximum number of tokens to generate.
             top_p (float): Top-p for distribution sampling.
             seed (int): A seed for deterministic results.
             stop (list[str]): A list of cased stop words.
+            priority (str): "interactive", "default" or "batch", the scheduling
+                            priority of requests when max_concurrency is set. It
+                            can be overridden per call, e.g.
+                            invoke(..., priority="batch"), or for the calls of
+                            a chain, e.g. with the metadata of its config,
+                            invoke(..., config={"metadata": {"priority":
+                            "batch"}}).
+
+        Client options are keyword arguments, documented on the fields of
+        :class:`~langchain_nvidia_ai_endpoints._common._NVIDIAClient`.
 
         API Key:
         - The recommended way to provide the API key is through the `NVIDIA_API_KEY`
@@ -247,11 +227,35 @@ class ChatNVIDIA(BaseChatModel):
             api_key=kwargs.get("nvidia_api_key", kwargs.get("api_key", None)),
             infer_path="{base_url}/chat/completions",
             cls=self.__class__.__name__,
+            **_client_options(kwargs),
         )
         # todo: only store the model in one place
         # the model may be updated to a newer name during initialization
         self.model = self._client.model_name
 
+    def close(self) -> None:
+        """
+        Release the connection pools, they are closed once no other client
+        shares them. Pools are acquired again if the client is used again.
+        """
+        self._client.close()
+
+    async def aclose(self) -> None:
+        """Async version of close, waiting for the aiohttp pools to close."""
+        await self._client.aclose()
+
+    def __enter__(self) -> ChatNVIDIA:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def __aenter__(self) -> ChatNVIDIA:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
     @property
     def available_models(self) -> List[Model]:
         """
@@ -281,20 +285,51 @@ class ChatNVIDIA(BaseChatModel):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        inputs = [
-            _nv_vlm_adjust_input(message)
-            for message in [convert_message_to_dict(message) for message in messages]
-        ]
+        inputs = _nv_adjust_inputs(messages)
+        priority = self._priority(kwargs, run_manager)
+        deadline = kwargs.pop("deadline", None)
         payload = self._get_payload(inputs=inputs, stop=stop, stream=False, **kwargs)
-        response = self._client.get_req(payload=payload)
+        response = self._client.get_req(
+            payload=payload, priority=priority, deadline=deadline
+        )
         responses, _ = self._client.postprocess(response)
-        self._set_callback_out(responses, run_manager)
+        self._set_callback_out(responses, run_manager, response)
         parsed_response = self._custom_postprocess(responses, streaming=False)
         # for pre 0.2 compatibility w/ ChatMessage
         # ChatMessage had a role property that was not present in AIMessage
         parsed_response.update({"role": "assistant"})
         generation = ChatGeneration(message=AIMessage(**parsed_response))
-        return ChatResult(generations=[generation], llm_output=responses)
+        return ChatResult(
+            generations=[generation],
+            llm_output=self._client.callback_output(responses, response),
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await self._client.aresolve_model()
+        inputs = await _anv_adjust_inputs(messages)
+        priority = self._priority(kwargs, run_manager)
+        deadline = kwargs.pop("deadline", None)
+        payload = self._get_payload(inputs=inputs, stop=stop, stream=False, **kwargs)
+        response = await self._client.aget_req(
+            payload=payload, priority=priority, deadline=deadline
+        )
+        responses, _ = self._client.postprocess(response)
+        self._set_callback_out(responses, run_manager, response)
+        parsed_response = self._custom_postprocess(responses, streaming=False)
+        # for pre 0.2 compatibility w/ ChatMessage
+        # ChatMessage had a role property that was not present in AIMessage
+        parsed_response.update({"role": "assistant"})
+        generation = ChatGeneration(message=AIMessage(**parsed_response))
+        return ChatResult(
+            generations=[generation],
+            llm_output=self._client.callback_output(responses, response),
+        )
 
     def _stream(
         self,
@@ -304,35 +339,86 @@ class ChatNVIDIA(BaseChatModel):
         **kwargs: Any,
     ) -> Iterator[ChatGenerationChunk]:
         """Allows streaming to model!"""
-        inputs = [
-            _nv_vlm_adjust_input(message)
-            for message in [convert_message_to_dict(message) for message in messages]
-        ]
+        inputs = _nv_adjust_inputs(messages)
+        priority = self._priority(kwargs, run_manager)
+        deadline = kwargs.pop("deadline", None)
+        payload = self._get_payload(inputs=inputs, stop=stop, stream=True, **kwargs)
+        stream = self._client.get_req_stream(
+            payload=payload, priority=priority, deadline=deadline
+        )
+        try:
+            for response in stream:
+                self._set_callback_out(response, run_manager)
+                parsed_response = self._custom_postprocess(response, streaming=True)
+                # for pre 0.2 compatibility w/ ChatMessageChunk
+                # ChatMessageChunk had a role property that was not
+                # present in AIMessageChunk
+                # unfortunately, AIMessageChunk does not have extensible propery
+                # parsed_response.update({"role": "assistant"})
+                message = AIMessageChunk(**parsed_response)
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            # stopping early cancels the request, the server stops generating
+            stream.close()
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[Sequence[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Allows streaming to model without blocking the event loop."""
+        await self._client.aresolve_model()
+        inputs = await _anv_adjust_inputs(messages)
+        priority = self._priority(kwargs, run_manager)
+        deadline = kwargs.pop("deadline", None)
         payload = self._get_payload(inputs=inputs, stop=stop, stream=True, **kwargs)
-        for response in self._client.get_req_stream(payload=payload):
-            self._set_callback_out(response, run_manager)
-            parsed_response = self._custom_postprocess(response, streaming=True)
-            # for pre 0.2 compatibility w/ ChatMessageChunk
-            # ChatMessageChunk had a role property that was not
-            # present in AIMessageChunk
-            # unfortunately, AIMessageChunk does not have extensible propery
-            # parsed_response.update({"role": "assistant"})
-            message = AIMessageChunk(**parsed_response)
-            chunk = ChatGenerationChunk(message=message)
-            if run_manager:
-                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
-            yield chunk
+        stream = self._client.aget_req_stream(
+            payload=payload, priority=priority, deadline=deadline
+        )
+        try:
+            async for response in stream:
+                self._set_callback_out(response, run_manager)
+                parsed_response = self._custom_postprocess(response, streaming=True)
+                message = AIMessageChunk(**parsed_response)
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    def _priority(
+        self, kwargs: Dict[str, Any], run_manager: Optional[_CallbackManager]
+    ) -> Optional[Priority]:
+        """
+        The priority of a call: its priority keyword, else the "priority" in
+        the metadata of its RunnableConfig, else the model's.
+        """
+        if priority := kwargs.pop("priority", None):
+            return priority
+        if run_manager is not None and (
+            priority := run_manager.metadata.get("priority")
+        ):
+            return priority
+        return self.priority
 
     def _set_callback_out(
         self,
         result: dict,
         run_manager: Optional[_CallbackManager],
+        response: Optional[Response] = None,
     ) -> None:
         result.update({"model_name": self.model})
         if run_manager:
+            output = self._client.callback_output(result, response)
             for cb in run_manager.handlers:
                 if hasattr(cb, "llm_output"):
-                    cb.llm_output = result
+                    cb.llm_output = output
 
     def _custom_postprocess(
         self, msg: dict, streaming: bool = False
@@ -389,6 +475,13 @@ class ChatNVIDIA(BaseChatModel):
     ######################################################################################
     ## Core client-side interfaces
 
+    def _resolve_model(self) -> Optional[str]:
+        # with defer_model_discovery the client resolves the model on the
+        # first call, possibly to another name
+        if (model := self._client.resolve_model()) != self.model:
+            self.model = model
+        return model
+
     def _get_payload(
         self, inputs: Sequence[Dict], **kwargs: Any
     ) -> dict:  # todo: remove
@@ -420,7 +513,7 @@ class ChatNVIDIA(BaseChatModel):
 
         # setup default payload values
         payload: Dict[str, Any] = {
-            "model": self.model,
+            "model": self._resolve_model(),
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
             "top_p": self.top_p,
@@ -466,6 +559,9 @@ class ChatNVIDIA(BaseChatModel):
 
         see https://python.langchain.com/v0.1/docs/modules/model_io/chat/function_calling/#request-forcing-a-tool-call
         """
+        # tool support is imported on first use, it is slow to import
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
         # check if the model supports tools, warn if it does not
         if self._client.model and not self._client.model.supports_tools:
             warnings.warn(
@@ -657,6 +753,13 @@ class ChatNVIDIA(BaseChatModel):
                 "being None when the LLM produces an incomplete response."
             )
 
+        from langchain_core.exceptions import OutputParserException
+        from langchain_core.output_parsers import (
+            BaseOutputParser,
+            JsonOutputParser,
+            PydanticOutputParser,
+        )
+
         # check if the model supports structured output, warn if it does not
         known_good = False
         # todo: we need to store model: Model in this class
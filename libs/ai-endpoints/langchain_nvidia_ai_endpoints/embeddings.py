@@ -2,7 +2,7 @@
 
 import os
 import warnings
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from langchain_core.embeddings import Embeddings
 from langchain_core.outputs.llm_result import LLMResult
@@ -13,8 +13,10 @@ from langchain_core.pydantic_v1 import (
     root_validator,
     validator,
 )
+from requests.models import Response
 
-from langchain_nvidia_ai_endpoints._common import _NVIDIAClient
+from langchain_nvidia_ai_endpoints._common import _client_options, _NVIDIAClient
+from langchain_nvidia_ai_endpoints._scheduler import Priority
 from langchain_nvidia_ai_endpoints._statics import Model
 from langchain_nvidia_ai_endpoints.callbacks import usage_callback_var
 
@@ -37,8 +39,11 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
     _default_model_name: str = "NV-Embed-QA"
     _default_max_batch_size: int = 50
     _default_base_url: str = "https://integrate.api.nvidia.com/v1"
-    base_url: str = Field(
-        description="Base url for model listing an invocation",
+    base_url: Union[str, List[str]] = Field(
+        description=(
+            "Base url for model listing an invocation, or the base urls of "
+            "replicas to balance over"
+        ),
     )
     model: Optional[str] = Field(description="Name of the model to invoke")
     truncate: Literal["NONE", "START", "END"] = Field(
@@ -52,6 +57,13 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
     model_type: Optional[Literal["passage", "query"]] = Field(
         None, description="(DEPRECATED) The type of text to be embedded."
     )
+    priority: Optional[Priority] = Field(
+        None,
+        description=(
+            "Scheduling priority when max_concurrency is set: "
+            '"interactive", "default" or "batch"'
+        ),
+    )
 
     _base_url_var = "NVIDIA_BASE_URL"
 
@@ -78,11 +90,18 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
             model (str): The model to use for embedding.
             nvidia_api_key (str): The API key to use for connecting to the hosted NIM.
             api_key (str): Alternative to nvidia_api_key.
-            base_url (str): The base URL of the NIM to connect to.
+            base_url (str | list[str]): The base URL of the NIM to connect to.
                             Format for base URL is http://host:port
+                            A list of the URLs of replicas of the NIM spreads
+                            requests over them, see load_balancing.
             trucate (str): "NONE", "START", "END", truncate input text if it exceeds
                             the model's context length. Default is "NONE", which raises
                             an error if an input is too long.
+            priority (str): "interactive", "default" or "batch", the scheduling
+                            priority of requests when max_concurrency is set.
+
+        Client options are keyword arguments, documented on the fields of
+        :class:`~langchain_nvidia_ai_endpoints._common._NVIDIAClient`.
 
         API Key:
         - The recommended way to provide the API key is through the `NVIDIA_API_KEY`
@@ -96,6 +115,7 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
             api_key=kwargs.get("nvidia_api_key", kwargs.get("api_key", None)),
             infer_path="{base_url}/embeddings",
             cls=self.__class__.__name__,
+            **_client_options(kwargs),
         )
         # todo: only store the model in one place
         # the model may be updated to a newer name during initialization
@@ -123,6 +143,29 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
             )
         return v
 
+    def close(self) -> None:
+        """
+        Release the connection pools, they are closed once no other client
+        shares them. Pools are acquired again if the client is used again.
+        """
+        self._client.close()
+
+    async def aclose(self) -> None:
+        """Async version of close, waiting for the aiohttp pools to close."""
+        await self._client.aclose()
+
+    def __enter__(self) -> "NVIDIAEmbeddings":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "NVIDIAEmbeddings":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
     @property
     def available_models(self) -> List[Model]:
         """
@@ -140,10 +183,16 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
         """
         return cls(**kwargs).available_models
 
-    def _embed(
+    def _resolve_model(self) -> Optional[str]:
+        # with defer_model_discovery the client resolves the model on the
+        # first call, possibly to another name
+        if (model := self._client.resolve_model()) != self.model:
+            self.model = model
+        return model
+
+    def _embed_payload(
         self, texts: List[str], model_type: Literal["passage", "query"]
-    ) -> List[List[float]]:
-        """Embed a single text entry to either passage or query type"""
+    ) -> Dict[str, Any]:
         # API Catalog API -
         #  input: str | list[str]              -- char limit depends on model
         #  model: str                          -- model name, e.g. NV-Embed-QA
@@ -154,25 +203,47 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
         #                                         an input is too long
         payload = {
             "input": texts,
-            "model": self.model,
+            "model": self._resolve_model(),
             "encoding_format": "float",
             "input_type": model_type,
         }
         if self.truncate:
             payload["truncate"] = self.truncate
+        return payload
 
-        response = self._client.get_req(
-            payload=payload,
-        )
+    def _embed_result(self, response: Response) -> List[List[float]]:
         response.raise_for_status()
-        result = response.json()
+        result = self._client.decode(response)
         data = result.get("data", result)
         if not isinstance(data, list):
             raise ValueError(f"Expected data with a list of embeddings. Got: {data}")
         embedding_list = [(res["embedding"], res["index"]) for res in data]
-        self._invoke_callback_vars(result)
+        self._client.charge_usage(result.get("usage"), response)
+        if not self._client.coalesced(response):
+            self._invoke_callback_vars(result)
         return [x[0] for x in sorted(embedding_list, key=lambda x: x[1])]
 
+    def _embed(
+        self, texts: List[str], model_type: Literal["passage", "query"]
+    ) -> List[List[float]]:
+        """Embed a single text entry to either passage or query type"""
+        response = self._client.get_req(
+            payload=self._embed_payload(texts, model_type),
+            priority=self.priority,
+        )
+        return self._embed_result(response)
+
+    async def _aembed(
+        self, texts: List[str], model_type: Literal["passage", "query"]
+    ) -> List[List[float]]:
+        """Async version of _embed"""
+        await self._client.aresolve_model()
+        response = await self._client.aget_req(
+            payload=self._embed_payload(texts, model_type),
+            priority=self.priority,
+        )
+        return self._embed_result(response)
+
     def embed_query(self, text: str) -> List[float]:
         """Input pathway for query embeddings."""
         return self._embed([text], model_type=self.model_type or "query")[0]
@@ -192,6 +263,25 @@ class NVIDIAEmbeddings(BaseModel, Embeddings):
             )
         return all_embeddings
 
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async input pathway for query embeddings."""
+        return (await self._aembed([text], model_type=self.model_type or "query"))[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async input pathway for document embeddings."""
+        if not isinstance(texts, list) or not all(
+            isinstance(text, str) for text in texts
+        ):
+            raise ValueError(f"`texts` must be a list of strings, given: {repr(texts)}")
+
+        all_embeddings = []
+        for i in range(0, len(texts), self.max_batch_size):
+            batch = texts[i : i + self.max_batch_size]
+            all_embeddings.extend(
+                await self._aembed(batch, model_type=self.model_type or "passage")
+            )
+        return all_embeddings
+
     def _invoke_callback_vars(self, response: dict) -> None:
         """Invoke the callback context variables if there are any."""
         callback_vars = [
@@ -0,0 +1,82 @@
+"""Exceptions raised by the NVIDIA AI Endpoints clients."""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import requests
+
+# status codes that signal a transient condition, the same request may
+# succeed when it is sent again
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class NVIDIAHTTPError(requests.HTTPError):
+    """
+    An endpoint answered with an error status.
+
+    The message carries the details extracted from the response body,
+    the response itself is available as `response`.
+    """
+
+    @property
+    def status_code(self) -> Optional[int]:
+        return self.response.status_code if self.response is not None else None
+
+
+class NVIDIARetryableError(NVIDIAHTTPError):
+    """
+    An endpoint answered with a transient error, e.g. 429 or 503.
+
+    The client retries these automatically, this is raised when the retries
+    are exhausted or the retry budget does not allow another attempt.
+    `retry_after` is the delay in seconds the server asked for, if any.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        *args: Any,
+        retry_after: Optional[float] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(message, *args, **kwargs)
+        self.retry_after = retry_after
+
+
+class NVIDIADeadlineExceeded(TimeoutError):
+    """
+    A call did not complete within its deadline.
+
+    The deadline covers the whole call: waiting for admission, connecting,
+    reading, polling for a 202 response, retries and streaming. Whatever
+    connection the call held is closed, not returned to the pool.
+    """
+
+
+class NVIDIAStreamStalled(TimeoutError):
+    """
+    A stream went silent: its first event did not arrive within
+    stream_first_token_timeout, or the next one within stream_idle_timeout.
+
+    `events` is the number of events received before the stall, with none the
+    request may be sent again (see retry_stalled_streams).
+    """
+
+    def __init__(self, message: str, events: int = 0) -> None:
+        super().__init__(message)
+        self.events = events
+
+
+class NVIDIACircuitOpen(Exception):
+    """
+    A request was not sent: the circuit breaker of its endpoint is open (of
+    every replica, when balancing over several) after repeated failures.
+
+    `retry_after` is the delay in seconds before the endpoint takes a trial
+    request again.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
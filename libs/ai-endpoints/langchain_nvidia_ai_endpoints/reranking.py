@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Generator, List, Literal, Optional, Sequence
+from typing import Any, Dict, Generator, List, Literal, Optional, Sequence, Union
 
 from langchain_core.callbacks.manager import Callbacks
 from langchain_core.documents import Document
 from langchain_core.documents.compressor import BaseDocumentCompressor
 from langchain_core.pydantic_v1 import BaseModel, Field, PrivateAttr, root_validator
+from requests.models import Response
 
-from langchain_nvidia_ai_endpoints._common import _NVIDIAClient
+from langchain_nvidia_ai_endpoints._common import _client_options, _NVIDIAClient
+from langchain_nvidia_ai_endpoints._scheduler import Priority
 from langchain_nvidia_ai_endpoints._statics import Model
 
 
@@ -30,8 +32,11 @@ class NVIDIARerank(BaseDocumentCompressor):
     _default_batch_size: int = 32
     _default_model_name: str = "nv-rerank-qa-mistral-4b:1"
     _default_base_url: str = "https://integrate.api.nvidia.com/v1"
-    base_url: str = Field(
-        description="Base url for model listing an invocation",
+    base_url: Union[str, List[str]] = Field(
+        description=(
+            "Base url for model listing an invocation, or the base urls of "
+            "replicas to balance over"
+        ),
     )
     top_n: int = Field(5, ge=0, description="The number of documents to return.")
     model: Optional[str] = Field(description="The model to use for reranking.")
@@ -45,6 +50,12 @@ class NVIDIARerank(BaseDocumentCompressor):
     max_batch_size: int = Field(
         _default_batch_size, ge=1, description="The maximum batch size."
     )
+    priority: Optional[Priority] = Field(
+        description=(
+            "Scheduling priority when max_concurrency is set: "
+            '"interactive", "default" or "batch"'
+        ),
+    )
 
     _base_url_var = "NVIDIA_BASE_URL"
 
@@ -71,10 +82,17 @@ class NVIDIARerank(BaseDocumentCompressor):
             model (str): The model to use for reranking.
             nvidia_api_key (str): The API key to use for connecting to the hosted NIM.
             api_key (str): Alternative to nvidia_api_key.
-            base_url (str): The base URL of the NIM to connect to.
+            base_url (str | list[str]): The base URL of the NIM to connect to,
+                            or a list of the URLs of its replicas to spread
+                            requests over, see load_balancing.
             truncate (str): "NONE", "END", truncate input text if it exceeds
                             the model's context length. Default is model dependent and
                             is likely to raise an error if an input is too long.
+            priority (str): "interactive", "default" or "batch", the scheduling
+                            priority of requests when max_concurrency is set.
+
+        Client options are keyword arguments, documented on the fields of
+        :class:`~langchain_nvidia_ai_endpoints._common._NVIDIAClient`.
 
         API Key:
         - The recommended way to provide the API key is through the `NVIDIA_API_KEY`
@@ -88,11 +106,35 @@ class NVIDIARerank(BaseDocumentCompressor):
             api_key=kwargs.get("nvidia_api_key", kwargs.get("api_key", None)),
             infer_path="{base_url}/ranking",
             cls=self.__class__.__name__,
+            **_client_options(kwargs),
         )
         # todo: only store the model in one place
         # the model may be updated to a newer name during initialization
         self.model = self._client.model_name
 
+    def close(self) -> None:
+        """
+        Release the connection pools, they are closed once no other client
+        shares them. Pools are acquired again if the client is used again.
+        """
+        self._client.close()
+
+    async def aclose(self) -> None:
+        """Async version of close, waiting for the aiohttp pools to close."""
+        await self._client.aclose()
+
+    def __enter__(self) -> NVIDIARerank:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def __aenter__(self) -> NVIDIARerank:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
     @property
     def available_models(self) -> List[Model]:
         """
@@ -110,23 +152,64 @@ class NVIDIARerank(BaseDocumentCompressor):
         """
         return cls(**kwargs).available_models
 
-    # todo: batching when len(documents) > endpoint's max batch size
-    def _rank(self, documents: List[str], query: str) -> List[Ranking]:
+    def _resolve_model(self) -> Optional[str]:
+        # with defer_model_discovery the client resolves the model on the
+        # first call, possibly to another name
+        if (model := self._client.resolve_model()) != self.model:
+            self.model = model
+        return model
+
+    def _rank_payload(self, documents: List[str], query: str) -> Dict[str, Any]:
         payload = {
-            "model": self.model,
+            "model": self._resolve_model(),
             "query": {"text": query},
             "passages": [{"text": passage} for passage in documents],
         }
         if self.truncate:
             payload["truncate"] = self.truncate
-        response = self._client.get_req(payload=payload)
+        return payload
+
+    def _rank_result(self, response: Response) -> List[Ranking]:
         if response.status_code != 200:
             response.raise_for_status()
         # todo: handle errors
-        rankings = response.json()["rankings"]
+        rankings = self._client.decode(response)["rankings"]
         # todo: callback support
         return [Ranking(**ranking) for ranking in rankings[: self.top_n]]
 
+    # todo: batching when len(documents) > endpoint's max batch size
+    def _rank(self, documents: List[str], query: str) -> List[Ranking]:
+        response = self._client.get_req(
+            payload=self._rank_payload(documents, query), priority=self.priority
+        )
+        return self._rank_result(response)
+
+    async def _arank(self, documents: List[str], query: str) -> List[Ranking]:
+        await self._client.aresolve_model()
+        response = await self._client.aget_req(
+            payload=self._rank_payload(documents, query), priority=self.priority
+        )
+        return self._rank_result(response)
+
+    @staticmethod
+    def _batch(ls: list, size: int) -> Generator[List[Document], None, None]:
+        for i in range(0, len(ls), size):
+            yield ls[i : i + size]
+
+    def _collect(
+        self,
+        results: List[Document],
+        doc_batch: List[Document],
+        rankings: List[Ranking],
+    ) -> None:
+        for ranking in rankings:
+            assert (
+                0 <= ranking.index < len(doc_batch)
+            ), "invalid response from server: index out of range"
+            doc = doc_batch[ranking.index]
+            doc.metadata["relevance_score"] = ranking.logit
+            results.append(doc)
+
     def compress_documents(
         self,
         documents: Sequence[Document],
@@ -147,23 +230,47 @@ class NVIDIARerank(BaseDocumentCompressor):
         if len(documents) == 0 or self.top_n < 1:
             return []
 
-        def batch(ls: list, size: int) -> Generator[List[Document], None, None]:
-            for i in range(0, len(ls), size):
-                yield ls[i : i + size]
-
         doc_list = list(documents)
-        results = []
-        for doc_batch in batch(doc_list, self.max_batch_size):
+        results: List[Document] = []
+        for doc_batch in self._batch(doc_list, self.max_batch_size):
             rankings = self._rank(
                 query=query, documents=[d.page_content for d in doc_batch]
             )
-            for ranking in rankings:
-                assert (
-                    0 <= ranking.index < len(doc_batch)
-                ), "invalid response from server: index out of range"
-                doc = doc_batch[ranking.index]
-                doc.metadata["relevance_score"] = ranking.logit
-                results.append(doc)
+            self._collect(results, doc_batch, rankings)
+
+        # if we batched, we need to sort the results
+        if len(doc_list) > self.max_batch_size:
+            results.sort(key=lambda x: x.metadata["relevance_score"], reverse=True)
+
+        return results[: self.top_n]
+
+    async def acompress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        """
+        Async version of compress_documents.
+
+        Args:
+            documents: A sequence of documents to compress.
+            query: The query to use for compressing the documents.
+            callbacks: Callbacks to run during the compression process.
+
+        Returns:
+            A sequence of compressed documents.
+        """
+        if len(documents) == 0 or self.top_n < 1:
+            return []
+
+        doc_list = list(documents)
+        results: List[Document] = []
+        for doc_batch in self._batch(doc_list, self.max_batch_size):
+            rankings = await self._arank(
+                query=query, documents=[d.page_content for d in doc_batch]
+            )
+            self._collect(results, doc_batch, rankings)
 
         # if we batched, we need to sort the results
         if len(doc_list) > self.max_batch_size:
@@ -0,0 +1,79 @@
+"""Measure the cost of the model catalog.
+
+Reports the time to import the catalog module (in fresh interpreters, the
+package itself imports it lazily), to build the model tables on first use,
+and to look up ids, aliases and unknown names.
+
+    poetry run python scripts/benchmark_catalog.py [--repeat R]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+from langchain_nvidia_ai_endpoints import _statics
+from langchain_nvidia_ai_endpoints._statics import MODEL_TABLE, ModelTable, lookup_model
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_time(module: str, repeat: int) -> float:
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    return min(
+        float(subprocess.check_output([sys.executable, "-c", code]))
+        for _ in range(repeat)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    # what the catalog module imports of langchain_core
+    baseline = import_time("langchain_core.pydantic_v1", args.repeat)
+    statics = import_time("langchain_nvidia_ai_endpoints._statics", args.repeat)
+    print(  # noqa: T201
+        f"import: {statics * 1e3:.1f} ms, "
+        f"{(statics - baseline) * 1e3:+.1f} ms over langchain_core"
+    )
+
+    def build() -> None:
+        _statics._catalog = None
+        _statics._catalog_models.clear()
+        table = ModelTable(*MODEL_TABLE._tables)
+        for _ in table.values():
+            pass
+
+    print(f"first use: {best_of(args.repeat, build) * 1e3:.2f} ms")  # noqa: T201
+
+    alias = next(
+        alias for model in MODEL_TABLE.values() for alias in model.aliases or []
+    )
+    names = {
+        "id": next(iter(MODEL_TABLE)),
+        "alias": alias,
+        "unknown": "unknown/model",
+    }
+    for kind, name in names.items():
+        elapsed = best_of(
+            args.repeat, lambda: [lookup_model(name) for _ in range(args.lookups)]
+        )
+        print(f"lookup {kind:>7}: {elapsed * 1e9 / args.lookups:6.0f} ns")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
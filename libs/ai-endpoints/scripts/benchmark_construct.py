@@ -0,0 +1,56 @@
+"""Measure how many clients can be constructed per second.
+
+Constructs each public class against a local NIM without a model name, which
+makes construction pick the default model from the endpoint's listing, with
+the model listing uncached, cached, and deferred to the first call. The
+listing is served by a mock, a real endpoint adds its round trip to the
+uncached case.
+
+    poetry run python scripts/benchmark_construct.py [--seconds S]
+"""
+
+import argparse
+import time
+import warnings
+from typing import Any, Dict, Type
+
+import requests_mock
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings, NVIDIARerank
+
+BASE_URL = "http://localhost:8000/v1"
+
+MODES: Dict[str, Dict[str, Any]] = {
+    "uncached": {"models_cache_ttl": 0},
+    "cached": {},
+    "deferred": {"defer_model_discovery": True},
+}
+
+
+def rate(cls: Type, seconds: float, **kwargs: Any) -> float:
+    count = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        cls(base_url=BASE_URL, **kwargs)
+        count += 1
+    return count / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    with requests_mock.Mocker() as mocker:
+        mocker.get(f"{BASE_URL}/models", json={"data": [{"id": "local-model"}]})
+        print(f"{'':>16}" + "".join(f"{mode:>12}" for mode in MODES))  # noqa: T201
+        for cls in (ChatNVIDIA, NVIDIAEmbeddings, NVIDIARerank):
+            rates = [rate(cls, args.seconds, **kwargs) for kwargs in MODES.values()]
+            print(  # noqa: T201
+                f"{cls.__name__:>16}" + "".join(f"{r:10.0f}/s" for r in rates)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure the import time of the package and of each public class.
+
+Every statement runs in fresh interpreters, the best time is reported along
+with the time over importing langchain_core, which the package builds on, and
+the heavy optional modules it pulled in.
+
+    poetry run python scripts/benchmark_import.py [--repeat R]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+STATEMENTS = [
+    "import langchain_nvidia_ai_endpoints",
+    "from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings",
+    "from langchain_nvidia_ai_endpoints import NVIDIARerank",
+    "from langchain_nvidia_ai_endpoints import ChatNVIDIA",
+]
+BASELINE = "import langchain_core.pydantic_v1, requests"
+HEAVY = ["aiohttp", "PIL", "langchain_core.tools", "langchain_core.output_parsers"]
+
+
+def measure(statement: str) -> dict:
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY!r} if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    return json.loads(subprocess.check_output([sys.executable, "-c", code]))
+
+
+def best_of(repeat: int, statement: str) -> dict:
+    return min((measure(statement) for _ in range(repeat)), key=lambda r: r["elapsed"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = best_of(args.repeat, BASELINE)["elapsed"]
+    print(f"baseline ({BASELINE}): {baseline * 1e3:.0f} ms")  # noqa: T201
+    for statement in STATEMENTS:
+        result = best_of(args.repeat, statement)
+        elapsed = result["elapsed"]
+        print(  # noqa: T201
+            f"{statement}: {elapsed * 1e3:.0f} ms "
+            f"({(elapsed - baseline) * 1e3:+.0f} ms), "
+            f"imports {', '.join(result['heavy']) or 'none of ' + ', '.join(HEAVY)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare the JSON codecs on large embedding payloads.
+
+Decodes an embeddings response and encodes an embed_documents request with
+every installed codec, and reports the best time of each.
+
+    poetry run python scripts/benchmark_json.py [--batch N] [--dim D]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable
+
+from langchain_nvidia_ai_endpoints._jsoncodec import _INSTALLED, get_codec
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    response = {
+        "object": "list",
+        "data": [
+            {
+                "index": i,
+                "embedding": [rng.uniform(-1, 1) for _ in range(args.dim)],
+                "object": "embedding",
+            }
+            for i in range(args.batch)
+        ],
+        "model": "nvidia/nv-embedqa-e5-v5",
+        "usage": {"prompt_tokens": 512 * args.batch, "total_tokens": 512 * args.batch},
+    }
+    request = {
+        "input": [" ".join(["passage"] * 400)] * args.batch,
+        "model": "nvidia/nv-embedqa-e5-v5",
+        "encoding_format": "float",
+        "input_type": "passage",
+    }
+    body = get_codec("json").dumps(response)
+    print(  # noqa: T201
+        f"{args.batch} x {args.dim} floats, {len(body) / 1e6:.1f} MB response, "
+        f"best of {args.repeat}"
+    )
+    for name, installed in _INSTALLED.items():
+        if not installed:
+            print(f"{name:>8}: not installed")  # noqa: T201
+            continue
+        codec = get_codec(name)
+        decode = best_of(args.repeat, lambda: codec.loads(body))
+        encode = best_of(args.repeat, lambda: codec.dumps(request))
+        print(  # noqa: T201
+            f"{name:>8}: decode {decode * 1e3:7.2f} ms, encode {encode * 1e3:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
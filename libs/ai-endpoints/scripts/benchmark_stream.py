@@ -0,0 +1,96 @@
+"""Measure the client-side overhead per streamed token.
+
+Streams a synthetic chat completion from a mocked endpoint through
+_NVIDIAClient.get_req_stream and through the previous line-based parsing,
+and reports the time spent per token by each.
+
+    poetry run python scripts/benchmark_stream.py [--tokens N] [--repeat R]
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Iterator
+
+import requests_mock
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from langchain_nvidia_ai_endpoints._common import _NVIDIAClient
+
+URL = "https://integrate.api.nvidia.com/v1/chat/completions"
+
+
+def make_body(tokens: int) -> bytes:
+    events = []
+    for i in range(tokens):
+        chunk = {
+            "id": "chatcmpl-0",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "mock-model",
+            "choices": [
+                {"index": 0, "delta": {"content": f" tok{i}"}, "finish_reason": None}
+            ],
+        }
+        events.append(f"data: {json.dumps(chunk)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode()
+
+
+def line_based(client: _NVIDIAClient, payload: dict) -> Iterator[dict]:
+    """The parsing get_req_stream used before the incremental decoder."""
+    response = client._get_session().post(URL, json=payload, stream=True)
+    call = client.copy()
+    for line in response.iter_lines():
+        if line and line.strip() != b"data: [DONE]":
+            msg, final_line = call.postprocess(line.decode("utf-8"))
+            yield msg
+            if final_line:
+                break
+        client._try_raise(response)
+
+
+def incremental(client: _NVIDIAClient, payload: dict) -> Iterator[dict]:
+    return client.get_req_stream(payload)
+
+
+def run(
+    name: str,
+    stream: Callable[[_NVIDIAClient, dict], Iterator[dict]],
+    client: _NVIDIAClient,
+    tokens: int,
+    repeat: int,
+) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in stream(client, {"stream": True}))
+        best = min(best, time.perf_counter() - start)
+        assert count == tokens, count
+    per_token = best * 1e6 / tokens
+    print(f"{name:>12}: {per_token:7.2f} us/token, {tokens / best:9.0f} tok/s")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_body(args.tokens)
+    with requests_mock.Mocker() as mocker:
+        mocker.get(
+            "https://integrate.api.nvidia.com/v1/models",
+            json={"data": [{"id": "mock-model"}]},
+        )
+        mocker.post(URL, content=body)
+        client = ChatNVIDIA(api_key="BOGUS")._client
+        print(  # noqa: T201
+            f"{args.tokens} tokens, {len(body) / 1e6:.1f} MB, best of {args.repeat}"
+        )
+        run("line-based", line_based, client, args.tokens, args.repeat)
+        run("incremental", incremental, client, args.tokens, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
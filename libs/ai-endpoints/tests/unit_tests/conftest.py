@@ -1,9 +1,25 @@
-from typing import Callable, List
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List
 
 import pytest
 import requests_mock
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
 from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings, NVIDIARerank
+from langchain_nvidia_ai_endpoints._models_cache import (
+    MODELS_CACHE_ENV,
+    get_models_cache,
+)
+
+# a non-streamed chat completion, for the test servers
+COMPLETION = {
+    "choices": [
+        {"index": 0, "message": {"role": "assistant", "content": "Hi"}},
+    ]
+}
+
+# aiohttp handlers by "METHOD /path"
+Routes = Dict[str, Callable[[web.Request], Awaitable[web.StreamResponse]]]
 
 
 @pytest.fixture(
@@ -27,6 +43,13 @@ def mock_model() -> str:
     return "mock-model"
 
 
+@pytest.fixture(autouse=True)
+def models_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    # listings are cached process-wide, each test mocks its own
+    monkeypatch.delenv(MODELS_CACHE_ENV, raising=False)
+    get_models_cache().clear()
+
+
 @pytest.fixture(autouse=True)
 def mock_v1_models(requests_mock: requests_mock.Mocker, mock_model: str) -> None:
     requests_mock.get(
@@ -60,3 +83,22 @@ def mock_streaming_response(
         )
 
     return builder
+
+
+@pytest.fixture
+def routes() -> Routes:
+    """The routes of the `server` fixture, overridden or parametrized by tests."""
+    return {}
+
+
+@pytest.fixture
+async def server(routes: Routes) -> AsyncGenerator[TestServer, None]:
+    """A local aiohttp server of `routes`."""
+    app = web.Application()
+    for route, handler in routes.items():
+        method, path = route.split(" ", 1)
+        app.router.add_route(method, path, handler)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    yield test_server
+    await test_server.close()
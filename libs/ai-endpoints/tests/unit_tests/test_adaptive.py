@@ -0,0 +1,109 @@
+import pytest
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._adaptive import AdaptiveLimit
+from langchain_nvidia_ai_endpoints._scheduler import Scheduler
+
+EMBEDDINGS_URL = "https://integrate.api.nvidia.com/v1/embeddings"
+
+
+def _saturated(max_limit: int = 16) -> AdaptiveLimit:
+    scheduler = Scheduler(limit=1)
+    adaptive = AdaptiveLimit(scheduler, max_limit=max_limit)
+    scheduler._in_flight = max_limit  # every slot in use
+    return adaptive
+
+
+def test_additive_increase() -> None:
+    adaptive = _saturated()
+    assert adaptive.limit == 4
+    for _ in range(4 + 5 + 6):
+        adaptive.record(0.1)
+    assert adaptive.limit == 7
+    assert adaptive._scheduler.limit == 7
+    for _ in range(1000):
+        adaptive.record(0.1)
+    assert adaptive.limit == 16
+    assert adaptive.latency == pytest.approx(0.1)
+
+
+def test_no_increase_when_unused() -> None:
+    adaptive = _saturated()
+    adaptive._scheduler._in_flight = 0
+    for _ in range(100):
+        adaptive.record(0.1)
+    assert adaptive.limit == 4
+    # the request recorded holds a slot, one short of the limit is not full
+    adaptive._scheduler._in_flight = 3
+    for _ in range(100):
+        adaptive.record(0.1)
+    assert adaptive.limit == 4
+
+
+def test_multiplicative_decrease_on_overload() -> None:
+    adaptive = _saturated()
+    adaptive._limit = 16.0
+    adaptive.record(0.0, overloaded=True)
+    assert adaptive.limit == 8
+    assert adaptive.error_rate > 0
+    adaptive._last_decrease = 0.0
+    for _ in range(10):
+        adaptive.record(0.0, overloaded=True)
+        adaptive._last_decrease = 0.0
+    assert adaptive.limit == 1
+
+
+def test_decrease_once_per_latency() -> None:
+    adaptive = _saturated()
+    adaptive.record(10.0)  # a slow baseline, no time has passed since
+    adaptive._limit = 16.0
+    adaptive.record(0.0, overloaded=True)
+    adaptive.record(0.0, overloaded=True)
+    assert adaptive.limit == 8
+
+
+def test_decrease_on_latency_growth() -> None:
+    adaptive = _saturated()
+    adaptive._limit = 10.0
+    adaptive.record(0.01)
+    for _ in range(20):
+        adaptive.record(0.1)
+        adaptive._last_decrease = 0.0
+    assert adaptive.limit < 10
+    assert adaptive.min_latency == pytest.approx(0.01, rel=0.1)
+
+
+def test_client_feeds_adaptive_limit(requests_mock: Mocker, mock_model: str) -> None:
+    requests_mock.post(
+        EMBEDDINGS_URL,
+        [
+            {"status_code": 503, "json": {}},
+            {"json": {"data": [{"embedding": [1.0], "index": 0}]}},
+        ],
+    )
+    with pytest.warns(UserWarning, match="type is unknown"):
+        embedding = NVIDIAEmbeddings(
+            base_url="https://integrate.api.nvidia.com/v1",
+            api_key="BOGUS",
+            model=mock_model,
+            adaptive_concurrency=True,
+            max_concurrency=8,
+            retry_backoff=0,
+        )
+    scheduler = embedding._client.scheduler
+    assert scheduler is not None and scheduler.adaptive is not None
+    adaptive = scheduler.adaptive
+    adaptive._limit = 8.0
+    assert embedding.embed_query("foo") == [1.0]
+    assert adaptive.limit == 4
+    assert adaptive.latency is not None
+    assert scheduler.in_flight == 0
+
+
+def test_adaptive_is_opt_in() -> None:
+    assert ChatNVIDIA(api_key="BOGUS")._client.scheduler is None
+    llm = ChatNVIDIA(api_key="BOGUS", max_concurrency=3)
+    assert llm._client.scheduler is not None
+    assert llm._client.scheduler.adaptive is None
+    assert llm._client.scheduler.limit == 3
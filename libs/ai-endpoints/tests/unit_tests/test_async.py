@@ -0,0 +1,196 @@
+import json
+import re
+import threading
+from typing import Any, List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings, NVIDIARerank
+
+from .conftest import Routes
+
+
+def _chunk(content: str, finish_reason: str = "null") -> str:
+    return (
+        'data: {"id":"ID0","object":"chat.completion.chunk","model":"bogus",'
+        f'"choices":[{{"index":0,"delta":{{"role":null,"content":"{content}"}},'
+        f'"finish_reason":{finish_reason}}}]}}'
+    )
+
+
+async def chat(request: web.Request) -> web.StreamResponse:
+    body = await request.json()
+    assert request.headers["Authorization"] == "Bearer BOGUS"
+    if body.get("stream"):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for content in ["Hello", " ", "World"]:
+            await response.write(f"{_chunk(content)}\n\n".encode())
+        await response.write(f"{_chunk('', json.dumps('stop'))}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+    return web.json_response(
+        {
+            "id": "ID0",
+            "object": "chat.completion",
+            "model": "bogus",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "Hello World"},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+        }
+    )
+
+
+async def embeddings(request: web.Request) -> web.Response:
+    body = await request.json()
+    return web.json_response(
+        {
+            "data": [
+                {"embedding": [float(len(text))], "index": i}
+                for i, text in enumerate(body["input"])
+            ],
+            "usage": {"prompt_tokens": 1, "total_tokens": 1},
+        }
+    )
+
+
+async def ranking(request: web.Request) -> web.Response:
+    body = await request.json()
+    rankings = [
+        {"index": i, "logit": float(len(passage["text"]))}
+        for i, passage in enumerate(body["passages"])
+    ]
+    rankings.sort(key=lambda x: x["logit"], reverse=True)
+    return web.json_response({"rankings": rankings})
+
+
+async def accepted(request: web.Request) -> web.Response:
+    return web.Response(status=202, headers={"NVCF-REQID": "REQ0"})
+
+
+async def status(request: web.Request) -> web.Response:
+    assert request.match_info["request_id"] == "REQ0"
+    return web.json_response({"data": [{"embedding": [4.0], "index": 0}]})
+
+
+@pytest.fixture
+def routes() -> Routes:
+    return {
+        "POST /v1/chat/completions": chat,
+        "POST /v1/embeddings": embeddings,
+        "POST /v1/ranking": ranking,
+        "POST /v1/accepted": accepted,
+        "GET /status/{request_id}": status,
+    }
+
+
+def base_url(server: TestServer) -> str:
+    return str(server.make_url("/v1"))
+
+
+async def test_ainvoke(server: TestServer) -> None:
+    llm = ChatNVIDIA(base_url=base_url(server), model="mock-model", api_key="BOGUS")
+    response = await llm.ainvoke("Hi")
+    assert response.content == "Hello World"
+    assert response.response_metadata["token_usage"]["total_tokens"] == 3
+    await llm._client.aclose()
+
+
+async def test_ainvoke_fetches_images_off_the_loop(
+    server: TestServer, requests_mock: Mocker
+) -> None:
+    fetched: List[threading.Thread] = []
+
+    def image(request: Any, context: Any) -> bytes:
+        fetched.append(threading.current_thread())
+        return b"PNG"
+
+    requests_mock.get("https://example.com/image.png", content=image)
+    llm = ChatNVIDIA(base_url=base_url(server), model="mock-model", api_key="BOGUS")
+    message = HumanMessage(
+        content=[
+            {"type": "text", "text": "Hi"},
+            {
+                "type": "image_url",
+                "image_url": {"url": "https://example.com/image.png"},
+            },
+        ]
+    )
+    response = await llm.ainvoke([message])
+    assert response.content == "Hello World"
+    assert len(fetched) == 1 and fetched[0] is not threading.current_thread()
+    await llm._client.aclose()
+
+
+async def test_astream(server: TestServer) -> None:
+    llm = ChatNVIDIA(base_url=base_url(server), model="mock-model", api_key="BOGUS")
+    chunks: List[str] = [str(chunk.content) async for chunk in llm.astream("Hi")]
+    assert "".join(chunks) == "Hello World"
+    await llm._client.aclose()
+
+
+async def test_aembed(server: TestServer) -> None:
+    embedder = NVIDIAEmbeddings(
+        base_url=base_url(server), model="mock-model", max_batch_size=2
+    )
+    assert await embedder.aembed_query("abc") == [3.0]
+    assert await embedder.aembed_documents(["a", "bb", "ccc"]) == [
+        [1.0],
+        [2.0],
+        [3.0],
+    ]
+    await embedder._client.aclose()
+
+
+async def test_acompress_documents(server: TestServer) -> None:
+    ranker = NVIDIARerank(base_url=base_url(server), model="mock-model", top_n=2)
+    documents = [Document(page_content=text) for text in ["a", "ccc", "bb"]]
+    result = await ranker.acompress_documents(documents=documents, query="q")
+    assert [doc.page_content for doc in result] == ["ccc", "bb"]
+    await ranker._client.aclose()
+
+
+async def test_shared_aio_session(server: TestServer) -> None:
+    a = ChatNVIDIA(base_url=base_url(server), model="mock-model", api_key="BOGUS")
+    b = ChatNVIDIA(base_url=base_url(server), model="mock-model", api_key="BOGUS")
+    await a.ainvoke("Hi")
+    await b.ainvoke("Hi")
+    session = a._client._get_aio_session()
+    assert b._client._get_aio_session() is session
+    await a._client.aclose()
+    assert not session.closed
+    await b._client.aclose()
+    assert session.closed
+
+
+async def test_a202_polling(server: TestServer, requests_mock: Mocker) -> None:
+    # status checks are done by the shared poller thread with requests
+    requests_mock.get(re.compile(".*/status/.*"), real_http=True)
+    embedder = NVIDIAEmbeddings(base_url=base_url(server), model="mock-model")
+    client = embedder._client
+    client.infer_path = str(server.make_url("/v1/accepted"))
+    client.polling_url_tmpl = str(server.make_url("/status/")) + "{request_id}"
+    assert await embedder.aembed_query("abcd") == [4.0]
+    await client.aclose()
+
+
+def test_context_manager() -> None:
+    with ChatNVIDIA(api_key="CONTEXT") as llm:
+        transport = llm._client._get_transport()
+    assert transport.closed
+
+
+async def test_async_context_manager() -> None:
+    async with NVIDIAEmbeddings(api_key="ASYNC-CONTEXT") as embedder:
+        session = embedder._client._get_aio_session()
+    assert session.closed
@@ -0,0 +1,333 @@
+import functools
+import gc
+from typing import Generator, List, Tuple
+
+import pytest
+import requests
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._balancer import (
+    Balancer,
+    Endpoint,
+    _balancers,
+    affinity_key,
+)
+from langchain_nvidia_ai_endpoints._scheduler import Lease
+
+from .conftest import COMPLETION
+
+REPLICAS = ["http://replica-a:8000/v1", "http://replica-b:8000/v1"]
+
+
+@pytest.fixture(autouse=True)
+def balancers() -> Generator[None, None, None]:
+    # balancers are shared process-wide, each test starts from idle replicas
+    _balancers.clear()
+    yield
+    _balancers.clear()
+
+
+@pytest.fixture
+def replicas(requests_mock: Mocker, mock_model: str) -> List[str]:
+    for url in REPLICAS:
+        requests_mock.get(f"{url}/models", json={"data": [{"id": mock_model}]})
+    return REPLICAS
+
+
+def _balancer(*urls: str) -> Balancer:
+    return Balancer(list(urls), {}, interval=0)
+
+
+def test_least_outstanding() -> None:
+    balancer = _balancer("http://a/v1", "http://b/v1", "http://c/v1")
+    a, b, c = balancer.endpoints
+    a.begin()
+    b.begin()
+    assert balancer.pick() is c
+    c.begin()
+    c.begin()
+    assert balancer.pick() in (a, b)
+    assert balancer.pick(exclude=[a]) is b
+
+
+def test_nearest_breaks_ties() -> None:
+    balancer = _balancer("http://a/v1", "http://b/v1")
+    a, b = balancer.endpoints
+    a.probed(0.2)
+    b.probed(0.01)
+    assert balancer.pick() is b
+    b.begin()
+    assert balancer.pick() is a
+
+
+def test_unhealthy_skipped() -> None:
+    balancer = _balancer("http://a/v1", "http://b/v1")
+    a, b = balancer.endpoints
+    a.probed(None)
+    assert not a.healthy
+    b.begin()
+    assert balancer.pick() is b
+    # unless nothing else is left
+    assert balancer.pick(exclude=[b]) is a
+    b.probed(None)
+    assert balancer.pick() is a
+    a.probed(0.1)
+    assert a.healthy
+
+
+def test_p2c() -> None:
+    balancer = _balancer(*[f"http://{i}/v1" for i in range(4)])
+    busiest = balancer.endpoints[0]
+    for _ in range(3):
+        busiest.begin()
+    # the busiest replica never wins a pair
+    assert all(balancer.pick(policy="p2c") is not busiest for _ in range(50))
+    picked = {balancer.pick(policy="p2c") for _ in range(200)}
+    assert picked == set(balancer.endpoints[1:])
+
+
+def test_probe(requests_mock: Mocker) -> None:
+    requests_mock.get("http://a/v1/models", json={"data": []})
+    requests_mock.get("http://b/v1/models", exc=requests.ConnectionError)
+    requests_mock.get("http://c/v1/models", status_code=503)
+    balancer = _balancer("http://a/v1", "http://b/v1", "http://c/v1")
+    balancer.probe()
+    a, b, c = balancer.endpoints
+    assert a.healthy and a.latency is not None
+    assert not b.healthy and b.latency is None
+    assert not c.healthy
+
+
+def test_lease_holds_endpoint() -> None:
+    endpoint = Endpoint("http://a/v1")
+    lease = Lease()
+    lease.hold(endpoint)
+    assert endpoint.outstanding == 1
+    lease()
+    lease()
+    assert endpoint.outstanding == 0
+
+
+def test_base_url_list(replicas: List[str], mock_model: str) -> None:
+    llm = ChatNVIDIA(
+        base_url=["http://replica-a:8000", "http://replica-b:8000/v1/"],
+        model=mock_model,
+        health_check_interval=0,
+    )
+    client = llm._client
+    assert client.base_url == replicas[0]
+    assert client.base_urls == replicas
+    assert client.lc_attributes["base_url"] == replicas
+    balancer = client.balancer
+    assert balancer is not None
+    assert [e.url for e in balancer.endpoints] == replicas
+    assert ChatNVIDIA(base_url=replicas[0], model=mock_model)._client.balancer is None
+
+
+def test_probing_stops_when_released(replicas: List[str], mock_model: str) -> None:
+    a = ChatNVIDIA(base_url=replicas, model=mock_model, health_check_interval=60)
+    b = ChatNVIDIA(base_url=replicas, model=mock_model, health_check_interval=60)
+    balancer = a._client.balancer
+    assert balancer is not None and b._client.balancer is balancer
+    thread = balancer._thread
+    assert thread is not None and thread.is_alive()
+    a._client.close()
+    assert thread.is_alive()
+    # the last client garbage collected
+    del b
+    gc.collect()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert balancer.closed and not _balancers
+    # a closed balancer is not handed out again
+    assert a._client.balancer is not balancer
+    a._client.close()
+
+
+def test_requests_spread(replicas: List[str], mock_model: str) -> None:
+    llm = ChatNVIDIA(base_url=replicas, model=mock_model, health_check_interval=0)
+    balancer = llm._client.balancer
+    assert balancer is not None
+    a, b = balancer.endpoints
+    # a request in flight on a sends the next one to b
+    a.begin()
+    lease = Lease()
+    tried: List[Endpoint] = []
+    url = llm._client._route(lease, llm._client.infer_url, tried)
+    assert url == f"{replicas[1]}/chat/completions"
+    assert tried == [b] and b.outstanding == 1
+    lease()
+    a.end()
+    assert (a.outstanding, b.outstanding) == (0, 0)
+
+
+def test_retry_other_replica(
+    requests_mock: Mocker, replicas: List[str], mock_model: str
+) -> None:
+    failing = requests_mock.post(
+        f"{replicas[0]}/chat/completions", status_code=503, json={}
+    )
+    working = requests_mock.post(f"{replicas[1]}/chat/completions", json=COMPLETION)
+    llm = ChatNVIDIA(
+        base_url=replicas,
+        model=mock_model,
+        health_check_interval=0,
+        retry_backoff=0,
+    )
+    balancer = llm._client.balancer
+    assert balancer is not None
+    balancer.endpoints[1].begin()
+    assert llm.invoke("Hi").content == "Hi"
+    assert failing.call_count == 1
+    assert working.call_count == 1
+    balancer.endpoints[1].end()
+    assert [e.outstanding for e in balancer.endpoints] == [0, 0]
+
+
+def test_stream_routed(
+    requests_mock: Mocker, replicas: List[str], mock_model: str
+) -> None:
+    mock = requests_mock.post(
+        f"{replicas[1]}/chat/completions",
+        text='data: {"choices":[{"index":0,"delta":{"content":"Hi"}}]}\n\n'
+        "data: [DONE]\n\n",
+    )
+    llm = ChatNVIDIA(base_url=replicas, model=mock_model, health_check_interval=0)
+    balancer = llm._client.balancer
+    assert balancer is not None
+    balancer.endpoints[0].begin()
+    assert [chunk.content for chunk in llm.stream("Hi")][0] == "Hi"
+    assert mock.call_count == 1
+    balancer.endpoints[0].end()
+    assert [e.outstanding for e in balancer.endpoints] == [0, 0]
+
+
+def test_discovery_merged(requests_mock: Mocker) -> None:
+    requests_mock.get(
+        f"{REPLICAS[0]}/models", json={"data": [{"id": "model-1"}, {"id": "both"}]}
+    )
+    requests_mock.get(
+        f"{REPLICAS[1]}/models", json={"data": [{"id": "model-2"}, {"id": "both"}]}
+    )
+    embedder = NVIDIAEmbeddings(
+        base_url=REPLICAS, model="model-2", health_check_interval=0
+    )
+    ids = sorted(model.id for model in embedder.available_models)
+    assert ids == ["both", "model-1", "model-2"]
+
+
+def test_discovery_survives_replica(requests_mock: Mocker) -> None:
+    requests_mock.get(f"{REPLICAS[0]}/models", exc=requests.ConnectionError)
+    requests_mock.get(f"{REPLICAS[1]}/models", json={"data": [{"id": "model-2"}]})
+    embedder = NVIDIAEmbeddings(
+        base_url=REPLICAS, model="model-2", health_check_interval=0, max_retries=0
+    )
+    assert [model.id for model in embedder.available_models] == ["model-2"]
+
+
+def _chat(*contents: str, system: str = "Be brief.") -> dict:
+    messages = [{"role": "system", "content": system}]
+    for i, content in enumerate(contents):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": content})
+    return {"model": "mock-model", "messages": messages}
+
+
+def test_affinity_key() -> None:
+    key = affinity_key(_chat("Hi"), turns=1)
+    assert key is not None
+    # a conversation keeps its key as it grows
+    assert affinity_key(_chat("Hi", "Hello", "How are you?"), turns=1) == key
+    assert affinity_key(_chat("Hi", "Hello"), turns=2) != key
+    assert affinity_key(_chat("Bye"), turns=1) != key
+    assert affinity_key(_chat("Bye"), turns=0) == affinity_key(_chat("Hi"), turns=0)
+    assert affinity_key(_chat("Hi", system="Be verbose."), turns=1) != key
+    assert affinity_key({**_chat("Hi"), "model": "other"}, turns=1) != key
+    assert affinity_key({"input": ["Hi"]}, turns=1) is None
+
+
+def test_prefix_affinity() -> None:
+    balancer = _balancer("http://a/v1", "http://b/v1", "http://c/v1")
+    pick = functools.partial(balancer.pick, policy="prefix_affinity")
+    keys = [affinity_key(_chat(f"Question {i}"), turns=1) for i in range(300)]
+    homes = [pick(key=key) for key in keys]
+    assert homes == [pick(key=key) for key in keys]
+    # every replica gets a fair share of the prefixes
+    for endpoint in balancer.endpoints:
+        assert homes.count(endpoint) > 50
+    # excluding a replica only moves its own prefixes
+    a = balancer.endpoints[0]
+    for key, home in zip(keys, homes):
+        moved = pick(exclude=[a], key=key)
+        assert moved is home or home is a
+    # without a key, least outstanding applies
+    a.begin()
+    assert pick() is not a
+
+
+def test_prefix_affinity_bounded_load() -> None:
+    balancer = _balancer("http://a/v1", "http://b/v1")
+    pick = functools.partial(balancer.pick, policy="prefix_affinity")
+    key = affinity_key(_chat("Hi"), turns=1)
+    home = pick(key=key)
+    other = next(e for e in balancer.endpoints if e is not home)
+    # a popular prefix fills its replica up to the bound, then spills over
+    picked = []
+    for _ in range(8):
+        endpoint = pick(key=key)
+        endpoint.begin()
+        picked.append(endpoint)
+    assert picked[:2] == [home, home]
+    assert other in picked
+    assert home.outstanding <= 1.25 * 8 / 2 + 1
+
+
+def test_prefix_affinity_routing(
+    requests_mock: Mocker, replicas: List[str], mock_model: str
+) -> None:
+    mocks = [
+        requests_mock.post(f"{url}/chat/completions", json=COMPLETION)
+        for url in replicas
+    ]
+    llm = ChatNVIDIA(
+        base_url=replicas,
+        model=mock_model,
+        health_check_interval=0,
+        load_balancing="prefix_affinity",
+    )
+    history: List[Tuple[str, str]] = [("system", "Be brief.")]
+    for i in range(5):
+        history.append(("user", f"Question {i}"))
+        llm.invoke(history)
+        history.append(("assistant", "Hi"))
+    assert sorted(mock.call_count for mock in mocks) == [0, 5]
+
+
+def test_policy_per_client(
+    requests_mock: Mocker, replicas: List[str], mock_model: str
+) -> None:
+    mocks = [
+        requests_mock.post(f"{url}/chat/completions", json=COMPLETION)
+        for url in replicas
+    ]
+    affine = ChatNVIDIA(
+        base_url=replicas,
+        model=mock_model,
+        health_check_interval=0,
+        load_balancing="prefix_affinity",
+    )
+    balancer = affine._client.balancer
+    # a client of the same replicas with another policy does not change it
+    spread = ChatNVIDIA(base_url=replicas, model=mock_model, health_check_interval=0)
+    assert spread._client.balancer is balancer
+    for _ in range(4):
+        affine.invoke("Hi")
+    assert sorted(mock.call_count for mock in mocks) == [0, 4]
+    counts = [mock.call_count for mock in mocks]
+    # while the other spreads its own requests by load
+    assert balancer is not None
+    balancer.endpoints[0].begin()
+    spread.invoke("Hi")
+    balancer.endpoints[0].end()
+    assert [mock.call_count for mock in mocks] == [counts[0], counts[1] + 1]
@@ -0,0 +1,194 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator
+
+import pytest
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from langchain_nvidia_ai_endpoints._balancer import _balancers
+from langchain_nvidia_ai_endpoints._breaker import CircuitBreaker, _breakers
+from langchain_nvidia_ai_endpoints._scheduler import Lease
+from langchain_nvidia_ai_endpoints.errors import (
+    NVIDIACircuitOpen,
+    NVIDIARetryableError,
+)
+
+from .conftest import COMPLETION
+
+CHAT_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
+REPLICAS = ["http://replica-a:8000/v1", "http://replica-b:8000/v1"]
+
+
+@pytest.fixture(autouse=True)
+def breakers() -> Generator[None, None, None]:
+    # breakers are shared process-wide, each test starts from closed ones
+    _breakers.clear()
+    _balancers.clear()
+    yield
+    _breakers.clear()
+    _balancers.clear()
+
+
+def test_consecutive_failures() -> None:
+    breaker = CircuitBreaker("http://a/v1")
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+    assert breaker.state == "closed"
+    breaker.record(0.1, failed=True)
+    assert breaker.state == "open"
+    assert not breaker.try_acquire()
+    assert breaker.trips == 1
+    assert 29 < breaker.retry_after <= 30
+    assert isinstance(breaker.error(), NVIDIACircuitOpen)
+
+
+def test_failure_rate() -> None:
+    breaker = CircuitBreaker("http://a/v1", failure_rate=0.5)
+    # too few calls to judge
+    for failed in [True, False] * 4:
+        breaker.record(0.1, failed)
+    assert breaker.state == "closed"
+    assert breaker.error_rate == 0.5
+    breaker.record(0.1, True)
+    breaker.record(0.1, False)
+    assert breaker.state == "open"
+
+
+def test_slow_calls() -> None:
+    breaker = CircuitBreaker("http://a/v1", slow_call=1.0)
+    for _ in range(5):
+        breaker.record(0.5, failed=False)
+    assert breaker.state == "closed"
+    for _ in range(5):
+        breaker.record(2.0, failed=False)
+    assert breaker.state == "open"
+
+
+def test_half_open() -> None:
+    breaker = CircuitBreaker("http://a/v1", cooldown=0.05)
+    for _ in range(5):
+        breaker.record(0.1, failed=True)
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    # a single trial at a time
+    assert breaker.try_acquire()
+    assert not breaker.try_acquire()
+    breaker.record(0.1, failed=True)
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+    time.sleep(0.06)
+    assert breaker.try_acquire()
+    breaker.record(0.1, failed=False)
+    assert breaker.state == "closed"
+    assert breaker.error_rate == 0
+
+
+def test_cancelled_trial() -> None:
+    breaker = CircuitBreaker("http://a/v1", cooldown=0.01)
+    for _ in range(5):
+        breaker.record(0.1, failed=True)
+    time.sleep(0.02)
+    lease = Lease()
+    assert breaker.try_acquire()
+    lease.guard(breaker)
+    assert not breaker.try_acquire()
+    # released without an outcome, e.g. a 400
+    lease()
+    assert breaker.state == "half_open"
+    assert breaker.try_acquire()
+
+
+def test_single_trial_from_threads() -> None:
+    breaker = CircuitBreaker("http://a/v1", cooldown=0.01)
+    for _ in range(5):
+        breaker.record(0.1, failed=True)
+    time.sleep(0.02)
+    barrier = threading.Barrier(8)
+
+    def trial() -> bool:
+        barrier.wait()
+        return breaker.try_acquire()
+
+    with ThreadPoolExecutor(8) as pool:
+        admitted = list(pool.map(lambda _: trial(), range(8)))
+    assert admitted.count(True) == 1
+
+
+def test_fail_fast(requests_mock: Mocker) -> None:
+    mock = requests_mock.post(CHAT_URL, status_code=503, json={})
+    llm = ChatNVIDIA(
+        api_key="BOGUS", model="mock-model", circuit_breaker=True, max_retries=0
+    )
+    for _ in range(5):
+        with pytest.raises(NVIDIARetryableError):
+            llm.invoke("Hi")
+    breaker = llm._client.circuit_breakers[llm._client.base_url]
+    assert breaker.state == "open"
+    with pytest.raises(NVIDIACircuitOpen):
+        llm.invoke("Hi")
+    assert mock.call_count == 5
+
+
+def test_disabled_by_default(requests_mock: Mocker) -> None:
+    requests_mock.post(CHAT_URL, status_code=503, json={})
+    llm = ChatNVIDIA(api_key="BOGUS", model="mock-model", max_retries=0)
+    assert llm._client.circuit_breakers == {}
+    for _ in range(6):
+        with pytest.raises(NVIDIARetryableError):
+            llm.invoke("Hi")
+
+
+def test_replica_ejected(requests_mock: Mocker, mock_model: str) -> None:
+    for url in REPLICAS:
+        requests_mock.get(f"{url}/models", json={"data": [{"id": mock_model}]})
+    failing = requests_mock.post(
+        f"{REPLICAS[0]}/chat/completions", status_code=503, json={}
+    )
+    working = requests_mock.post(f"{REPLICAS[1]}/chat/completions", json=COMPLETION)
+    llm = ChatNVIDIA(
+        base_url=REPLICAS,
+        model=mock_model,
+        health_check_interval=0,
+        circuit_breaker=True,
+        retry_backoff=0,
+    )
+    breakers = llm._client.circuit_breakers
+    assert list(breakers) == REPLICAS
+    # a client without breakers on the same replicas leaves them to this one
+    plain = ChatNVIDIA(base_url=REPLICAS, model=mock_model, health_check_interval=0)
+    assert plain._client.balancer is llm._client.balancer
+    for _ in range(5):
+        breakers[REPLICAS[0]].record(0.1, failed=True)
+    for _ in range(3):
+        assert llm.invoke("Hi").content == "Hi"
+    assert failing.call_count == 0
+    assert working.call_count == 3
+    # with every replica open, requests fail fast
+    for _ in range(5):
+        breakers[REPLICAS[1]].record(0.1, failed=True)
+    with pytest.raises(NVIDIACircuitOpen, match="all 2 replicas"):
+        llm.invoke("Hi")
+    assert working.call_count == 3
+
+
+def test_shared_by_configuration(requests_mock: Mocker) -> None:
+    llms = [
+        ChatNVIDIA(api_key="BOGUS", model="mock-model", circuit_breaker=True)
+        for _ in range(2)
+    ]
+    strict = ChatNVIDIA(
+        api_key="BOGUS",
+        model="mock-model",
+        circuit_breaker=True,
+        circuit_cooldown=5,
+    )
+    a, b, c = (
+        llm._client.circuit_breakers[llm._client.base_url] for llm in [*llms, strict]
+    )
+    assert a is b
+    # another configuration does not change the first one's
+    assert c is not a
+    assert (a.cooldown, c.cooldown) == (30.0, 5)
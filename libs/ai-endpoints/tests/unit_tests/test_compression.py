@@ -0,0 +1,123 @@
+import gzip
+import json
+from typing import Any, Dict, List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._compression import negotiate
+from langchain_nvidia_ai_endpoints.errors import NVIDIAHTTPError
+
+from .conftest import Routes
+
+EMBEDDINGS_URL = "https://integrate.api.nvidia.com/v1/embeddings"
+SUCCESS: Dict[str, Any] = {"json": {"data": [{"embedding": [1.0], "index": 0}]}}
+LONG = "passage " * 4096
+
+
+@pytest.fixture
+def embedding(mock_model: str) -> NVIDIAEmbeddings:
+    with pytest.warns(UserWarning, match="type is unknown"):
+        return NVIDIAEmbeddings(
+            api_key="BOGUS", model=mock_model, compression="gzip", retry_backoff=0
+        )
+
+
+def _body(request: object) -> dict:
+    raw = request.body  # type: ignore[attr-defined]
+    if request.headers.get("Content-Encoding") == "gzip":  # type: ignore
+        raw = gzip.decompress(raw)
+    return json.loads(raw)
+
+
+def test_compress_large_bodies(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings
+) -> None:
+    mock = requests_mock.post(EMBEDDINGS_URL, **SUCCESS)
+    embedding.embed_query("short")
+    assert mock.last_request is not None
+    assert "Content-Encoding" not in mock.last_request.headers
+    embedding.embed_query(LONG)
+    request = mock.last_request
+    assert request is not None
+    assert request.headers["Content-Encoding"] == "gzip"
+    assert len(request.body) < len(LONG) / 10
+    assert _body(request)["input"] == [LONG]
+
+
+def test_415_negotiates(requests_mock: Mocker, embedding: NVIDIAEmbeddings) -> None:
+    mock = requests_mock.post(
+        EMBEDDINGS_URL,
+        [
+            {"status_code": 415, "headers": {"Accept-Encoding": "identity"}},
+            SUCCESS,
+            SUCCESS,
+        ],
+    )
+    embedding.embed_query(LONG)
+    embedding.embed_query(LONG)
+    encodings = [r.headers.get("Content-Encoding") for r in mock.request_history]
+    assert encodings == ["gzip", None, None]
+    assert _body(mock.last_request)["input"] == [LONG]
+
+
+def test_400_turns_compression_off(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings
+) -> None:
+    mock = requests_mock.post(
+        EMBEDDINGS_URL, [{"status_code": 400, "json": {}}, SUCCESS, SUCCESS]
+    )
+    embedding.embed_query(LONG)
+    embedding.embed_query(LONG)
+    encodings = [r.headers.get("Content-Encoding") for r in mock.request_history]
+    assert encodings == ["gzip", None, None]
+
+
+def test_genuine_400_keeps_compression(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings
+) -> None:
+    mock = requests_mock.post(EMBEDDINGS_URL, status_code=400, json={})
+    with pytest.raises(NVIDIAHTTPError):
+        embedding.embed_query(LONG)
+    assert mock.call_count == 2
+    assert embedding._client._content_encoding == "gzip"
+
+
+def test_negotiate() -> None:
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("br;q=1, gzip;q=0") is None
+    assert negotiate(None) is None
+
+
+def test_unknown_compression() -> None:
+    with pytest.raises(ValueError):
+        NVIDIAEmbeddings(api_key="BOGUS", compression="brotli")
+
+
+@pytest.fixture
+def encodings() -> List[str]:
+    return []
+
+
+@pytest.fixture
+def routes(encodings: List[str]) -> Routes:
+    async def embeddings(request: web.Request) -> web.Response:
+        encodings.append(request.headers.get("Content-Encoding", ""))
+        body = await request.json()  # decompressed by aiohttp
+        return web.json_response(
+            {"data": [{"embedding": [float(len(body["input"][0]))], "index": 0}]}
+        )
+
+    return {"POST /v1/embeddings": embeddings}
+
+
+async def test_async_compression(server: TestServer, encodings: List[str]) -> None:
+    embedding = NVIDIAEmbeddings(
+        base_url=str(server.make_url("/v1")), model="mock-model", compression="gzip"
+    )
+    assert await embedding.aembed_query(LONG) == [float(len(LONG))]
+    assert await embedding.aembed_query("short") == [5.0]
+    assert encodings == ["gzip", ""]
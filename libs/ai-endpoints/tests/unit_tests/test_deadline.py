@@ -0,0 +1,230 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Generator, Optional, cast
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from requests_mock import Mocker
+from requests_mock.request import _RequestObjectProxy
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints.errors import (
+    NVIDIADeadlineExceeded,
+    NVIDIARetryableError,
+)
+
+from .conftest import COMPLETION, Routes
+
+CHAT_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
+STATUS_URL = "https://api.nvcf.nvidia.com/v2/nvcf/pexec/status/REQ0"
+CHUNK = (
+    b'data: {"id":"ID0","object":"chat.completion.chunk","model":"bogus",'
+    b'"choices":[{"index":0,"delta":{"content":"Hello"},"finish_reason":null}]}\n\n'
+)
+
+
+class _StallingHandler(BaseHTTPRequestHandler):
+    """Answers nothing, or the first chunk of a stream, then hangs."""
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            self.wfile.write(CHUNK)
+            self.wfile.flush()
+        time.sleep(2)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stalling_url(requests_mock: Mocker) -> Generator[str, None, None]:
+    requests_mock.register_uri("POST", re.compile("http://127.0.0.1.*"), real_http=True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StallingHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _timeout(request: Optional[_RequestObjectProxy]) -> tuple:
+    """The (connect, read) timeout a mocked request was sent with."""
+    assert request is not None
+    return cast(tuple, request.timeout)
+
+
+def test_request_timeouts(requests_mock: Mocker) -> None:
+    mock = requests_mock.post(CHAT_URL, json=COMPLETION)
+    llm = ChatNVIDIA(api_key="BOGUS", model="mock-model")
+    llm.invoke("Hi")
+    assert _timeout(mock.last_request) == (10, 300)
+    llm = ChatNVIDIA(api_key="BOGUS", model="mock-model", read_timeout=None)
+    llm.invoke("Hi")
+    assert _timeout(mock.last_request) == (10, None)
+
+
+def test_deadline_bounds_timeouts(requests_mock: Mocker) -> None:
+    mock = requests_mock.post(CHAT_URL, json=COMPLETION)
+    llm = ChatNVIDIA(api_key="BOGUS", model="mock-model", deadline=5)
+    llm.invoke("Hi")
+    connect, read = _timeout(mock.last_request)
+    assert 4 < connect <= 5
+    assert 4 < read <= 5
+    # per call
+    llm.invoke("Hi", deadline=1)
+    assert 0 < _timeout(mock.last_request)[1] <= 1
+
+
+def test_no_retry_past_deadline(requests_mock: Mocker) -> None:
+    mock = requests_mock.post(
+        CHAT_URL, status_code=429, json={}, headers={"Retry-After": "10"}
+    )
+    llm = ChatNVIDIA(api_key="BOGUS", model="mock-model", deadline=1)
+    start = time.monotonic()
+    with pytest.raises(NVIDIARetryableError):
+        llm.invoke("Hi")
+    assert time.monotonic() - start < 1
+    assert mock.call_count == 1
+
+
+def test_hung_endpoint(stalling_url: str) -> None:
+    llm = ChatNVIDIA(base_url=f"{stalling_url}/v1", model="mock-model")
+    start = time.monotonic()
+    with pytest.raises(NVIDIADeadlineExceeded):
+        llm.invoke("Hi", deadline=0.3)
+    assert time.monotonic() - start < 1.5
+
+
+def test_stalled_stream(stalling_url: str) -> None:
+    llm = ChatNVIDIA(base_url=f"{stalling_url}/v1", model="mock-model", deadline=0.3)
+    chunks = []
+    start = time.monotonic()
+    with pytest.raises(NVIDIADeadlineExceeded):
+        for chunk in llm.stream("Hi"):
+            chunks.append(chunk.content)
+    assert chunks == ["Hello"]
+    assert time.monotonic() - start < 1.5
+
+
+def test_202_polling_deadline(requests_mock: Mocker, mock_model: str) -> None:
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/embeddings",
+        status_code=202,
+        headers={"NVCF-REQID": "REQ0"},
+    )
+    requests_mock.get(
+        "https://api.nvcf.nvidia.com/v2/nvcf/pexec/status/REQ0",
+        status_code=202,
+        headers={"NVCF-REQID": "REQ0"},
+    )
+    with pytest.warns(UserWarning, match="type is unknown"):
+        embedding = NVIDIAEmbeddings(api_key="BOGUS", model=mock_model, deadline=0.2)
+    assert embedding._client.timeout == 60
+    start = time.monotonic()
+    with pytest.raises(NVIDIADeadlineExceeded):
+        embedding.embed_query("foo")
+    assert time.monotonic() - start < 1
+
+
+def test_202_timeout_without_deadline(requests_mock: Mocker, mock_model: str) -> None:
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/embeddings",
+        status_code=202,
+        headers={"NVCF-REQID": "REQ0"},
+    )
+    requests_mock.get(STATUS_URL, status_code=202, headers={"NVCF-REQID": "REQ0"})
+    with pytest.warns(UserWarning, match="type is unknown"):
+        embedding = NVIDIAEmbeddings(api_key="BOGUS", model=mock_model)
+    embedding._client.timeout = 0.1
+    # the poller gives up, no deadline was exceeded
+    with pytest.raises(TimeoutError) as exc_info:
+        embedding.embed_query("foo")
+    assert not isinstance(exc_info.value, NVIDIADeadlineExceeded)
+
+
+async def accepted(request: web.Request) -> web.Response:
+    return web.Response(status=202, headers={"NVCF-REQID": "REQ0"})
+
+
+@pytest.mark.parametrize("routes", [{"POST /v1/embeddings": accepted}])
+async def test_a202_timeout_without_deadline(
+    server: TestServer, requests_mock: Mocker
+) -> None:
+    requests_mock.get(STATUS_URL, status_code=202, headers={"NVCF-REQID": "REQ0"})
+    embedding = NVIDIAEmbeddings(
+        base_url=str(server.make_url("/v1")), model="mock-model"
+    )
+    embedding._client.timeout = 0.1
+    with pytest.raises(TimeoutError) as exc_info:
+        await embedding.aembed_query("foo")
+    assert not isinstance(exc_info.value, NVIDIADeadlineExceeded)
+    await embedding.aclose()
+
+
+@pytest.mark.parametrize("routes", [{"POST /v1/embeddings": accepted}])
+async def test_a202_polling_deadline(server: TestServer, requests_mock: Mocker) -> None:
+    requests_mock.get(STATUS_URL, status_code=202, headers={"NVCF-REQID": "REQ0"})
+    embedding = NVIDIAEmbeddings(
+        base_url=str(server.make_url("/v1")), model="mock-model", deadline=0.2
+    )
+    with pytest.raises(NVIDIADeadlineExceeded):
+        await embedding.aembed_query("foo")
+    await embedding.aclose()
+
+
+async def stall(request: web.Request) -> web.StreamResponse:
+    body = await request.json()
+    if body.get("stream"):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(CHUNK)
+        await asyncio.sleep(2)
+        return response
+    await asyncio.sleep(2)
+    return web.json_response(COMPLETION)
+
+
+@pytest.fixture
+def routes() -> Routes:
+    return {"POST /v1/chat/completions": stall}
+
+
+async def test_ahung_endpoint(server: TestServer) -> None:
+    llm = ChatNVIDIA(base_url=str(server.make_url("/v1")), model="mock-model")
+    start = time.monotonic()
+    with pytest.raises(NVIDIADeadlineExceeded):
+        await llm.ainvoke("Hi", deadline=0.3)
+    assert time.monotonic() - start < 1.5
+    await llm._client.aclose()
+
+
+async def test_astalled_stream(server: TestServer) -> None:
+    llm = ChatNVIDIA(
+        base_url=str(server.make_url("/v1")), model="mock-model", deadline=0.3
+    )
+    chunks = []
+    with pytest.raises(NVIDIADeadlineExceeded):
+        async for chunk in llm.astream("Hi"):
+            chunks.append(chunk.content)
+    assert chunks == ["Hello"]
+    await llm._client.aclose()
+
+
+async def test_astalled_stream_read_timeout(server: TestServer) -> None:
+    llm = ChatNVIDIA(
+        base_url=str(server.make_url("/v1")), model="mock-model", read_timeout=0.2
+    )
+    with pytest.raises(asyncio.TimeoutError):
+        async for _ in llm.astream("Hi"):
+            pass
+    await llm._client.aclose()
@@ -0,0 +1,86 @@
+import warnings
+
+import pytest
+from requests_mock import Mocker
+from requests_mock.adapter import _Matcher
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
+
+BASE_URL = "http://localhost:8000/v1"
+
+
+@pytest.fixture
+def listing(requests_mock: Mocker) -> _Matcher:
+    model = {"id": "local-model", "root": "local-model"}
+    return requests_mock.get(f"{BASE_URL}/models", json={"data": [model]})
+
+
+@pytest.fixture
+def chat(requests_mock: Mocker) -> _Matcher:
+    return requests_mock.post(
+        f"{BASE_URL}/chat/completions",
+        json={
+            "id": "ID0",
+            "object": "chat.completion",
+            "created": 1234567890,
+            "model": "local-model",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "Hello"},
+                    "finish_reason": "stop",
+                }
+            ],
+        },
+    )
+
+
+def test_construction_does_not_list(public_class: type, listing: _Matcher) -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        client = public_class(base_url=BASE_URL, defer_model_discovery=True)
+    assert client.model is None
+    assert listing.call_count == 0
+
+
+def test_first_call_resolves(listing: _Matcher, chat: _Matcher) -> None:
+    llm = ChatNVIDIA(base_url=BASE_URL, defer_model_discovery=True)
+    with pytest.warns(UserWarning, match="Default model is set"):
+        assert llm.invoke("Hi").content == "Hello"
+    assert llm.model == "local-model"
+    assert chat.last_request is not None
+    assert chat.last_request.json()["model"] == "local-model"
+    llm.invoke("Hi")
+    assert listing.call_count == 1
+
+
+def test_first_call_checks_compatibility() -> None:
+    # a known embedding model, incompatible with ChatNVIDIA
+    llm = ChatNVIDIA(model="NV-Embed-QA", api_key="BOGUS", defer_model_discovery=True)
+    with pytest.raises(ValueError, match="is incompatible with client"):
+        llm.invoke("Hi")
+
+
+def test_first_call_follows_alias(requests_mock: Mocker) -> None:
+    # NV-Embed-QA is served from its own endpoint
+    requests_mock.post(
+        "https://ai.api.nvidia.com/v1/retrieval/nvidia/embeddings",
+        json={"data": [{"index": 0, "embedding": [0.0], "object": "embedding"}]},
+    )
+    embedder = NVIDIAEmbeddings(
+        model="ai-embed-qa-4", api_key="BOGUS", defer_model_discovery=True
+    )
+    assert embedder.model == "ai-embed-qa-4"
+    with pytest.warns(UserWarning, match="is deprecated"):
+        embedder.embed_query("Hi")
+    assert embedder.model == "NV-Embed-QA"
+    assert requests_mock.last_request is not None
+    assert requests_mock.last_request.json()["model"] == "NV-Embed-QA"
+
+
+async def test_aresolve_model(listing: _Matcher) -> None:
+    llm = ChatNVIDIA(base_url=BASE_URL, defer_model_discovery=True)
+    with pytest.warns(UserWarning, match="Default model is set"):
+        assert await llm._client.aresolve_model() == "local-model"
+    assert await llm._client.aresolve_model() == "local-model"
+    assert listing.call_count == 1
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Generator, List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from langchain_nvidia_ai_endpoints._deadline import Deadline
+from langchain_nvidia_ai_endpoints._hedging import Hedger, current_attempt
+from langchain_nvidia_ai_endpoints._retry import RetryBudget
+
+from .conftest import COMPLETION, Routes
+
+tag: ContextVar[str] = ContextVar("tag", default="")
+
+
+def _hedger(ratio: float = 1.0, latency: float = 0.05) -> Hedger:
+    hedger = Hedger(95, RetryBudget(ratio=ratio, min_per_second=0))
+    for _ in range(20):
+        hedger.record(latency)
+    # requests for the budget to take a ratio of
+    for _ in range(10):
+        hedger.budget.record_request()
+    return hedger
+
+
+def _slow_first(delays: List[float]) -> Callable[[], str]:
+    calls = iter(range(len(delays)))
+
+    def fn() -> str:
+        i = next(calls)
+        # waits like a request whose connection the other attempt can abort
+        aborted = threading.Event()
+        if (attempt := current_attempt()) is not None:
+            attempt.on_cancel(aborted.set)
+        if aborted.wait(delays[i]):
+            raise ConnectionError(f"attempt {i} aborted")
+        tag.set(f"attempt {i}")
+        return f"attempt {i}"
+
+    return fn
+
+
+def test_delay_learned() -> None:
+    hedger = Hedger(90, RetryBudget())
+    for i in range(19):
+        hedger.record(i / 100)
+    assert hedger.delay() is None
+    for i in range(19, 100):
+        hedger.record(i / 100)
+    assert hedger.delay() == 0.89
+
+
+def test_hedge_wins() -> None:
+    hedger = _hedger()
+    start = time.monotonic()
+    assert hedger.call(_slow_first([1.0, 0.0]), Deadline()) == "attempt 1"
+    assert time.monotonic() - start < 0.5
+    assert (hedger.hedges, hedger.wins) == (1, 1)
+    # the winner's context is the caller's
+    assert tag.get() == "attempt 1"
+
+
+def test_primary_wins() -> None:
+    hedger = _hedger()
+    discarded: List[str] = []
+    calls = iter(range(2))
+    threads: List[threading.Thread] = []
+    hedge_cancelled = threading.Event()
+
+    def fn() -> str:
+        threads.append(threading.current_thread())
+        if next(calls) == 0:
+            time.sleep(0.2)
+            return "primary"
+        attempt = current_attempt()
+        assert attempt is not None
+        attempt.on_cancel(hedge_cancelled.set)
+        # answers anyway, too late
+        time.sleep(0.3)
+        return "hedge"
+
+    assert hedger.call(fn, Deadline(), discarded.append) == "primary"
+    assert hedge_cancelled.is_set()
+    # the primary ran on the caller's thread, the hedge on the pool
+    assert threads[0] is threading.current_thread()
+    assert threads[1] is not threading.current_thread()
+    time.sleep(0.3)
+    assert discarded == ["hedge"]
+    assert (hedger.hedges, hedger.wins) == (1, 0)
+
+
+def test_fast_request_not_hedged() -> None:
+    hedger = _hedger()
+    assert hedger.call(_slow_first([0.0, 0.0]), Deadline()) == "attempt 0"
+    assert hedger.hedges == 0
+
+
+def test_budget_exhausted() -> None:
+    hedger = _hedger(ratio=0)
+    assert hedger.call(_slow_first([0.2, 0.0]), Deadline()) == "attempt 0"
+    assert hedger.hedges == 0
+
+
+def test_not_learned() -> None:
+    hedger = Hedger(95, RetryBudget(ratio=1.0, min_per_second=0))
+    assert hedger.call(_slow_first([0.1, 0.0]), Deadline()) == "attempt 0"
+    assert hedger.hedges == 0
+
+
+def test_primary_fails() -> None:
+    hedger = _hedger()
+    calls = iter(range(2))
+
+    def fn() -> str:
+        if next(calls) == 0:
+            time.sleep(0.2)
+            raise ConnectionError("reset")
+        time.sleep(0.3)
+        return "hedge"
+
+    assert hedger.call(fn, Deadline()) == "hedge"
+
+
+def test_both_fail() -> None:
+    hedger = _hedger()
+    calls = iter(range(2))
+
+    def fn() -> str:
+        i = next(calls)
+        time.sleep(0.2)
+        raise ValueError(f"attempt {i}")
+
+    with pytest.raises(ValueError, match="attempt 0"):
+        hedger.call(fn, Deadline())
+
+
+async def test_ahedge_cancels_loser() -> None:
+    hedger = _hedger()
+    cancelled = asyncio.Event()
+    calls = iter(range(2))
+
+    async def fn() -> str:
+        if next(calls) == 0:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "primary"
+        return "hedge"
+
+    assert await hedger.acall(fn, Deadline()) == "hedge"
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert (hedger.hedges, hedger.wins) == (1, 1)
+
+
+class _SlowFirstHandler(BaseHTTPRequestHandler):
+    """Answers the first request after a second, the others at once."""
+
+    requests = 0
+
+    def do_POST(self) -> None:
+        json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests += 1
+        if type(self).requests == 1:
+            time.sleep(1)
+        body = json.dumps(COMPLETION).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def slow_first_url(requests_mock: Mocker) -> Generator[str, None, None]:
+    requests_mock.register_uri("POST", re.compile("http://127.0.0.1.*"), real_http=True)
+    _SlowFirstHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowFirstHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_hedged_invoke(slow_first_url: str) -> None:
+    llm = ChatNVIDIA(
+        base_url=f"{slow_first_url}/v1",
+        model="mock-model",
+        hedge_percentile=95,
+        circuit_breaker=True,
+    )
+    hedger = llm._client.hedger
+    assert hedger is not None
+    plain = ChatNVIDIA(base_url=f"{slow_first_url}/v1", model="mock-model")
+    assert plain._client.hedger is None
+    for _ in range(20):
+        hedger.record(0.05)
+        hedger.budget.record_request()
+    start = time.monotonic()
+    assert llm.invoke("Hi").content == "Hi"
+    assert time.monotonic() - start < 0.8
+    assert _SlowFirstHandler.requests == 2
+    assert (hedger.hedges, hedger.wins) == (1, 1)
+    assert llm._client.last_response is not None
+    assert llm._client.last_response.status_code == 200
+    # the primary was aborted, which is no failure of the endpoint
+    breaker = llm._client.circuit_breakers[llm._client.base_url]
+    assert breaker.error_rate == 0
+
+
+requests_seen: List[web.Request] = []
+
+
+async def slow_first(request: web.Request) -> web.Response:
+    requests_seen.append(request)
+    if len(requests_seen) == 1:
+        await asyncio.sleep(1)
+    return web.json_response(COMPLETION)
+
+
+@pytest.fixture
+def routes() -> Routes:
+    requests_seen.clear()
+    return {"POST /v1/chat/completions": slow_first}
+
+
+async def test_ahedged_invoke(server: TestServer) -> None:
+    llm = ChatNVIDIA(
+        base_url=str(server.make_url("/v1")), model="mock-model", hedge_percentile=95
+    )
+    hedger = llm._client.hedger
+    assert hedger is not None
+    for _ in range(20):
+        hedger.record(0.05)
+        hedger.budget.record_request()
+    start = time.monotonic()
+    assert (await llm.ainvoke("Hi")).content == "Hi"
+    assert time.monotonic() - start < 0.8
+    assert len(requests_seen) == 2
+    assert (hedger.hedges, hedger.wins) == (1, 1)
+    await llm._client.aclose()
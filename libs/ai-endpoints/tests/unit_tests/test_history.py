@@ -0,0 +1,99 @@
+from typing import Any
+
+import pytest
+from requests_mock import Mocker
+from requests_mock.adapter import _Matcher
+
+from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._history import (
+    SUMMARY_MAX_BODY,
+    SUMMARY_MAX_CHARS,
+    SUMMARY_MAX_ITEMS,
+    summarize,
+)
+
+pytestmark = pytest.mark.filterwarnings("ignore:Found mock-model in available_models")
+
+
+@pytest.fixture(autouse=True)
+def embeddings(requests_mock: Mocker) -> _Matcher:
+    # a body well over SUMMARY_MAX_BODY
+    data = [{"index": 0, "embedding": [0.123456789] * 4096}]
+    return requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/embeddings", json={"data": data}
+    )
+
+
+def embedder(mock_model: str, **kwargs: Any) -> NVIDIAEmbeddings:
+    return NVIDIAEmbeddings(api_key="BOGUS", model=mock_model, **kwargs)
+
+
+def test_summary_by_default(mock_model: str) -> None:
+    client = embedder(mock_model)
+    text = "x" * (SUMMARY_MAX_CHARS * 4)
+    assert len(client.embed_query(text)) == 4096
+    inputs = client._client.last_inputs
+    assert inputs is not None
+    assert inputs["json"]["input"][0].endswith(f"... ({len(text)} chars)")
+    assert len(inputs["json"]["input"][0]) < SUMMARY_MAX_CHARS + 32
+    response = client._client.last_response
+    assert response is not None
+    assert response.status_code == 200
+    assert len(response.content) == SUMMARY_MAX_BODY
+
+
+def test_summary_keeps_error_bodies(requests_mock: Mocker, mock_model: str) -> None:
+    detail = "body -> max_tokens: Input should be greater than or equal to 1"
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/embeddings",
+        status_code=422,
+        json={"detail": detail},
+    )
+    client = embedder(mock_model)
+    with pytest.raises(Exception):
+        client.embed_query("foo")
+    response = client._client.last_response
+    assert response is not None
+    assert response.status_code == 422
+    assert detail in str(response.content)
+
+
+def test_full(mock_model: str) -> None:
+    client = embedder(mock_model, call_retention="full")
+    text = "x" * (SUMMARY_MAX_CHARS * 4)
+    client.embed_query(text)
+    inputs = client._client.last_inputs
+    assert inputs is not None
+    assert inputs["json"]["input"] == [text]
+    response = client._client.last_response
+    assert response is not None
+    assert len(response.json()["data"][0]["embedding"]) == 4096
+
+
+def test_off(mock_model: str) -> None:
+    client = embedder(mock_model, call_retention="off")
+    client.embed_query("foo")
+    assert client._client.last_inputs is None
+    assert client._client.last_response is None
+    assert client._client.call_history == []
+
+
+def test_ring_buffer(mock_model: str) -> None:
+    client = embedder(mock_model, call_history_size=3)
+    for i in range(5):
+        client.embed_query(f"text {i}")
+    history = client._client.call_history
+    assert [inputs["json"]["input"] for inputs, _ in history] == [
+        ["text 2"],
+        ["text 3"],
+        ["text 4"],
+    ]
+    assert all(response is not None for _, response in history)
+
+
+def test_summarize() -> None:
+    value = {"a": list(range(SUMMARY_MAX_ITEMS + 10)), "b": ("x", 1, None)}
+    summary = summarize(value)
+    assert summary["a"][:SUMMARY_MAX_ITEMS] == list(range(SUMMARY_MAX_ITEMS))
+    assert summary["a"][-1] == f"... ({SUMMARY_MAX_ITEMS + 10} items)"
+    assert summary["b"] == ["x", 1, None]
@@ -1,3 +1,9 @@
+import subprocess
+import sys
+
+import pytest
+
+import langchain_nvidia_ai_endpoints
 from langchain_nvidia_ai_endpoints import __all__
 
 EXPECTED_ALL = [
@@ -6,8 +12,40 @@ EXPECTED_ALL = [
     "NVIDIARerank",
     "register_model",
     "Model",
+    "invalidate_available_models",
 ]
 
 
 def test_all_imports() -> None:
     assert sorted(EXPECTED_ALL) == sorted(__all__)
+
+
+@pytest.mark.parametrize("name", EXPECTED_ALL)
+def test_lazy_attribute(name: str) -> None:
+    value = getattr(langchain_nvidia_ai_endpoints, name)
+    assert value.__name__ == name
+    assert name in dir(langchain_nvidia_ai_endpoints)
+
+
+def test_unknown_attribute() -> None:
+    with pytest.raises(AttributeError):
+        langchain_nvidia_ai_endpoints.Unknown  # type: ignore[attr-defined]
+
+
+@pytest.mark.parametrize(
+    "name, unexpected",
+    [
+        ("NVIDIAEmbeddings", ["langchain_nvidia_ai_endpoints.chat_models"]),
+        ("NVIDIARerank", ["langchain_nvidia_ai_endpoints.chat_models"]),
+        ("ChatNVIDIA", ["langchain_nvidia_ai_endpoints._vlm"]),
+    ],
+)
+def test_import_is_lazy(name: str, unexpected: list) -> None:
+    # heavy dependencies are only imported once a feature needs them
+    unexpected += ["aiohttp", "PIL", "langchain_core.tools"]
+    code = (
+        f"import sys; from langchain_nvidia_ai_endpoints import {name}; "
+        f"print([m for m in {unexpected!r} if m in sys.modules])"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    assert output.strip() == "[]"
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._jsoncodec import _INSTALLED, get_codec
+
+CODECS = [name for name, installed in _INSTALLED.items() if installed]
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_roundtrip(name: str) -> None:
+    codec = get_codec(name)
+    assert codec.name == name
+    doc = {"input": ["héllo", "world"], "n": 1, "f": 0.5, "x": None, "b": True}
+    encoded = codec.dumps(doc)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == doc
+    assert codec.loads(encoded) == doc
+    assert codec.loads(encoded.decode()) == doc
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_decode_error(name: str) -> None:
+    with pytest.raises(json.JSONDecodeError):
+        get_codec(name).loads(b"{not json")
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_encode_fallback(name: str) -> None:
+    doc = {"big": 2**80}
+    assert json.loads(get_codec(name).dumps(doc)) == doc
+
+
+def test_codec_names() -> None:
+    assert get_codec("auto").name == CODECS[0]
+    assert get_codec("json").name == "json"
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_body_parsed_once(requests_mock: Mocker, mock_model: str, name: str) -> None:
+    mock = requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/embeddings",
+        json={"data": [{"embedding": [1.0, 2.0], "index": 0}]},
+    )
+    with pytest.warns(UserWarning, match="type is unknown"):
+        embedding = NVIDIAEmbeddings(api_key="BOGUS", model=mock_model, json_codec=name)
+    assert embedding.embed_query("foo") == [1.0, 2.0]
+    request = mock.last_request
+    assert request is not None
+    assert request.headers["Content-Type"] == "application/json"
+    assert request.json()["input"] == ["foo"]
+    response = embedding._client.last_response
+    assert response is not None
+    assert "_decoded" in response.__dict__  # decoded by embed_query
+    assert embedding._client.decode(response) is embedding._client.decode(response)
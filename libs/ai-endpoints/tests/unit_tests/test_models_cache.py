@@ -0,0 +1,91 @@
+import time
+from pathlib import Path
+
+import pytest
+from requests_mock import Mocker
+from requests_mock.adapter import _Matcher
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, invalidate_available_models
+from langchain_nvidia_ai_endpoints._models_cache import get_models_cache
+
+BASE_URL = "http://localhost:8000/v1"
+
+pytestmark = pytest.mark.filterwarnings("ignore:Default model is set")
+
+
+@pytest.fixture
+def listing(requests_mock: Mocker) -> _Matcher:
+    model = {"id": "local-model", "root": "local-model"}
+    return requests_mock.get(f"{BASE_URL}/models", json={"data": [model]})
+
+
+def test_listing_shared(listing: _Matcher) -> None:
+    for _ in range(5):
+        llm = ChatNVIDIA(base_url=BASE_URL)
+        assert llm.model == "local-model"
+        assert [m.base_model for m in llm.available_models] == ["local-model"]
+    assert listing.call_count == 1
+    ChatNVIDIA(base_url=BASE_URL, api_key="OTHER")
+    assert listing.call_count == 2
+
+
+def test_ttl(listing: _Matcher) -> None:
+    ChatNVIDIA(base_url=BASE_URL, models_cache_ttl=0.05)
+    ChatNVIDIA(base_url=BASE_URL, models_cache_ttl=0.05)
+    assert listing.call_count == 1
+    time.sleep(0.06)
+    ChatNVIDIA(base_url=BASE_URL, models_cache_ttl=0.05)
+    assert listing.call_count == 2
+    ChatNVIDIA(base_url=BASE_URL, models_cache_ttl=0)
+    ChatNVIDIA(base_url=BASE_URL, models_cache_ttl=0)
+    assert listing.call_count == 4
+
+
+def test_invalidate(listing: _Matcher) -> None:
+    ChatNVIDIA(base_url=BASE_URL)
+    invalidate_available_models("http://localhost:8001")
+    ChatNVIDIA(base_url=BASE_URL)
+    assert listing.call_count == 1
+    invalidate_available_models("http://localhost:8000/")
+    ChatNVIDIA(base_url=BASE_URL)
+    assert listing.call_count == 2
+    invalidate_available_models()
+    ChatNVIDIA(base_url=BASE_URL)
+    assert listing.call_count == 3
+
+
+def test_invalidate_existing_clients(listing: _Matcher, requests_mock: Mocker) -> None:
+    llm = ChatNVIDIA(base_url=BASE_URL)
+    assert [m.id for m in llm.available_models] == ["local-model"]
+    requests_mock.get(
+        f"{BASE_URL}/models", json={"data": [{"id": "local-model"}, {"id": "new"}]}
+    )
+    assert [m.id for m in llm.available_models] == ["local-model"]
+    invalidate_available_models(BASE_URL)
+    assert [m.id for m in llm.available_models] == ["local-model", "new"]
+
+
+def test_snapshot(
+    listing: _Matcher, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "models.json"
+    ChatNVIDIA(base_url=BASE_URL, models_cache_path=str(path))
+    assert path.exists()
+    assert "local-model" in path.read_text()
+    get_models_cache().clear()  # a new process
+    monkeypatch.setenv("NVIDIA_MODELS_CACHE", str(path))
+    llm = ChatNVIDIA(base_url=BASE_URL)
+    assert llm.model == "local-model"
+    assert listing.call_count == 1
+    invalidate_available_models(BASE_URL)
+    get_models_cache().clear()
+    ChatNVIDIA(base_url=BASE_URL)
+    assert listing.call_count == 2
+
+
+def test_corrupt_snapshot(listing: _Matcher, tmp_path: Path) -> None:
+    path = tmp_path / "models.json"
+    path.write_text("{not json")
+    ChatNVIDIA(base_url=BASE_URL, models_cache_path=str(path))
+    assert listing.call_count == 1
+    assert "local-model" in path.read_text()
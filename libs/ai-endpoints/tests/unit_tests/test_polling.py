@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._polling import get_poller
+
+STATUS_URL = "https://api.nvcf.nvidia.com/v2/nvcf/pexec/status/{request_id}"
+
+
+@pytest.fixture
+def embedding(mock_model: str) -> NVIDIAEmbeddings:
+    with pytest.warns(UserWarning, match="type is unknown"):
+        return NVIDIAEmbeddings(api_key="BOGUS", model=mock_model)
+
+
+@pytest.fixture(autouse=True)
+def mock_accepted(requests_mock: Mocker) -> None:
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/embeddings",
+        status_code=202,
+        headers={"NVCF-REQID": "REQ0"},
+    )
+
+
+def embedding_result(value: float) -> dict:
+    return {"json": {"data": [{"embedding": [value], "index": 0}]}}
+
+
+def test_202_polling(requests_mock: Mocker, embedding: NVIDIAEmbeddings) -> None:
+    status = requests_mock.get(
+        STATUS_URL.format(request_id="REQ0"),
+        [
+            {"status_code": 202, "headers": {"NVCF-REQID": "REQ1"}},
+            {"status_code": 500, "text": "wrong request id"},
+        ],
+    )
+    requests_mock.get(
+        STATUS_URL.format(request_id="REQ1"),
+        [
+            {"status_code": 202, "headers": {"Retry-After": "0"}},
+            embedding_result(1.0),
+        ],
+    )
+    assert embedding.embed_query("foo") == [1.0]
+    # the polling requests are authorized
+    assert status.last_request is not None
+    assert status.last_request.headers["Authorization"] == "Bearer BOGUS"
+
+
+def test_202_timeout(requests_mock: Mocker, embedding: NVIDIAEmbeddings) -> None:
+    requests_mock.get(
+        STATUS_URL.format(request_id="REQ0"),
+        status_code=202,
+        headers={"NVCF-REQID": "REQ0"},
+    )
+    embedding._client.timeout = 0.1
+    with pytest.raises(TimeoutError):
+        embedding.embed_query("foo")
+
+
+def test_202_shared_poller(requests_mock: Mocker, embedding: NVIDIAEmbeddings) -> None:
+    requests_mock.get(
+        STATUS_URL.format(request_id="REQ0"),
+        [{"status_code": 202, "headers": {"NVCF-REQID": "REQ0"}}] * 16
+        + [embedding_result(2.0)],
+    )
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(embedding.embed_query, ["a"] * 4))
+    assert results == [[2.0]] * 4
+    assert get_poller().outstanding == 0
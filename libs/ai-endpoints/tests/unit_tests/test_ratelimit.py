@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from langchain_nvidia_ai_endpoints._ratelimit import RateLimiter
+
+
+def test_rpm_admits_burst_then_paces() -> None:
+    limiter = RateLimiter(rpm=6000)  # 100 per second after the burst
+    start = time.monotonic()
+    for _ in range(1000):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.5
+    limiter._rpm.tokens = 0  # type: ignore[union-attr]
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+def test_tpm_debt_delays_admission() -> None:
+    limiter = RateLimiter(tpm=60000)  # 1000 tokens per second
+    limiter.acquire()
+    limiter.charge(60000 + 100)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+async def test_async_acquire() -> None:
+    limiter = RateLimiter(rpm=6000)
+    limiter.charge(1)  # no tpm limit, no effect
+    limiter._rpm.tokens = 0  # type: ignore[union-attr]
+    start = time.monotonic()
+    await limiter.aacquire()
+    assert time.monotonic() - start >= 0.009
+
+
+def test_acquire_timeout() -> None:
+    limiter = RateLimiter(rpm=60)  # one per second after the burst
+    limiter._rpm.tokens = 0  # type: ignore[union-attr]
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0.1)
+    # gave up without waiting, and gave its reservation back
+    assert time.monotonic() - start < 0.05
+    assert limiter._rpm.tokens == pytest.approx(0, abs=0.01)  # type: ignore[union-attr]
+    assert limiter.queue_depth == 0
+
+
+def test_queue_depth() -> None:
+    limiter = RateLimiter(rpm=600)
+    limiter._rpm.tokens = 0  # type: ignore[union-attr]
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert limiter.queue_depth == 3
+    for thread in threads:
+        thread.join()
+    assert limiter.queue_depth == 0
+
+
+def test_limiter_shared_by_key() -> None:
+    a = ChatNVIDIA(api_key="KEY-A", rpm_limit=10)
+    b = ChatNVIDIA(api_key="KEY-A", rpm_limit=10, tpm_limit=1000)
+    c = ChatNVIDIA(api_key="KEY-B", rpm_limit=10)
+    assert a._client.rate_limiter is b._client.rate_limiter
+    assert a._client.rate_limiter is not c._client.rate_limiter
+    assert ChatNVIDIA(api_key="KEY-A")._client.rate_limiter is None
+
+
+def test_charge_token_usage(requests_mock: Mocker) -> None:
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/chat/completions",
+        json={
+            "id": "ID0",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "Hi"},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 20, "completion_tokens": 22, "total_tokens": 42},
+        },
+    )
+    llm = ChatNVIDIA(api_key="KEY-C", tpm_limit=1000)
+    limiter = llm._client.rate_limiter
+    assert limiter is not None
+    llm.invoke("Hello")
+    assert limiter._tpm.tokens == pytest.approx(1000 - 42, abs=1)  # type: ignore
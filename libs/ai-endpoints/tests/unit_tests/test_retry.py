@@ -0,0 +1,106 @@
+import pytest
+import requests
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._retry import RetryBudget, backoff_delay
+from langchain_nvidia_ai_endpoints.errors import NVIDIAHTTPError, NVIDIARetryableError
+
+EMBEDDINGS_URL = "https://integrate.api.nvidia.com/v1/embeddings"
+SUCCESS = {"json": {"data": [{"embedding": [1.0], "index": 0}]}}
+
+
+@pytest.fixture
+def embedding(mock_model: str) -> NVIDIAEmbeddings:
+    with pytest.warns(UserWarning, match="type is unknown"):
+        return NVIDIAEmbeddings(api_key="BOGUS", model=mock_model, retry_backoff=0)
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 502, 503, 504])
+def test_retry_transient(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings, status_code: int
+) -> None:
+    mock = requests_mock.post(
+        EMBEDDINGS_URL, [{"status_code": status_code, "json": {}}, SUCCESS]
+    )
+    assert embedding.embed_query("foo") == [1.0]
+    assert mock.call_count == 2
+
+
+def test_retry_connection_error(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings
+) -> None:
+    mock = requests_mock.post(
+        EMBEDDINGS_URL, [{"exc": requests.ConnectionError}, SUCCESS]
+    )
+    assert embedding.embed_query("foo") == [1.0]
+    assert mock.call_count == 2
+
+
+def test_no_retry_client_error(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings
+) -> None:
+    mock = requests_mock.post(EMBEDDINGS_URL, status_code=400, json={})
+    with pytest.raises(NVIDIAHTTPError) as exc_info:
+        embedding.embed_query("foo")
+    assert not isinstance(exc_info.value, NVIDIARetryableError)
+    assert exc_info.value.status_code == 400
+    assert mock.call_count == 1
+
+
+def test_retry_exhausted(requests_mock: Mocker, embedding: NVIDIAEmbeddings) -> None:
+    mock = requests_mock.post(
+        EMBEDDINGS_URL, status_code=429, json={}, headers={"Retry-After": "0"}
+    )
+    embedding._client.max_retries = 3
+    with pytest.raises(NVIDIARetryableError) as exc_info:
+        embedding.embed_query("foo")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.retry_after == 0
+    assert mock.call_count == 4
+
+
+def test_retry_after_beyond_max_backoff(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings
+) -> None:
+    mock = requests_mock.post(
+        EMBEDDINGS_URL, status_code=429, json={}, headers={"Retry-After": "3600"}
+    )
+    with pytest.raises(NVIDIARetryableError) as exc_info:
+        embedding.embed_query("foo")
+    # given up at once, the caller learns how long to wait
+    assert exc_info.value.retry_after == 3600
+    assert mock.call_count == 1
+
+
+def test_retry_budget(requests_mock: Mocker, embedding: NVIDIAEmbeddings) -> None:
+    mock = requests_mock.post(EMBEDDINGS_URL, status_code=503, json={})
+    embedding._client._retry_budget = RetryBudget(ratio=0.5, min_per_second=0)
+    for _ in range(4):
+        with pytest.raises(NVIDIARetryableError):
+            embedding.embed_query("foo")
+    # 4 requests allow for 2 retries in total, not 2 per request
+    assert mock.call_count == 4 + 2
+
+
+def test_retry_stream(requests_mock: Mocker) -> None:
+    chunk = (
+        'data: {"id":"ID0","object":"chat.completion.chunk","choices":'
+        '[{"index":0,"delta":{"content":"Hello"},"finish_reason":"stop"}]}'
+    )
+    mock = requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/chat/completions",
+        [
+            {"status_code": 503, "json": {}},
+            {"text": f"{chunk}\n\ndata: [DONE]\n\n"},
+        ],
+    )
+    llm = ChatNVIDIA(api_key="BOGUS", retry_backoff=0)
+    assert "".join(str(chunk.content) for chunk in llm.stream("Hi")) == "Hello"
+    assert mock.call_count == 2
+
+
+def test_backoff_delay() -> None:
+    assert backoff_delay(0, base=1, cap=10, retry_after=3) == 3
+    for attempt in range(8):
+        assert 0 <= backoff_delay(attempt, base=1, cap=10) <= min(10, 2**attempt)
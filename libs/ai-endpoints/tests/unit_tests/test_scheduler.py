@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from typing import Any, Generator, List, cast
+
+import pytest
+from langchain_core.messages import BaseMessageChunk
+from langchain_core.runnables import RunnableLambda
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from langchain_nvidia_ai_endpoints._scheduler import Priority, Scheduler
+
+from .conftest import COMPLETION
+
+CHAT_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
+
+
+def _wait_queued(scheduler: Scheduler, n: int) -> None:
+    deadline = time.monotonic() + 2
+    while sum(scheduler.queue_depth.values()) < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_bounded_concurrency() -> None:
+    scheduler = Scheduler(limit=2)
+    peak = 0
+    lock = threading.Lock()
+
+    def work() -> None:
+        nonlocal peak
+        scheduler.acquire()
+        with lock:
+            peak = max(peak, scheduler.in_flight)
+        time.sleep(0.01)
+        scheduler.release()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 2
+    assert scheduler.in_flight == 0
+
+
+def test_priority_and_round_robin() -> None:
+    scheduler = Scheduler(limit=1)
+    scheduler.acquire()  # hold the only slot while the queue fills
+    order: List[str] = []
+
+    def work(name: str, priority: str, flow: str) -> None:
+        scheduler.acquire(priority, flow)  # type: ignore[arg-type]
+        order.append(name)
+        scheduler.release()
+
+    jobs = [
+        ("batch", "batch", "a"),
+        ("a1", "default", "a"),
+        ("a2", "default", "a"),
+        ("b1", "default", "b"),
+        ("interactive", "interactive", "c"),
+    ]
+    threads = []
+    for i, job in enumerate(jobs):
+        threads.append(threading.Thread(target=work, args=job))
+        threads[-1].start()
+        _wait_queued(scheduler, i + 1)
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "a1", "b1", "a2", "batch"]
+
+
+async def test_async_cancel_withdraws() -> None:
+    scheduler = Scheduler(limit=1)
+    await scheduler.aacquire()
+    task = asyncio.create_task(scheduler.aacquire("batch"))
+    await asyncio.sleep(0.01)
+    assert scheduler.queue_depth["batch"] == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert scheduler.queue_depth["batch"] == 0
+    scheduler.release()
+    assert scheduler.in_flight == 0
+    await asyncio.wait_for(scheduler.aacquire(), 1)
+
+
+def test_acquire_timeout() -> None:
+    scheduler = Scheduler(limit=1)
+    scheduler.acquire()
+    with pytest.raises(TimeoutError):
+        scheduler.acquire(timeout=0.01)
+    assert scheduler.queue_depth["default"] == 0
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+async def test_async_acquire_timeout() -> None:
+    scheduler = Scheduler(limit=1)
+    scheduler.acquire()
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.aacquire(timeout=0.01)
+    assert scheduler.queue_depth["default"] == 0
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+def test_stream_holds_slot(requests_mock: Mocker) -> None:
+    chunk = (
+        'data: {"id":"ID0","object":"chat.completion.chunk","choices":'
+        '[{"index":0,"delta":{"content":"Hello"},"finish_reason":"stop"}]}'
+    )
+    requests_mock.post(CHAT_URL, text=f"{chunk}\n\ndata: [DONE]\n\n")
+    llm = ChatNVIDIA(api_key="BOGUS", max_concurrency=1)
+    scheduler = llm._client.scheduler
+    assert scheduler is not None
+    # stream() is typed as an Iterator but returns a generator
+    stream = cast(
+        Generator[BaseMessageChunk, None, None],
+        llm.stream("Hi", priority="interactive"),
+    )
+    next(stream)
+    assert scheduler.in_flight == 1
+    stream.close()
+    assert scheduler.in_flight == 0
+    assert "".join(str(c.content) for c in llm.stream("Hi")) == "Hello"
+    assert scheduler.in_flight == 0
+
+
+def test_scheduler_shared_by_endpoint() -> None:
+    a = ChatNVIDIA(api_key="BOGUS", max_concurrency=4)
+    b = ChatNVIDIA(api_key="OTHER", max_concurrency=4)
+    assert a._client.scheduler is b._client.scheduler
+    assert ChatNVIDIA(api_key="BOGUS")._client.scheduler is None
+    # another configuration does not change the shared one
+    c = ChatNVIDIA(api_key="BOGUS", max_concurrency=2, adaptive_concurrency=True)
+    assert c._client.scheduler is not a._client.scheduler
+    assert a._client.scheduler is not None and a._client.scheduler.limit == 4
+    assert a._client.scheduler.adaptive is None
+
+
+def test_priority_from_config(
+    requests_mock: Mocker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    requests_mock.post(CHAT_URL, json=COMPLETION)
+    priorities: List[str] = []
+    acquire = Scheduler.acquire
+
+    def spy(self: Scheduler, priority: Priority = "default", **kwargs: Any) -> None:
+        priorities.append(priority)
+        acquire(self, priority, **kwargs)
+
+    monkeypatch.setattr(Scheduler, "acquire", spy)
+    llm = ChatNVIDIA(api_key="BOGUS", max_concurrency=1, priority="interactive")
+    llm.invoke("Hi")
+    # inherited by the calls of a chain
+    chain = RunnableLambda(lambda text: text) | llm
+    chain.invoke("Hi", config={"metadata": {"priority": "batch"}})
+    # the keyword wins
+    llm.invoke("Hi", priority="default", config={"metadata": {"priority": "batch"}})
+    assert priorities == ["interactive", "batch", "default"]
+
+
+def test_invalid_priority() -> None:
+    llm = ChatNVIDIA(api_key="BOGUS", max_concurrency=1)
+    with pytest.raises(ValueError, match="priority"):
+        llm.invoke("Hi", priority="urgent")
@@ -0,0 +1,147 @@
+import asyncio
+import gc
+import threading
+import time
+
+import aiohttp
+import pytest
+import requests
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
+
+
+@pytest.fixture(autouse=True)
+def mock_v1_embeddings(requests_mock: Mocker) -> None:
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/embeddings",
+        json={
+            "data": [{"embedding": [0.1, 0.2], "index": 0}],
+            "usage": {"prompt_tokens": 1, "total_tokens": 1},
+        },
+    )
+
+
+@pytest.fixture
+def embedding(mock_model: str) -> NVIDIAEmbeddings:
+    with pytest.warns(UserWarning, match="type is unknown"):
+        return NVIDIAEmbeddings(api_key="BOGUS", model=mock_model)
+
+
+def test_session_reused(embedding: NVIDIAEmbeddings) -> None:
+    client = embedding
+    client.embed_query("foo")
+    session = client._client._get_session()
+    client.embed_query("bar")
+    assert client._client._get_session() is session
+
+
+def test_session_authorization(
+    requests_mock: Mocker, embedding: NVIDIAEmbeddings
+) -> None:
+    client = embedding
+    client.embed_query("foo")
+    session = client._client._get_session()
+    assert session.headers["Authorization"] == "Bearer BOGUS"
+    assert requests_mock.last_request is not None
+    assert requests_mock.last_request.headers["Authorization"] == "Bearer BOGUS"
+    # the debugging copy of the inputs must not leak the key
+    inputs = client._client.last_inputs
+    assert inputs is not None
+    assert inputs["headers"]["Authorization"] != "Bearer BOGUS"
+
+
+def test_session_pool_options() -> None:
+    client = ChatNVIDIA(
+        api_key="BOGUS", pool_connections=2, pool_maxsize=32, keep_alive=False
+    )
+    session = client._client._get_session()
+    adapter = session.get_adapter("https://integrate.api.nvidia.com")
+    assert isinstance(adapter, requests.adapters.HTTPAdapter)
+    assert adapter._pool_connections == 2  # type: ignore[attr-defined]
+    assert adapter._pool_maxsize == 32  # type: ignore[attr-defined]
+    assert session.headers["Connection"] == "close"
+
+
+def test_session_close() -> None:
+    client = NVIDIAEmbeddings(api_key="CLOSE")
+    session = client._client._get_session()
+    client._client.close()
+    assert client._client._get_session() is not session
+
+
+def test_session_shared() -> None:
+    a = ChatNVIDIA(api_key="SHARED")
+    b = NVIDIAEmbeddings(api_key="SHARED")
+    assert a._client._get_session() is b._client._get_session()
+    other = ChatNVIDIA(api_key="OTHER")
+    assert other._client._get_session() is not a._client._get_session()
+    private = ChatNVIDIA(api_key="SHARED", shared_transport=False)
+    assert private._client._get_session() is not a._client._get_session()
+    pooled = ChatNVIDIA(api_key="SHARED", pool_maxsize=32)
+    assert pooled._client._get_session() is not a._client._get_session()
+
+
+def test_transport_reference_counting() -> None:
+    a = ChatNVIDIA(api_key="REFS")
+    b = ChatNVIDIA(api_key="REFS")
+    transport = a._client._get_transport()
+    assert b._client._get_transport() is transport
+    assert transport.refs == 2
+    a._client.close()
+    assert not transport.closed
+    assert b._client._get_transport() is transport
+    b._client.close()
+    assert transport.closed
+    assert a._client._get_transport() is not transport
+
+
+def test_transport_released_on_collection() -> None:
+    client = ChatNVIDIA(api_key="COLLECTED")
+    transport = client._client._get_transport()
+    del client
+    gc.collect()
+    assert transport.closed
+
+
+def test_close_on_session_loop() -> None:
+    # a client used from an event loop in another thread, closed from this one
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    client = ChatNVIDIA(api_key="OTHER-LOOP")._client
+
+    async def session() -> aiohttp.ClientSession:
+        return client._get_aio_session()
+
+    aio_session = asyncio.run_coroutine_threadsafe(session(), loop).result(1)
+    client.close()
+    for _ in range(100):
+        if aio_session.closed:
+            break
+        time.sleep(0.01)
+    assert aio_session.closed
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(1)
+    loop.close()
+
+
+def test_closed_loop_session_dropped() -> None:
+    client = ChatNVIDIA(api_key="CLOSED-LOOP")._client
+
+    async def session() -> aiohttp.ClientSession:
+        return client._get_aio_session()
+
+    def run() -> aiohttp.ClientSession:
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(session())
+        finally:
+            loop.close()
+
+    first, second = run(), run()
+    assert second is not first
+    # the session of the first loop, closed by now, is let go of
+    assert first.closed
+    assert list(client._get_transport()._aio_sessions.values()) == [second]
+    client.close()
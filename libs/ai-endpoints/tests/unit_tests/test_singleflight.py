@@ -0,0 +1,298 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Generator, List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from langchain_core.messages import BaseMessage
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
+from langchain_nvidia_ai_endpoints._deadline import Deadline
+from langchain_nvidia_ai_endpoints._singleflight import (
+    Singleflight,
+    coalescible,
+    flight_key,
+)
+from langchain_nvidia_ai_endpoints.callbacks import (
+    UsageCallbackHandler,
+    get_usage_callback,
+)
+from langchain_nvidia_ai_endpoints.errors import NVIDIADeadlineExceeded
+
+from .conftest import COMPLETION, Routes
+
+EMBEDDING = {
+    "data": [{"index": 0, "embedding": [0.1, 0.2]}],
+    "usage": {"prompt_tokens": 100, "total_tokens": 100},
+}
+
+
+def test_coalescible() -> None:
+    assert coalescible({"input": ["foo"], "model": "m"})
+    assert coalescible({"query": {"text": "foo"}, "passages": []})
+    chat = {"messages": [{"role": "user", "content": "Hi"}]}
+    assert not coalescible(chat)
+    assert not coalescible({**chat, "temperature": 0.5})
+    assert coalescible({**chat, "temperature": 0})
+    assert coalescible({**chat, "temperature": 0.5, "seed": 42})
+
+
+def test_flight_key() -> None:
+    key = flight_key("http://a/v1/embeddings", "key", {"input": ["foo"], "model": "m"})
+    assert key == flight_key(
+        "http://a/v1/embeddings", "key", {"model": "m", "input": ["foo"]}
+    )
+    assert key != flight_key(
+        "http://a/v1/embeddings", "other", {"input": ["foo"], "model": "m"}
+    )
+    assert key != flight_key(
+        "http://a/v1/embeddings", "key", {"input": ["bar"], "model": "m"}
+    )
+
+
+def test_call_shared() -> None:
+    flights = Singleflight()
+    calls: List[int] = []
+
+    def fn() -> str:
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    with ThreadPoolExecutor(5) as pool:
+        results = list(pool.map(lambda _: flights.call("key", fn), range(5)))
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 4
+    assert flights.coalesced == 4
+    # once done, the next call is a new one
+    assert flights.call("key", fn) == ("answer", False)
+    assert len(calls) == 2
+
+
+def test_error_shared() -> None:
+    flights = Singleflight()
+
+    def fn() -> str:
+        time.sleep(0.2)
+        raise ValueError("failed")
+
+    def call() -> str:
+        try:
+            return flights.call("key", fn)[0]
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(3) as pool:
+        assert list(pool.map(lambda _: call(), range(3))) == ["failed"] * 3
+    assert flights.coalesced == 2
+
+
+def test_waiter_deadline() -> None:
+    flights = Singleflight()
+    leader = threading.Thread(
+        target=flights.call, args=("key", lambda: time.sleep(0.3))
+    )
+    leader.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    with pytest.raises(NVIDIADeadlineExceeded):
+        flights.call("key", lambda: None, Deadline(0.05))
+    assert time.monotonic() - start < 0.2
+    leader.join()
+
+
+async def test_acall_shared() -> None:
+    flights = Singleflight()
+    calls: List[int] = []
+
+    async def fn() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    results = await asyncio.gather(*(flights.acall("key", fn) for _ in range(5)))
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 4
+
+
+async def test_acall_cancelled() -> None:
+    flights = Singleflight()
+    cancelled = asyncio.Event()
+
+    async def fn() -> str:
+        try:
+            await asyncio.sleep(0.2)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "answer"
+
+    leader = asyncio.ensure_future(flights.acall("key", fn))
+    follower = asyncio.ensure_future(flights.acall("key", fn))
+    await asyncio.sleep(0.05)
+    # the call goes on for the callers still waiting
+    leader.cancel()
+    assert await follower == ("answer", True)
+    assert not cancelled.is_set()
+    # and stops when none is left
+    callers = [asyncio.ensure_future(flights.acall("key", fn)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    """Answers embeddings after a while, counting requests."""
+
+    requests = 0
+
+    def do_POST(self) -> None:
+        json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests += 1
+        time.sleep(0.3)
+        body = json.dumps(EMBEDDING).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def slow_url(requests_mock: Mocker) -> Generator[str, None, None]:
+    requests_mock.register_uri("POST", re.compile("http://127.0.0.1.*"), real_http=True)
+    _SlowHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_coalesced_embed_query(slow_url: str) -> None:
+    embedders = [
+        NVIDIAEmbeddings(
+            base_url=f"{slow_url}/v1", model="mock-model", coalesce_requests=True
+        )
+        for _ in range(2)
+    ]
+    with ThreadPoolExecutor(4) as pool:
+        results = list(
+            pool.map(lambda i: embedders[i % 2].embed_query("foo"), range(4))
+        )
+    assert results == [[0.1, 0.2]] * 4
+    assert _SlowHandler.requests == 1
+    # every caller's record has the answer
+    assert all(e._client.last_response is not None for e in embedders)
+    # each of its own
+    assert len({id(result) for result in results}) == 4
+
+
+def test_coalesced_usage_charged_once(slow_url: str) -> None:
+    embedder = NVIDIAEmbeddings(
+        base_url=f"{slow_url}/v1",
+        model="mock-model",
+        api_key="KEY-COALESCED",
+        coalesce_requests=True,
+        tpm_limit=100000,
+    )
+    limiter = embedder._client.rate_limiter
+    assert limiter is not None
+    with ThreadPoolExecutor(5) as pool:
+        list(pool.map(lambda _: embedder.embed_query("foo"), range(5)))
+    assert _SlowHandler.requests == 1
+    assert limiter._tpm.tokens == pytest.approx(100000 - 100, abs=5)  # type: ignore
+
+
+def test_coalesced_usage_reported_once(slow_url: str) -> None:
+    embedder = NVIDIAEmbeddings(
+        base_url=f"{slow_url}/v1", model="mock-model", coalesce_requests=True
+    )
+    usage = UsageCallbackHandler()
+    usage.reset()
+
+    def embed(_: int) -> List[float]:
+        with get_usage_callback(callback=usage):
+            return embedder.embed_query("foo")
+
+    with ThreadPoolExecutor(5) as pool:
+        list(pool.map(embed, range(5)))
+    assert _SlowHandler.requests == 1
+    assert usage.total_tokens == 100
+    assert usage.successful_requests == 1
+
+
+def test_not_coalesced_by_default(slow_url: str) -> None:
+    embedder = NVIDIAEmbeddings(base_url=f"{slow_url}/v1", model="mock-model")
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda _: embedder.embed_query("foo"), range(2)))
+    assert _SlowHandler.requests == 2
+
+
+chat_requests: List[dict] = []
+
+
+async def slow_chat(request: web.Request) -> web.Response:
+    chat_requests.append(await request.json())
+    await asyncio.sleep(0.2)
+    usage = {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11}
+    return web.json_response({**COMPLETION, "usage": usage})
+
+
+@pytest.fixture
+def routes() -> Routes:
+    chat_requests.clear()
+    return {"POST /v1/chat/completions": slow_chat}
+
+
+async def test_coalesced_deterministic_chat(server: TestServer) -> None:
+    llm = ChatNVIDIA(
+        base_url=str(server.make_url("/v1")),
+        model="mock-model",
+        coalesce_requests=True,
+        temperature=0,
+    )
+    answers = await asyncio.gather(*(llm.ainvoke("Hi") for _ in range(3)))
+    assert [answer.content for answer in answers] == ["Hi"] * 3
+    assert len(chat_requests) == 1
+    # sampled generations differ by design, each is sent
+    sampled = llm.bind(temperature=0.5)
+    await asyncio.gather(*(sampled.ainvoke("Hi") for _ in range(3)))
+    assert len(chat_requests) == 4
+    await llm._client.aclose()
+
+
+async def test_coalesced_chat_usage_reported_once(server: TestServer) -> None:
+    llm = ChatNVIDIA(
+        base_url=str(server.make_url("/v1")),
+        model="mock-model",
+        coalesce_requests=True,
+        temperature=0,
+    )
+    usage = UsageCallbackHandler()
+    usage.reset()
+
+    async def ask() -> BaseMessage:
+        # a handler per caller, they share the usage totals
+        with get_usage_callback():
+            return await llm.ainvoke("Hi")
+
+    answers = await asyncio.gather(*(ask() for _ in range(3)))
+    assert len(chat_requests) == 1
+    assert usage.total_tokens == 11
+    assert usage.successful_requests == 1
+    assert [answer.content for answer in answers] == ["Hi"] * 3
+    await llm._client.aclose()
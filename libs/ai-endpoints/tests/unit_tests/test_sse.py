@@ -0,0 +1,133 @@
+import gzip
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Generator, List
+
+import pytest
+import requests
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from langchain_nvidia_ai_endpoints._sse import SSEDecoder, iter_chunks, set_read_timeout
+
+BODY = (
+    b": keep-alive comment\n\n"
+    b'data: {"a": 1}\n\n'
+    b"event: message\r\n"
+    b"id: 7\r\n"
+    b'data:{"b":\r\n'
+    b"data: 2}\r\n\r\n"
+    b"data: [DONE]\n\n"
+    b'data: {"after": "done"}\n\n'
+)
+EVENTS = [b'{"a": 1}', b'{"b":\n2}']
+
+
+def _split(body: bytes, size: int) -> List[bytes]:
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(BODY)])
+def test_chunk_boundaries(size: int) -> None:
+    decoder = SSEDecoder()
+    assert list(decoder.events(_split(BODY, size))) == EVENTS
+    assert decoder.done
+
+
+def test_unterminated_last_event() -> None:
+    assert list(SSEDecoder().events([b"data: 1\n\ndata: 2"])) == [b"1", b"2"]
+
+
+def test_plain_json_body() -> None:
+    assert list(SSEDecoder().events([b' {"a":\n', b"1}"])) == [b' {"a":\n1}']
+
+
+async def test_async_events() -> None:
+    async def chunks() -> AsyncIterator[bytes]:
+        for chunk in _split(BODY, 5):
+            yield chunk
+
+    assert [data async for data in SSEDecoder().aevents(chunks())] == EVENTS
+
+
+def test_stream_parses_multiline_events(requests_mock: Mocker) -> None:
+    chunk = (
+        'data: {"id":"ID0","object":"chat.completion.chunk",\n'
+        'data: "choices":[{"index":0,"delta":{"content":"%s"}}]}\n\n'
+    )
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/chat/completions",
+        text="".join(chunk % word for word in ["Hello", " ", "World"])
+        + "data: [DONE]\n\n",
+    )
+    llm = ChatNVIDIA(api_key="BOGUS")
+    assert [str(c.content) for c in llm.stream("Hi")] == ["Hello", " ", "World"]
+
+
+def test_stream_skips_non_json_events(requests_mock: Mocker) -> None:
+    chunk = (
+        'data: {"id":"ID0","object":"chat.completion.chunk",'
+        '"choices":[{"index":0,"delta":{"content":"%s"}}]}\n\n'
+    )
+    requests_mock.post(
+        "https://integrate.api.nvidia.com/v1/chat/completions",
+        text="data: ping\n\n"
+        + chunk % "Hello"
+        + "data: 42\n\ndata: {not json\n\n"
+        + chunk % "World"
+        + "data: [DONE]\n\n",
+    )
+    llm = ChatNVIDIA(api_key="BOGUS")
+    assert [str(c.content) for c in llm.stream("Hi")] == ["Hello", "World"]
+
+
+class _UnchunkedHandler(BaseHTTPRequestHandler):
+    """Sends BODY gzipped until the connection closes, or stalls midway."""
+
+    def do_POST(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        body = gzip.compress(BODY)
+        try:
+            if self.path == "/stall":
+                self.wfile.write(body[:10])
+                self.wfile.flush()
+                time.sleep(1)
+            else:
+                self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def unchunked_url(requests_mock: Mocker) -> Generator[str, None, None]:
+    requests_mock.register_uri("POST", re.compile("http://127.0.0.1.*"), real_http=True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UnchunkedHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchunked_gzip_body(unchunked_url: str) -> None:
+    with requests.post(unchunked_url, stream=True) as response:
+        assert not response.raw.chunked
+        assert list(SSEDecoder().events(iter_chunks(response))) == EVENTS
+
+
+def test_unchunked_read_timeout(unchunked_url: str) -> None:
+    with requests.post(f"{unchunked_url}/stall", stream=True) as response:
+        set_read_timeout(response, 0.1)
+        # surfaces as iter_content would raise it, not as a urllib3 error
+        with pytest.raises(requests.exceptions.ConnectionError):
+            list(iter_chunks(response))
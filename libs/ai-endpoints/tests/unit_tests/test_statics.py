@@ -1,8 +1,19 @@
-from typing import Any
+import threading
+import time
+from typing import Any, Dict, List
 
 import pytest
 
-from langchain_nvidia_ai_endpoints._statics import MODEL_TABLE, determine_model
+from langchain_nvidia_ai_endpoints import _statics
+from langchain_nvidia_ai_endpoints._statics import (
+    CHAT_MODEL_TABLE,
+    MODEL_TABLE,
+    RANKING_MODEL_TABLE,
+    Model,
+    ModelTable,
+    determine_model,
+    register_model,
+)
 
 
 @pytest.fixture(params=MODEL_TABLE.keys())
@@ -31,3 +42,78 @@ def test_determine_model_deprecated_alternative_warns(alias: str) -> None:
         determine_model(alias)
     assert len(record) == 1
     assert f"Model {alias} is deprecated" in str(record[0].message)
+
+
+def test_model_table_shares_instances() -> None:
+    model = next(iter(CHAT_MODEL_TABLE.values()))
+    assert MODEL_TABLE[model.id] is model
+
+
+def test_model_table_materializes_lazily() -> None:
+    table = ModelTable("ranking")
+    assert table._entries is None
+    assert len(table) == len(RANKING_MODEL_TABLE)
+    assert all(isinstance(e, str) for e in table._entries.values())  # type: ignore[attr-defined]
+    id = next(iter(table))
+    assert table[id].model_type == "ranking"
+
+
+def test_model_table_first_use_from_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    load_catalog = _statics._load_catalog
+
+    def slow_load_catalog() -> Dict[str, dict]:
+        time.sleep(0.05)
+        return load_catalog()
+
+    monkeypatch.setattr(_statics, "_load_catalog", slow_load_catalog)
+    table = ModelTable("ranking")
+    id = next(iter(RANKING_MODEL_TABLE))
+    found: List[bool] = []
+    threads = [
+        threading.Thread(target=lambda: found.append(table.resolve(id) is not None))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert found == [True] * 4
+
+
+def test_model_table_alias_index() -> None:
+    table = ModelTable()
+    table["a"] = Model(id="a", model_type="chat", client="ChatNVIDIA", aliases=["x"])
+    assert table.resolve("x") is table["a"]
+    assert table.resolve("a") is table["a"]
+    assert table.resolve("missing") is None
+    # the first model keeps a shared alias
+    table["b"] = Model(id="b", model_type="chat", client="ChatNVIDIA", aliases=["x"])
+    assert table.resolve("x") is table["a"]
+    # replacing a model replaces its aliases, the other model gets the shared one
+    table["a"] = Model(id="a", model_type="chat", client="ChatNVIDIA", aliases=["y"])
+    assert table.resolve("x") is table["b"]
+    assert table.resolve("y") is table["a"]
+    # the alias stays with the model that has it
+    table["a"] = Model(id="a", model_type="chat", client="ChatNVIDIA", aliases=["x"])
+    assert table.resolve("x") is table["b"]
+    del table["b"]
+    assert table.resolve("x") is table["a"]
+    del table["a"]
+    assert table.resolve("x") is None
+    assert table.resolve("y") is None
+
+
+def test_register_model_indexes_aliases() -> None:
+    model = Model(
+        id="test/alias-indexed",
+        model_type="chat",
+        client="ChatNVIDIA",
+        endpoint="BOGUS",
+        aliases=["test/alias-index-alias"],
+    )
+    try:
+        register_model(model)
+        with pytest.warns(UserWarning, match="deprecated"):
+            assert determine_model("test/alias-index-alias") is model
+    finally:
+        del MODEL_TABLE[model.id]
@@ -0,0 +1,197 @@
+import asyncio
+import gc
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Generator, List, Set, Tuple, cast
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from langchain_core.messages import BaseMessageChunk
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+
+from .conftest import Routes
+
+CHUNK = (
+    b'data: {"id":"ID0","object":"chat.completion.chunk","model":"bogus",'
+    b'"choices":[{"index":0,"delta":{"content":"token"},"finish_reason":null}]}\n\n'
+)
+FINISHED = [
+    CHUNK,
+    CHUNK.replace(b"null", b'"stop"'),
+    b"data: [DONE]\n\n",
+]
+
+
+class _EndlessHandler(BaseHTTPRequestHandler):
+    """Streams tokens until the client goes away."""
+
+    disconnected: threading.Event
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for _ in range(200):
+                self.wfile.write(CHUNK)
+                self.wfile.flush()
+                time.sleep(0.01)
+        except OSError:
+            self.disconnected.set()
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def endless(
+    requests_mock: Mocker,
+) -> Generator[Tuple[str, threading.Event], None, None]:
+    requests_mock.register_uri("POST", re.compile("http://127.0.0.1.*"), real_http=True)
+    disconnected = threading.Event()
+    handler = type("Handler", (_EndlessHandler,), {"disconnected": disconnected})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1", disconnected
+    server.shutdown()
+    server.server_close()
+
+
+def test_close_cancels_stream(endless: Tuple[str, threading.Event]) -> None:
+    base_url, disconnected = endless
+    llm = ChatNVIDIA(base_url=base_url, model="mock-model")
+    # stream() is typed as an Iterator but returns a generator
+    stream = cast(Generator[BaseMessageChunk, None, None], llm.stream("Hi"))
+    assert next(stream).content == "token"
+    stream.close()
+    assert disconnected.wait(1)
+
+
+def test_dropped_stream_is_cancelled(endless: Tuple[str, threading.Event]) -> None:
+    base_url, disconnected = endless
+    llm = ChatNVIDIA(base_url=base_url, model="mock-model")
+    for chunk in llm.stream("Hi"):
+        break
+    gc.collect()
+    assert disconnected.wait(1)
+
+
+def test_unstarted_stream_frees_slot(endless: Tuple[str, threading.Event]) -> None:
+    base_url, disconnected = endless
+    llm = ChatNVIDIA(base_url=base_url, model="mock-model", max_concurrency=1)
+    stream = llm._client.get_req_stream({"stream": True})
+    assert llm._client.scheduler is not None
+    assert llm._client.scheduler.in_flight == 1
+    del stream
+    gc.collect()
+    assert llm._client.scheduler.in_flight == 0
+    assert disconnected.wait(1)
+
+
+@pytest.fixture
+async def disconnected() -> asyncio.Event:
+    return asyncio.Event()
+
+
+@pytest.fixture
+def routes(disconnected: asyncio.Event) -> Routes:
+    async def endless(request: web.Request) -> web.StreamResponse:
+        await request.read()
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for _ in range(200):
+                await response.write(CHUNK)
+                await asyncio.sleep(0.01)
+        except (ConnectionError, asyncio.CancelledError):
+            disconnected.set()
+            raise
+        return response
+
+    return {"POST /v1/chat/completions": endless}
+
+
+async def test_aclose_cancels_stream(
+    server: TestServer, disconnected: asyncio.Event
+) -> None:
+    llm = ChatNVIDIA(base_url=str(server.make_url("/v1")), model="mock-model")
+    stream = llm.astream("Hi")
+    assert (await stream.__anext__()).content == "token"
+    await stream.aclose()  # type: ignore[attr-defined]
+    await asyncio.wait_for(disconnected.wait(), 1)
+    await llm._client.aclose()
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """Streams a finished answer over a kept-alive connection."""
+
+    protocol_version = "HTTP/1.1"
+    connections: Set[int]
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.connections.add(self.client_address[1])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for part in FINISHED:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def test_finished_stream_reuses_connection(requests_mock: Mocker) -> None:
+    requests_mock.register_uri("POST", re.compile("http://127.0.0.1.*"), real_http=True)
+    connections: Set[int] = set()
+    handler = type("Handler", (_KeepAliveHandler,), {"connections": connections})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        llm = ChatNVIDIA(
+            base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+            model="mock-model",
+        )
+        for _ in range(5):
+            assert [c.content for c in llm.stream("Hi")] == ["token", "token"]
+        assert len(connections) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+transports: List[object] = []
+
+
+async def finished(request: web.Request) -> web.StreamResponse:
+    await request.read()
+    if request.transport not in transports:
+        transports.append(request.transport)
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    for part in FINISHED:
+        await response.write(part)
+    await response.write_eof()
+    return response
+
+
+@pytest.mark.parametrize("routes", [{"POST /v1/chat/completions": finished}])
+async def test_finished_astream_reuses_connection(server: TestServer) -> None:
+    transports.clear()
+    llm = ChatNVIDIA(base_url=str(server.make_url("/v1")), model="mock-model")
+    for _ in range(5):
+        chunks = [c.content async for c in llm.astream("Hi")]
+        assert chunks == ["token", "token"]
+    assert len(transports) == 1
+    await llm._client.aclose()
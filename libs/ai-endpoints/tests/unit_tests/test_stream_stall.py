@@ -0,0 +1,194 @@
+import asyncio
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Generator, List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from requests_mock import Mocker
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from langchain_nvidia_ai_endpoints.errors import NVIDIAStreamStalled
+
+from .conftest import Routes
+
+
+def _chunk(content: str, finish_reason: str = "null") -> bytes:
+    return (
+        'data: {"id":"ID0","object":"chat.completion.chunk","model":"bogus",'
+        f'"choices":[{{"index":0,"delta":{{"content":"{content}"}},'
+        f'"finish_reason":{finish_reason}}}]}}\n\n'
+    ).encode()
+
+
+# what the server sends, per request: events, then a stall unless it finishes
+SCRIPTS = {
+    "stall-first": [b"STALL"],
+    "stall-after-two": [_chunk("a"), _chunk("b"), b"STALL"],
+    "pings": [b": ping\n\n"] * 40,
+    "complete": [_chunk("a"), _chunk("b", '"stop"'), b"data: [DONE]\n\n"],
+}
+
+
+def _play(script: List[bytes]) -> Generator[bytes, None, None]:
+    for part in script:
+        if part == b"STALL":
+            return
+        yield part
+
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    scripts: List[str]
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        script = SCRIPTS[self.scripts.pop(0)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for part in _play(script):
+                self.wfile.write(part)
+                self.wfile.flush()
+                time.sleep(0.02)
+            if script[-1] == b"STALL" or part.startswith(b":"):
+                time.sleep(2)
+        except OSError:
+            pass
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def scripted(requests_mock: Mocker) -> Generator[List[str], None, None]:
+    """Requests served so far are removed from the list, add scripts to it."""
+    requests_mock.register_uri("POST", re.compile("http://127.0.0.1.*"), real_http=True)
+    scripts: List[str] = []
+    handler = type("Handler", (_ScriptedHandler,), {"scripts": scripts})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scripts.append(f"http://127.0.0.1:{server.server_address[1]}/v1")
+    yield scripts
+    server.shutdown()
+    server.server_close()
+
+
+def _llm(scripts: List[str], *names: str, **kwargs: object) -> ChatNVIDIA:
+    base_url = scripts.pop(0)
+    scripts.extend(names)
+    return ChatNVIDIA(base_url=base_url, model="mock-model", **kwargs)
+
+
+def test_idle_stall(scripted: List[str]) -> None:
+    llm = _llm(scripted, "stall-after-two", stream_idle_timeout=0.2)
+    chunks = []
+    start = time.monotonic()
+    with pytest.raises(NVIDIAStreamStalled) as exc_info:
+        for chunk in llm.stream("Hi"):
+            chunks.append(chunk.content)
+    assert chunks == ["a", "b"]
+    assert exc_info.value.events == 2
+    assert time.monotonic() - start < 1
+
+
+def test_first_token_stall(scripted: List[str]) -> None:
+    llm = _llm(scripted, "stall-first", stream_first_token_timeout=0.2)
+    with pytest.raises(NVIDIAStreamStalled) as exc_info:
+        list(llm.stream("Hi"))
+    assert exc_info.value.events == 0
+
+
+def test_keep_alive_is_not_progress(scripted: List[str]) -> None:
+    llm = _llm(scripted, "pings", stream_first_token_timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(NVIDIAStreamStalled):
+        list(llm.stream("Hi"))
+    assert time.monotonic() - start < 0.5
+
+
+def test_retry_stall_before_first_token(scripted: List[str]) -> None:
+    llm = _llm(
+        scripted,
+        "stall-first",
+        "complete",
+        stream_first_token_timeout=0.2,
+        retry_stalled_streams=True,
+        retry_backoff=0,
+    )
+    assert [chunk.content for chunk in llm.stream("Hi")] == ["a", "b"]
+    assert scripted == []
+
+
+def test_no_retry_after_first_token(scripted: List[str]) -> None:
+    llm = _llm(
+        scripted,
+        "stall-after-two",
+        "complete",
+        stream_idle_timeout=0.2,
+        retry_stalled_streams=True,
+        retry_backoff=0,
+    )
+    with pytest.raises(NVIDIAStreamStalled):
+        list(llm.stream("Hi"))
+    assert scripted == ["complete"]
+
+
+@pytest.fixture
+def scripts() -> List[str]:
+    """Requests served so far are removed from the list, add scripts to it."""
+    return []
+
+
+@pytest.fixture
+def routes(scripts: List[str]) -> Routes:
+    async def chat(request: web.Request) -> web.StreamResponse:
+        await request.read()
+        script = SCRIPTS[scripts.pop(0)]
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for part in _play(script):
+            await response.write(part)
+            await asyncio.sleep(0.02)
+        if script[-1] == b"STALL":
+            await asyncio.sleep(2)
+        return response
+
+    return {"POST /v1/chat/completions": chat}
+
+
+@pytest.fixture
+def ascripted(server: TestServer, scripts: List[str]) -> List[str]:
+    """The scripts of the aiohttp server, as `scripted` for async tests."""
+    scripts.append(str(server.make_url("/v1")))
+    return scripts
+
+
+async def test_aidle_stall(ascripted: List[str]) -> None:
+    llm = _llm(ascripted, "stall-after-two", stream_idle_timeout=0.2)
+    chunks = []
+    with pytest.raises(NVIDIAStreamStalled) as exc_info:
+        async for chunk in llm.astream("Hi"):
+            chunks.append(chunk.content)
+    assert chunks == ["a", "b"]
+    assert exc_info.value.events == 2
+    await llm._client.aclose()
+
+
+async def test_aretry_stall_before_first_token(ascripted: List[str]) -> None:
+    llm = _llm(
+        ascripted,
+        "stall-first",
+        "complete",
+        stream_first_token_timeout=0.2,
+        retry_stalled_streams=True,
+        retry_backoff=0,
+    )
+    assert [chunk.content async for chunk in llm.astream("Hi")] == ["a", "b"]
+    assert ascripted == []
+    await llm._client.aclose()
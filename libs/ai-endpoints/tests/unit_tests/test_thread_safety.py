@@ -0,0 +1,87 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pytest
+from requests_mock import Mocker
+from requests_mock.adapter import _Matcher
+from requests_mock.request import _RequestObjectProxy
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+
+BASE_URL = "http://localhost:8000/v1"
+
+
+def echo(request: _RequestObjectProxy, context: Any) -> dict:
+    # interleave the calls of the worker threads
+    time.sleep(random.uniform(0, 0.002))
+    return {
+        "id": "ID0",
+        "object": "chat.completion",
+        "created": 1234567890,
+        "model": "local-model",
+        "choices": [
+            {
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": request.json()["messages"][-1]["content"],
+                },
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+@pytest.fixture
+def listing(requests_mock: Mocker) -> _Matcher:
+    model = {"id": "local-model", "root": "local-model"}
+    return requests_mock.get(f"{BASE_URL}/models", json={"data": [model]})
+
+
+@pytest.fixture(autouse=True)
+def chat(requests_mock: Mocker) -> _Matcher:
+    return requests_mock.post(f"{BASE_URL}/chat/completions", json=echo)
+
+
+@pytest.mark.filterwarnings("ignore:Default model is set")
+def test_concurrent_invokes(listing: _Matcher) -> None:
+    llm = ChatNVIDIA(base_url=BASE_URL, defer_model_discovery=True)
+
+    def call(i: int) -> None:
+        message = f"message {i}"
+        assert llm.invoke(message).content == message
+        # the thread sees its own call, inputs and response together
+        assert llm._client.last_inputs is not None
+        assert llm._client.last_inputs["json"]["messages"][-1]["content"] == message
+        assert llm._client.last_response is not None
+        response = llm._client.last_response.json()
+        assert response["choices"][0]["message"]["content"] == message
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(call, range(400)))
+    # concurrent first calls resolve the model once
+    assert listing.call_count == 1
+    assert llm.model == "local-model"
+
+
+def test_last_call_per_client() -> None:
+    a = ChatNVIDIA(base_url=BASE_URL, model="local-model")
+    b = ChatNVIDIA(base_url=BASE_URL, model="local-model")
+    a.invoke("a")
+    b.invoke("b")
+    assert a._client.last_inputs is not None
+    assert a._client.last_inputs["json"]["messages"][-1]["content"] == "a"
+    assert b._client.last_inputs is not None
+    assert b._client.last_inputs["json"]["messages"][-1]["content"] == "b"
+
+
+def test_last_call_from_other_thread() -> None:
+    llm = ChatNVIDIA(base_url=BASE_URL, model="local-model")
+    assert llm._client.last_inputs is None
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(llm.invoke, "elsewhere").result()
+    # without a call of its own, a thread sees the client's last call
+    assert llm._client.last_response is not None
+    assert "elsewhere" in llm._client.last_response.text